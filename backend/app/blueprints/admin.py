@@ -1,65 +1,193 @@
-from flask import Blueprint, request, jsonify, current_app
+import csv
+import io
+import json
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from sqlalchemy import select
 from ..models import User, UserChallenge, ChallengePlan
 from ..db import db
+from ..services import bulk_ops
+from ..services.bulk_ops import challenge_filters
+from ..services.profiler import Profiler
 
 admin_bp = Blueprint('admin', __name__)
 
+# Rows fetched per round trip by the streaming export
+EXPORT_BATCH = 1000
+
 def check_admin_auth():
     admin_key = request.headers.get('X-ADMIN-KEY')
     if not admin_key or admin_key != current_app.config.get('ADMIN_KEY'):
         return False
     return True
 
+CHALLENGE_COLUMNS = ("id", "user", "plan", "status", "balance", "start_date", "end_date")
+
+def challenge_query(args):
+    """
+    Admin challenge rows (id descending) filtered like bulk_ops.challenge_filters,
+    starting after ?cursor= (last id of the previous page).
+    Outer joins keep orphaned challenges visible (user/plan come back null)
+    instead of probing them one by one. Raises ValueError on bad filters.
+    """
+    stmt = select(
+        UserChallenge.id, User.email, ChallengePlan.name.label("plan_name"), UserChallenge.status,
+        UserChallenge.equity, UserChallenge.start_date, UserChallenge.end_date
+    ).select_from(UserChallenge)\
+     .outerjoin(User, UserChallenge.user_id == User.id)\
+     .outerjoin(ChallengePlan, UserChallenge.challenge_id == ChallengePlan.id)
+    stmt = stmt.where(*challenge_filters(args))
+    if args.get("cursor"):
+        stmt = stmt.where(UserChallenge.id < int(args["cursor"]))
+    return stmt.order_by(UserChallenge.id.desc())
+
+def challenge_row(row):
+    return {
+        "id": row.id,
+        "user": row.email,
+        "plan": row.plan_name,
+        "status": row.status,
+        "balance": round(row.equity, 2),
+        "start_date": row.start_date.isoformat() if row.start_date else None,
+        "end_date": row.end_date.isoformat() if row.end_date else None,
+    }
+
+def challenge_page(args):
+    """
+    One keyset page: (items, next_cursor). ?limit= defaults to 50, at most 500.
+    """
+    limit = min(max(args.get("limit", 50, type=int) or 50, 1), 500)
+    rows = db.session.execute(challenge_query(args).limit(limit + 1)).all()
+    next_cursor = str(rows[limit - 1].id) if len(rows) > limit else None
+    return [challenge_row(r) for r in rows[:limit]], next_cursor
+
 @admin_bp.get('/challenges')
 def list_challenges():
     if not check_admin_auth():
         return jsonify({"error": "Unauthorized"}), 401
-    
-    # Debug Logging
-    print(f"--- ADMIN ACCESS: Listing Challenges ---")
-    print(f"Database URI: {current_app.config.get('SQLALCHEMY_DATABASE_URI')}")
-    
     try:
-        total_raw = UserChallenge.query.count()
-        print(f"Total raw UserChallenges: {total_raw}")
-        
-        results = db.session.query(
-            UserChallenge.id,
-            User.email,
-            UserChallenge.equity,
-            UserChallenge.status,
-            ChallengePlan.name.label('plan_name')
-        ).join(User, UserChallenge.user_id == User.id)\
-         .join(ChallengePlan, UserChallenge.challenge_id == ChallengePlan.id).all()
-
-        print(f"Found {len(results)} joined challenges in DB.")
-        
-        if total_raw > 0 and len(results) == 0:
-            print("WARNING: Challenges exist but join failed. Checking for orphan records...")
-            # Check for invalid user_id or challenge_id
-            for uc in UserChallenge.query.all():
-                u_exists = db.session.get(User, uc.user_id) is not None
-                p_exists = db.session.get(ChallengePlan, uc.challenge_id) is not None
-                print(f" - UC {uc.id}: User({uc.user_id}) exists: {u_exists}, Plan({uc.challenge_id}) exists: {p_exists}")
-
-        challenges = []
-        for row in results:
-            challenges.append({
-                "id": row.id,
-                "user": row.email,
-                "balance": round(row.equity, 2),
-                "status": row.status,
-                "plan": row.plan_name
-            })
-        
-        return jsonify({
-            "items": challenges,
-            "count": len(challenges),
-            "message": "Success" if challenges else "No challenges found"
-        })
-    except Exception as e:
-        print(f"Error in admin/challenges: {e}")
-        return jsonify({"error": str(e)}), 500
+        challenges, next_cursor = challenge_page(request.args)
+    except ValueError:
+        return jsonify({"error": "invalid_filter"}), 400
+    return jsonify({
+        "items": challenges,
+        "count": len(challenges),
+        "next_cursor": next_cursor,
+        "message": "Success" if challenges else "No challenges found"
+    })
+
+@admin_bp.get('/challenges/export')
+def export_challenges():
+    """
+    Stream every challenge matching the listing filters as CSV (default) or
+    NDJSON (?format=ndjson). Rows come off a server-side cursor in batches, so
+    memory stays flat regardless of table size.
+    """
+    if not check_admin_auth():
+        return jsonify({"error": "Unauthorized"}), 401
+    fmt = request.args.get("format", "csv")
+    if fmt not in ("csv", "ndjson"):
+        return jsonify({"error": "invalid_format"}), 400
+    try:
+        stmt = challenge_query(request.args).execution_options(stream_results=True, yield_per=EXPORT_BATCH)
+    except ValueError:
+        return jsonify({"error": "invalid_filter"}), 400
+
+    def generate():
+        result = db.session.execute(stmt)
+        try:
+            if fmt == "csv":
+                buf = io.StringIO()
+                writer = csv.writer(buf)
+                writer.writerow(CHALLENGE_COLUMNS)
+                for rows in result.partitions():
+                    for r in rows:
+                        d = challenge_row(r)
+                        writer.writerow([d[c] for c in CHALLENGE_COLUMNS])
+                    yield buf.getvalue()
+                    buf.seek(0)
+                    buf.truncate()
+                yield buf.getvalue()
+            else:
+                for rows in result.partitions():
+                    yield "".join(json.dumps(challenge_row(r)) + "\n" for r in rows)
+        finally:
+            result.close()
+
+    mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return Response(stream_with_context(generate()), mimetype=mimetype,
+                    headers={"Content-Disposition": f"attachment; filename=challenges.{fmt}"})
+
+def stream_progress(steps):
+    """
+    NDJSON response with one line per committed chunk. A failure ends the stream
+    with an {"error"} line; chunks already committed stay committed.
+    """
+    def generate():
+        try:
+            for step in steps:
+                yield json.dumps(step) + "\n"
+        except Exception as e:
+            db.session.rollback()
+            yield json.dumps({"error": str(e)}) + "\n"
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+def _chunk_size(data):
+    try:
+        return min(max(int(data.get("chunk_size", bulk_ops.CHUNK_SIZE)), 1), 10000)
+    except (TypeError, ValueError):
+        raise ValueError("chunk_size")
+
+@admin_bp.post('/challenges/bulk_status')
+def bulk_status():
+    """
+    Body: {"status", "ids": [...]} or {"status", "filter": {status, plan, min_equity, max_equity}},
+    optional "chunk_size". Streams progress as NDJSON.
+    """
+    if not check_admin_auth():
+        return jsonify({"error": "Unauthorized"}), 401
+    data = request.get_json(silent=True) or {}
+    status = data.get("status")
+    if status not in bulk_ops.STATUSES:
+        return jsonify({"error": "Invalid status"}), 400
+    ids, filters = data.get("ids"), data.get("filter")
+    try:
+        size = _chunk_size(data)
+        if ids is not None:
+            if not isinstance(ids, list) or not ids:
+                raise ValueError("ids")
+            ids = [int(i) for i in ids]
+            steps = bulk_ops.set_status(status, ids=ids, size=size)
+        elif isinstance(filters, dict) and filters:
+            steps = bulk_ops.set_status(status, conditions=challenge_filters(filters), size=size)
+        else:
+            # An empty filter would touch every challenge; refuse rather than guess
+            raise ValueError("filter")
+    except (TypeError, ValueError):
+        return jsonify({"error": "invalid_selection"}), 400
+    return stream_progress(steps)
+
+@admin_bp.post('/challenges/provision')
+def bulk_provision():
+    """
+    Body: {"plan_id", "user_ids": [...], "skip_active": true, "chunk_size"}.
+    Streams progress as NDJSON.
+    """
+    if not check_admin_auth():
+        return jsonify({"error": "Unauthorized"}), 401
+    data = request.get_json(silent=True) or {}
+    user_ids = data.get("user_ids")
+    if not isinstance(user_ids, list) or not user_ids:
+        return jsonify({"error": "invalid_user_ids"}), 400
+    try:
+        size = _chunk_size(data)
+        user_ids = [int(i) for i in user_ids]
+        steps = bulk_ops.provision(int(data.get("plan_id") or 0), user_ids,
+                                   skip_active=bool(data.get("skip_active", True)), size=size)
+    except ValueError as e:
+        return jsonify({"error": "invalid_plan" if str(e) == "plan" else "invalid_user_ids"}), 400
+    except TypeError:
+        return jsonify({"error": "invalid_user_ids"}), 400
+    return stream_progress(steps)
 
 @admin_bp.get('/debug/counts')
 def debug_counts():
@@ -95,3 +223,31 @@ def update_challenge_status(challenge_id):
     db.session.commit()
     
     return jsonify({"message": f"Status updated to {new_status}"})
+
+@admin_bp.post('/risk/sweep')
+def run_risk_sweep():
+    if not check_admin_auth():
+        return jsonify({"error": "Unauthorized"}), 401
+    from ..services import risk_engine
+    return jsonify(risk_engine.sweep())
+
+@admin_bp.get('/profiling')
+def profiling_status():
+    if not check_admin_auth():
+        return jsonify({"error": "Unauthorized"}), 401
+    Profiler.poll()
+    return jsonify({**Profiler.settings(), "dumps": Profiler.dumps()[:20]})
+
+@admin_bp.post('/profiling')
+def profiling_update():
+    """
+    {"enabled": bool, "sample_rate": 0..1, "threshold_ms": int}; any subset.
+    Takes effect in every worker on the host within a couple of seconds.
+    """
+    if not check_admin_auth():
+        return jsonify({"error": "Unauthorized"}), 401
+    try:
+        settings = Profiler.update(request.get_json(silent=True) or {})
+    except (TypeError, ValueError):
+        return jsonify({"error": "invalid_settings"}), 400
+    return jsonify(settings)
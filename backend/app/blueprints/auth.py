@@ -1,10 +1,18 @@
-from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Blueprint, current_app, request, jsonify
+from sqlalchemy import and_
 from ..db import db
 from ..models import User, UserChallenge
+from ..services.metrics import Metrics
+from ..services.password_hasher import PasswordHasher, HasherBusy
 
 auth_bp = Blueprint("auth", __name__)
 
+def _busy():
+    # Hash pool saturated: tell the client to back off rather than queue the request
+    resp = jsonify({"error": "busy"})
+    resp.headers["Retry-After"] = "1"
+    return resp, 503
+
 @auth_bp.post("/register")
 def register():
     try:
@@ -21,14 +29,19 @@ def register():
         if db.session.query(User).filter_by(email=email).first():
             return jsonify({"error": "exists"}), 400
             
-        user = User(email=email, password_hash=generate_password_hash(password))
+        user = User(email=email, password_hash=PasswordHasher.hash(password))
         db.session.add(user)
         db.session.commit()
         
         return jsonify({"id": user.id, "email": user.email, "active_challenge_id": None})
-    except Exception as e:
-        print(f"Error during registration: {e}")
-        return jsonify({"error": "server_error", "message": str(e)}), 500
+    except HasherBusy:
+        db.session.rollback()
+        return _busy()
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception("Error during registration")
+        Metrics.inc("auth_errors_total", endpoint="register")
+        return jsonify({"error": "server_error"}), 500
 
 @auth_bp.post("/login")
 def login():
@@ -40,19 +53,32 @@ def login():
         email = data.get("email")
         password = data.get("password")
         
-        user = db.session.query(User).filter_by(email=email).first()
-        if not user or not check_password_hash(user.password_hash, password):
+        if not email or not password:
             return jsonify({"error": "unauthorized"}), 401
-        
-        # Find active challenge
-        active_challenge = db.session.query(UserChallenge).filter_by(user_id=user.id, status='active').first()
-        challenge_id = active_challenge.id if active_challenge else None
-        
+
+        # User and active challenge in one query (served by ix_user_challenge_user_status)
+        row = db.session.query(User, UserChallenge.id).outerjoin(
+            UserChallenge, and_(UserChallenge.user_id == User.id, UserChallenge.status == 'active')
+        ).filter(User.email == email).first()
+        if not row or not PasswordHasher.verify(row[0].password_hash, password):
+            return jsonify({"error": "unauthorized"}), 401
+        user, challenge_id = row
+
+        # Hash parameters changed since this password was stored: upgrade it now
+        if PasswordHasher.needs_rehash(user.password_hash):
+            user.password_hash = PasswordHasher.hash(password)
+            db.session.commit()
+
         return jsonify({
             "id": user.id, 
             "email": user.email,
             "active_challenge_id": challenge_id
         })
-    except Exception as e:
-        print(f"Error during login: {e}")
-        return jsonify({"error": "server_error", "message": str(e)}), 500
+    except HasherBusy:
+        db.session.rollback()
+        return _busy()
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception("Error during login")
+        Metrics.inc("auth_errors_total", endpoint="login")
+        return jsonify({"error": "server_error"}), 500
@@ -1,10 +1,15 @@
+from datetime import datetime, timezone
 from flask import Blueprint, jsonify, request
 from ..db import db
-from ..models import ChallengePlan, UserChallenge, User
+from ..models import ChallengePlan, UserChallenge
+from ..services.equity_series import EquitySeries, RESOLUTIONS
+from ..services.response_cache import ResponseCache
+from .admin import check_admin_auth, challenge_query
 
 challenges_bp = Blueprint("challenges", __name__)
 
 @challenges_bp.get("/")
+@ResponseCache.cached("challenge_plan")
 def list_plans():
     plans = db.session.query(ChallengePlan).all()
     return jsonify([{"id": p.id, "name": p.name, "price_dh": p.price_dh, "starting_balance": p.starting_balance, "profit_target_pct": p.profit_target_pct, "max_daily_loss_pct": p.max_daily_loss_pct, "max_total_loss_pct": p.max_total_loss_pct} for p in plans])
@@ -20,19 +25,32 @@ def seed_default_plans():
 
 @challenges_bp.get("/user_challenges")
 def list_user_challenges():
-    rows = db.session.query(UserChallenge, User, ChallengePlan).join(User, User.id == UserChallenge.user_id).join(ChallengePlan, ChallengePlan.id == UserChallenge.challenge_id).all()
-    data = []
-    for uc, u, p in rows:
-        data.append({
-            "id": uc.id,
-            "user_id": uc.user_id,
-            "email": u.email,
-            "plan": p.name,
-            "status": uc.status,
-            "equity": uc.equity,
-            "starting_balance": p.starting_balance
-        })
-    return jsonify(data)
+    """
+    Admin-only. Same filters and keyset paging as /api/admin/challenges; the
+    cursor for the next page is returned in the X-Next-Cursor header.
+    """
+    if not check_admin_auth():
+        return jsonify({"error": "Unauthorized"}), 401
+    limit = min(max(request.args.get("limit", 50, type=int) or 50, 1), 500)
+    try:
+        stmt = challenge_query(request.args).add_columns(
+            UserChallenge.user_id, ChallengePlan.starting_balance).limit(limit + 1)
+    except ValueError:
+        return jsonify({"error": "invalid_filter"}), 400
+    rows = db.session.execute(stmt).all()
+    data = [{
+        "id": r.id,
+        "user_id": r.user_id,
+        "email": r.email,
+        "plan": r.plan_name,
+        "status": r.status,
+        "equity": r.equity,
+        "starting_balance": r.starting_balance
+    } for r in rows[:limit]]
+    resp = jsonify(data)
+    if len(rows) > limit:
+        resp.headers["X-Next-Cursor"] = str(rows[limit - 1].id)
+    return resp
 
 @challenges_bp.post("/update_status")
 def update_status():
@@ -57,3 +75,48 @@ def get_active_challenge():
         return jsonify({"active_challenge_id": uc.id})
     else:
         return jsonify({"active_challenge_id": None})
+
+def _utc_arg(name):
+    # Stored times are naive UTC; aware inputs are converted
+    value = request.args.get(name)
+    if not value:
+        return None
+    ts = datetime.fromisoformat(value)
+    return ts.astimezone(timezone.utc).replace(tzinfo=None) if ts.tzinfo else ts
+
+@challenges_bp.get("/<int:uc_id>/equity")
+def equity_curve(uc_id):
+    """
+    Equity curve points for ?from=&to= (ISO times, default the whole challenge)
+    at ?resolution=auto|tick|minute|hour|day. At most EQUITY_MAX_POINTS points;
+    next_from continues a truncated range. Periods not yet rolled up only show
+    at finer resolutions, and `current` is the live value.
+    """
+    uc = db.session.get(UserChallenge, uc_id)
+    if not uc:
+        return jsonify({"error": "not_found"}), 404
+    resolution = request.args.get("resolution", "auto")
+    if resolution != "auto" and resolution not in RESOLUTIONS:
+        return jsonify({"error": "invalid_resolution"}), 400
+    try:
+        start = _utc_arg("from") or uc.start_date
+        end = _utc_arg("to") or datetime.utcnow()
+    except ValueError:
+        return jsonify({"error": "invalid_range"}), 400
+    start = start or end
+    if start > end:
+        return jsonify({"error": "invalid_range"}), 400
+    resolution, points, next_start = EquitySeries.series(uc.id, start, end, resolution)
+    return jsonify({
+        "user_challenge_id": uc.id,
+        "resolution": resolution,
+        "points": points,
+        "next_from": next_start.isoformat() if next_start else None,
+        "current": {
+            "t": uc.last_updated.isoformat() if uc.last_updated else None,
+            "equity": uc.equity,
+            "highest_equity": uc.highest_equity,
+            "lowest_equity": uc.lowest_equity,
+            "max_drawdown_pct": round(uc.max_drawdown_pct or 0.0, 2),
+        }
+    })
@@ -0,0 +1,20 @@
+import hmac
+from flask import Blueprint, Response, current_app, jsonify, request
+from ..services.metrics import Metrics
+from ..services.price_service import PriceService
+from ..services.profiler import Profiler
+
+metrics_bp = Blueprint("metrics", __name__)
+
+@metrics_bp.get("/metrics")
+def metrics():
+    """
+    Prometheus text exposition for this worker. When METRICS_TOKEN is set the
+    scraper must send it as a bearer token.
+    """
+    token = current_app.config.get("METRICS_TOKEN")
+    if token and not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return jsonify({"error": "Unauthorized"}), 401
+    Metrics.set("price_feed_running", int(PriceService.feed_running))
+    Metrics.set("profiler_enabled", int(Profiler.ENABLED))
+    return Response(Metrics.render(), mimetype="text/plain; version=0.0.4")
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from ..db import db
 from ..models import Payment, UserChallenge, ChallengePlan, Settings
+from ..services.response_cache import ResponseCache
 
 payment_bp = Blueprint("payment", __name__)
 
@@ -22,13 +23,17 @@ def checkout():
         equity=plan.starting_balance, 
         daily_start_equity=plan.starting_balance,
         highest_equity=plan.starting_balance, 
-        lowest_equity=plan.starting_balance
+        lowest_equity=plan.starting_balance,
+        realized_pnl=0.0,
+        cash_balance=plan.starting_balance,
+        trade_count=0
     )
     db.session.add(uc)
     db.session.commit()
     return jsonify({"payment_id": pay.id, "user_challenge_id": uc.id, "status": "success"})
 
 @payment_bp.get("/paypal-config")
+@ResponseCache.cached("settings")
 def paypal_config():
     s = db.session.query(Settings).first()
     return jsonify({"client_id": s.paypal_client_id if s else "", "secret": s.paypal_secret if s else ""})
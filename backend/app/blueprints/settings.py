@@ -1,10 +1,12 @@
 from flask import Blueprint, jsonify
 from ..models import Settings
+from ..services.response_cache import ResponseCache
 
 # Create a Blueprint for settings routes
 settings_bp = Blueprint('settings', __name__)
 
 @settings_bp.route('/', methods=['GET'])
+@ResponseCache.cached("settings")
 def get_settings():
     """
     Get the application settings.
@@ -0,0 +1,47 @@
+import queue
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from ..services.stream_hub import StreamHub, format_event
+
+stream_bp = Blueprint("stream", __name__)
+
+HEARTBEAT_SECONDS = 15
+MAX_SYMBOLS = 20
+
+@stream_bp.get("/")
+def stream():
+    """
+    Server-Sent Events feed replacing the dashboard's price/summary polling.
+    Query params: symbols (comma separated), user_challenge_id.
+    Emits `price` events per symbol and `account` events (equity + rule metrics)
+    only when a value changes; a comment line is sent as heartbeat.
+    """
+    symbols = [s.strip() for s in request.args.get("symbols", "").split(",") if s.strip()][:MAX_SYMBOLS]
+    user_challenge_id = request.args.get("user_challenge_id", type=int)
+    if not symbols and not user_challenge_id:
+        return jsonify({"error": "invalid"}), 400
+
+    sub = StreamHub.subscribe(symbols, user_challenge_id)
+    if sub is None:
+        # Worker at STREAM_MAX_CONNECTIONS: EventSource retries, the app keeps its polling fallback
+        return jsonify({"error": "busy"}), 503, {"Retry-After": "30"}
+
+    def events():
+        try:
+            yield "retry: 5000\n\n"
+            while not sub.closed:
+                try:
+                    event, data = sub.queue.get(timeout=HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ": ping\n\n"
+                    continue
+                yield format_event(event, data)
+        finally:
+            StreamHub.unsubscribe(sub)
+
+    resp = Response(stream_with_context(events()), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+    # Also release the slot when the client goes away before the generator starts
+    resp.call_on_close(lambda: StreamHub.unsubscribe(sub))
+    return resp
@@ -1,10 +1,15 @@
+import math
 from flask import Blueprint, request, jsonify
+from sqlalchemy import and_, or_, update
+from datetime import datetime
+import base64
 from ..db import db
-from ..models import Trade, UserChallenge, ChallengePlan, Position
-from ..services.challenge_engine import evaluate_rules
+from ..models import Trade, UserChallenge, ChallengePlan, Position, PendingOrder
+from ..services.challenge_engine import apply_rules
+from ..services.execution import execute_order, execute_batch, market_prices, validate_order, ExecutionError
+from ..services.ledger import ensure_ledger
+from ..services.order_book import OrderBook, ORDER_TYPES
 from ..services.price_service import PriceService
-import yfinance as yf
-import random
 
 trades_bp = Blueprint("trades", __name__)
 
@@ -20,54 +25,105 @@ def execute():
         quantity = float(quantity_raw)
     except Exception:
         return jsonify({"error": "invalid_quantity"}), 400
-    if price_raw is None:
-        price_raw = PriceService.get_price(symbol)
     try:
-        price = float(price_raw)
+        # Before the price lookup, which needs a usable symbol
+        validate_order(symbol, side, quantity)
+    except ExecutionError as e:
+        return jsonify({"error": e.code}), 400
+    try:
+        price = float(price_raw) if price_raw is not None else None
     except Exception:
-        price = PriceService.get_price(symbol)
-    uc = db.session.get(UserChallenge, user_challenge_id)
+        price = None
+    if price is None:
+        price = market_prices([symbol]).get(symbol)
+        if price is None:
+            return jsonify({"error": "price_unavailable"}), 400
+    try:
+        t, _, _ = execute_order(user_challenge_id, symbol, side, quantity, price)
+    except ExecutionError as e:
+        return jsonify({"error": e.code}), 400
+    return jsonify({"trade_id": t.id, "status": "ok"})
+
+@trades_bp.post("/execute_batch")
+def execute_batch_route():
+    """
+    Body: {"user_challenge_id": ..., "orders": [{"symbol", "side", "quantity", "price"?}, ...]}.
+    Orders fill in list order in one transaction; the response has one result per order.
+    """
+    data = request.get_json() or {}
+    try:
+        results, uc, metrics = execute_batch(data.get("user_challenge_id"), data.get("orders"))
+    except ExecutionError as e:
+        return jsonify({"error": e.code}), 400
+    return jsonify({
+        "status": "ok",
+        "challenge_status": uc.status,
+        "filled": sum(1 for r in results if r["status"] == "ok"),
+        "results": results,
+        **metrics
+    })
+
+def _order_row(o):
+    return {"id": o.id, "symbol": o.symbol, "side": o.side, "type": o.order_type, "trigger_price": o.trigger_price,
+            "quantity": o.quantity, "status": o.status, "created_at": o.created_at.isoformat(),
+            "filled_at": o.filled_at.isoformat() if o.filled_at else None, "fill_price": o.fill_price, "trade_id": o.trade_id}
+
+@trades_bp.post("/orders")
+def place_order():
+    """
+    Rest a limit, stop or take-profit order; it fills at the feed price once
+    the price crosses trigger_price.
+    Body: {"user_challenge_id", "symbol", "side", "type", "trigger_price", "quantity"}
+    """
+    data = request.get_json() or {}
+    symbol = data.get("symbol")
+    side = data.get("side")
+    order_type = data.get("type")
+    try:
+        quantity = float(data.get("quantity", 0))
+        trigger_price = float(data.get("trigger_price"))
+    except (TypeError, ValueError):
+        return jsonify({"error": "invalid_quantity_or_price"}), 400
+    try:
+        # Same symbol/side/quantity rules as market orders (finite, positive quantity)
+        validate_order(symbol, side, quantity)
+    except ExecutionError as e:
+        return jsonify({"error": "invalid_quantity_or_price" if e.code == "invalid_quantity" else "invalid_order"}), 400
+    if order_type not in ORDER_TYPES:
+        return jsonify({"error": "invalid_order"}), 400
+    # A NaN trigger would sit at the top of its heap and block every order behind it
+    if not math.isfinite(trigger_price) or trigger_price <= 0:
+        return jsonify({"error": "invalid_quantity_or_price"}), 400
+    uc = db.session.get(UserChallenge, data.get("user_challenge_id"))
     if not uc or uc.status != "active":
         return jsonify({"error": "invalid"}), 400
-    pnl = 0.0
-    pos = db.session.query(Position).filter_by(user_challenge_id=user_challenge_id, symbol=symbol).first()
-    if side == "buy":
-        if pos and pos.side == "short":
-            close_qty = min(quantity, pos.quantity)
-            pnl = (pos.avg_price - price) * close_qty
-            pos.quantity -= close_qty
-            if pos.quantity == 0:
-                db.session.delete(pos)
-        else:
-            if pos:
-                new_qty = pos.quantity + quantity
-                pos.avg_price = (pos.avg_price * pos.quantity + price * quantity) / new_qty
-                pos.quantity = new_qty
-                pos.side = "long"
-            else:
-                pos = Position(user_challenge_id=user_challenge_id, symbol=symbol, quantity=quantity, avg_price=price, side="long")
-                db.session.add(pos)
-    elif side == "sell":
-        if pos and pos.side == "long":
-            close_qty = min(quantity, pos.quantity)
-            pnl = (price - pos.avg_price) * close_qty
-            pos.quantity -= close_qty
-            if pos.quantity == 0:
-                db.session.delete(pos)
-        else:
-            if pos:
-                new_qty = pos.quantity + quantity
-                pos.avg_price = (pos.avg_price * pos.quantity + price * quantity) / new_qty
-                pos.quantity = new_qty
-                pos.side = "short"
-            else:
-                pos = Position(user_challenge_id=user_challenge_id, symbol=symbol, quantity=quantity, avg_price=price, side="short")
-                db.session.add(pos)
-    t = Trade(user_challenge_id=user_challenge_id, symbol=symbol, side=side, quantity=quantity, price=price, pnl=pnl)
-    db.session.add(t)
+    o = PendingOrder(user_challenge_id=uc.id, symbol=symbol, side=side, order_type=order_type,
+                     trigger_price=trigger_price, quantity=quantity)
+    db.session.add(o)
     db.session.commit()
-    evaluate_rules(user_challenge_id)
-    return jsonify({"trade_id": t.id, "status": "ok"})
+    OrderBook.add(o.id, symbol, side, order_type, trigger_price)
+    return jsonify(_order_row(o)), 201
+
+@trades_bp.get("/orders")
+def list_orders():
+    user_challenge_id = request.args.get("user_challenge_id", type=int)
+    if not user_challenge_id:
+        return jsonify({"error": "invalid"}), 400
+    query = db.session.query(PendingOrder).filter(PendingOrder.user_challenge_id == user_challenge_id)
+    status = request.args.get("status", "open")
+    if status != "all":
+        query = query.filter(PendingOrder.status == status)
+    return jsonify([_order_row(o) for o in query.order_by(PendingOrder.id.desc()).limit(500)])
+
+@trades_bp.delete("/orders/<int:order_id>")
+def cancel_order(order_id):
+    res = db.session.execute(
+        update(PendingOrder).where(PendingOrder.id == order_id, PendingOrder.status == "open").values(status="cancelled"))
+    db.session.commit()
+    if res.rowcount != 1:
+        return jsonify({"error": "not_open"}), 404
+    OrderBook.discard(order_id)
+    return jsonify({"id": order_id, "status": "cancelled"})
 
 @trades_bp.get("/summary")
 def summary():
@@ -76,36 +132,35 @@ def summary():
     if not uc:
         return jsonify({"error": "invalid"}), 400
     plan = db.session.get(ChallengePlan, uc.challenge_id)
-    trades = db.session.query(Trade).filter_by(user_challenge_id=uc.id).order_by(Trade.timestamp.desc()).all()
+    ensure_ledger(uc, plan)
     positions = db.session.query(Position).filter_by(user_challenge_id=uc.id).all()
     symbols = list({p.symbol for p in positions})
-    prices = {}
-    # Batch fetch prices for all positions
-    prices = PriceService.get_prices(symbols)
-    realized_pnl = sum((t.pnl or 0.0) for t in trades)
+    # Batch fetch quotes for all positions (served from the price feed snapshot)
+    quotes = PriceService.get_quotes(symbols)
+    prices = {s: q["price"] for s, q in quotes.items()}
+    # Realized PnL and cash come from the running ledger; only open positions are revalued
+    realized_pnl = uc.realized_pnl
+    cash_balance = uc.cash_balance
+    trade_count = uc.trade_count
     unrealized_pnl = 0.0
-    cash_effect = 0.0
     for p in positions:
         current = prices.get(p.symbol, p.avg_price)
         if p.side == "long":
             unrealized_pnl += (current - p.avg_price) * p.quantity
-            cash_effect -= p.avg_price * p.quantity
         else:
             unrealized_pnl += (p.avg_price - current) * p.quantity
-            cash_effect += p.avg_price * p.quantity
-    cash_balance = (plan.starting_balance + realized_pnl + cash_effect)
     equity = cash_balance + unrealized_pnl
     uc.equity = equity
+    metrics = apply_rules(uc, plan)
     db.session.commit()
-    
-    metrics = evaluate_rules(uc.id)
-    
-    return jsonify({
+
+    result = {
         "status": uc.status,
         "equity": round(equity, 2),
         "cash_balance": round(cash_balance, 2),
         "unrealized_pnl": round(unrealized_pnl, 2),
         "realized_pnl": round(realized_pnl, 2),
+        "trade_count": trade_count,
         "starting_balance": plan.starting_balance,
         "profit_pct": metrics["profit_pct"] if metrics else 0,
         "daily_loss_pct": metrics["daily_loss_pct"] if metrics else 0,
@@ -113,6 +168,78 @@ def summary():
         "profit_target_pct": plan.profit_target_pct,
         "max_daily_loss_pct": plan.max_daily_loss_pct,
         "max_total_loss_pct": plan.max_total_loss_pct,
-        "positions": [{"symbol": p.symbol, "side": p.side, "quantity": p.quantity, "avg_price": p.avg_price, "current_price": prices.get(p.symbol, p.avg_price)} for p in positions],
-        "trades": [{"id": t.id, "symbol": t.symbol, "side": t.side, "quantity": t.quantity, "price": t.price, "timestamp": t.timestamp.isoformat(), "pnl": t.pnl} for t in trades]
-    })
+        "positions": [{"symbol": p.symbol, "side": p.side, "quantity": p.quantity, "avg_price": p.avg_price, "current_price": prices.get(p.symbol, p.avg_price), "price_stale_seconds": quotes[p.symbol]["stale_seconds"]} for p in positions],
+    }
+
+    # Trade history is opt-in: ?include_trades=1&limit=10 (use /history to page further)
+    if request.args.get("include_trades") in ("1", "true"):
+        trades, next_cursor = _trade_page(db.session.query(Trade).filter_by(user_challenge_id=uc.id),
+                                          request.args.get("limit", 50, type=int), None)
+        result["trades"] = [_trade_row(t) for t in trades]
+        result["trades_next_cursor"] = next_cursor
+    return jsonify(result)
+
+TRADE_COLUMNS = ("id", "symbol", "side", "quantity", "price", "timestamp", "pnl")
+
+def _trade_row(t):
+    return {"id": t.id, "symbol": t.symbol, "side": t.side, "quantity": t.quantity, "price": t.price, "timestamp": t.timestamp.isoformat(), "pnl": t.pnl}
+
+def _encode_cursor(t):
+    raw = f"{t.timestamp.isoformat()}|{t.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor):
+    ts, trade_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    return datetime.fromisoformat(ts), int(trade_id)
+
+def _trade_page(query, limit, cursor):
+    """
+    Keyset pagination over (timestamp, id) descending, served by ix_trade_uc_ts.
+    Returns the page and the cursor for the next one (None on the last page).
+    """
+    limit = min(max(limit or 50, 1), 500)
+    if cursor:
+        ts, trade_id = _decode_cursor(cursor)
+        query = query.filter(or_(Trade.timestamp < ts, and_(Trade.timestamp == ts, Trade.id < trade_id)))
+    rows = query.order_by(Trade.timestamp.desc(), Trade.id.desc()).limit(limit + 1).all()
+    next_cursor = _encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+@trades_bp.get("/history")
+def history():
+    """
+    Paginated trade history for one challenge.
+    Query params: user_challenge_id, limit, cursor, symbol, side, from, to (ISO dates),
+    format=columns for a compact column-oriented payload.
+    """
+    user_challenge_id = request.args.get("user_challenge_id", type=int)
+    if not user_challenge_id:
+        return jsonify({"error": "invalid"}), 400
+
+    query = db.session.query(Trade).filter(Trade.user_challenge_id == user_challenge_id)
+    symbol = request.args.get("symbol")
+    side = request.args.get("side")
+    if symbol:
+        query = query.filter(Trade.symbol == symbol)
+    if side:
+        if side not in ("buy", "sell"):
+            return jsonify({"error": "invalid_side"}), 400
+        query = query.filter(Trade.side == side)
+    try:
+        if request.args.get("from"):
+            query = query.filter(Trade.timestamp >= datetime.fromisoformat(request.args["from"]))
+        if request.args.get("to"):
+            query = query.filter(Trade.timestamp < datetime.fromisoformat(request.args["to"]))
+        trades, next_cursor = _trade_page(query, request.args.get("limit", 50, type=int),
+                                          request.args.get("cursor"))
+    except ValueError:
+        return jsonify({"error": "invalid_cursor_or_date"}), 400
+
+    if request.args.get("format") == "columns":
+        rows = [_trade_row(t) for t in trades]
+        return jsonify({
+            "columns": list(TRADE_COLUMNS),
+            "data": {c: [r[c] for r in rows] for c in TRADE_COLUMNS},
+            "next_cursor": next_cursor
+        })
+    return jsonify({"items": [_trade_row(t) for t in trades], "next_cursor": next_cursor})
@@ -0,0 +1,39 @@
+import os
+import click
+from .db import db
+
+# One-shot schema/seed bootstrap. Runs from `flask --app cli init-db` (or the
+# Procfile release phase), never from create_app, so gunicorn workers boot
+# without touching the schema.
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def alembic_config():
+    from alembic.config import Config as AlembicConfig
+    cfg = AlembicConfig(os.path.join(BACKEND_DIR, "alembic.ini"))
+    cfg.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    # Keep the app's logging setup
+    cfg.attributes["configure_logger"] = False
+    return cfg
+
+def upgrade_schema(revision="head"):
+    """
+    Apply migrations with the app's engine. Needs an app context.
+    """
+    from alembic import command
+    cfg = alembic_config()
+    with db.engine.begin() as connection:
+        cfg.attributes["connection"] = connection
+        command.upgrade(cfg, revision)
+
+def bootstrap():
+    from .blueprints.challenges import seed_default_plans
+    upgrade_schema()
+    seed_default_plans()
+
+def register_commands(app):
+    @app.cli.command("init-db")
+    def init_db():
+        """Apply migrations and seed the default challenge plans."""
+        bootstrap()
+        click.echo("Database is up to date.")
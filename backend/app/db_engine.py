@@ -0,0 +1,120 @@
+import functools
+import random
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+from .db import db
+
+# Engine setup per backend. SQLite gets WAL and connection pragmas so several
+# gunicorn workers can write without "database is locked"; Postgres gets a
+# bounded, pre-pinged pool.
+
+def is_sqlite_file(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+def engine_options(app_config):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for the configured database URL.
+    """
+    uri = app_config["SQLALCHEMY_DATABASE_URI"]
+    backend = make_url(uri).get_backend_name()
+    if backend == "sqlite":
+        if not is_sqlite_file(uri):
+            return {}
+        return {
+            # Busy waits are handled by PRAGMA busy_timeout; the driver timeout matches it
+            "connect_args": {"timeout": app_config.get("SQLITE_BUSY_TIMEOUT_MS", 5000) / 1000,
+                             "check_same_thread": False},
+            # One writer at a time anyway: a small pool of reused connections keeps
+            # the page cache and mmap warm without piling up idle handles
+            "pool_size": app_config.get("DB_POOL_SIZE", 5),
+            "max_overflow": app_config.get("DB_MAX_OVERFLOW", 10),
+        }
+    return {
+        "pool_size": app_config.get("DB_POOL_SIZE", 5),
+        "max_overflow": app_config.get("DB_MAX_OVERFLOW", 10),
+        "pool_recycle": app_config.get("DB_POOL_RECYCLE", 1800),
+        "pool_pre_ping": True,
+    }
+
+def install_sqlite_pragmas(engine, app_config):
+    """
+    Run the tuning pragmas on every new DBAPI connection of a file-backed SQLite engine.
+    """
+    if not is_sqlite_file(str(engine.url)):
+        return
+    pragmas = [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA busy_timeout={int(app_config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))}",
+        f"PRAGMA mmap_size={int(app_config.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))}",
+        # Negative cache_size is in KiB
+        f"PRAGMA cache_size=-{int(app_config.get('SQLITE_CACHE_SIZE_KB', 65536))}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, _record):
+        cursor = dbapi_conn.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+def configure_engine(app):
+    """
+    Call before db.init_app: merges the per-backend pool options under any
+    explicit SQLALCHEMY_ENGINE_OPTIONS and sets up busy retries.
+    """
+    if not app.config.get("SQLITE_TUNING", True):
+        return
+    options = engine_options(app.config)
+    options.update(app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+    RetryOnBusy.configure(app.config)
+
+def tune_engine(app):
+    """
+    Call inside an app context after db.init_app, before anything connects.
+    """
+    if app.config.get("SQLITE_TUNING", True):
+        install_sqlite_pragmas(db.engine, app.config)
+
+def is_busy_error(exc):
+    msg = str(getattr(exc, "orig", exc)).lower()
+    return isinstance(exc, OperationalError) and ("database is locked" in msg or "database is busy" in msg)
+
+class RetryOnBusy:
+    """
+    Re-run a whole unit of work when SQLite reports the database busy after
+    busy_timeout has elapsed. The session is rolled back between attempts, so
+    the wrapped function must start its own transaction (see execution.begin_write).
+    """
+    ATTEMPTS = 1
+    BASE_DELAY = 0.05
+    MAX_DELAY = 1.0
+
+    @classmethod
+    def configure(cls, app_config):
+        cls.ATTEMPTS = 1 + app_config.get("DB_BUSY_RETRIES", 5)
+        cls.BASE_DELAY = app_config.get("DB_BUSY_BACKOFF", cls.BASE_DELAY)
+
+    @classmethod
+    def wrap(cls, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            attempt = 0
+            while True:
+                try:
+                    return fn(*args, **kwargs)
+                except OperationalError as e:
+                    attempt += 1
+                    if not is_busy_error(e) or attempt >= cls.ATTEMPTS:
+                        raise
+                    db.session.rollback()
+                    # Exponential backoff with full jitter so retrying workers spread out
+                    time.sleep(random.uniform(0, min(cls.MAX_DELAY, cls.BASE_DELAY * 2 ** attempt)))
+        return wrapper
+
+retry_on_busy = RetryOnBusy.wrap
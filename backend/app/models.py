@@ -28,6 +28,19 @@ class UserChallenge(db.Model):
     highest_equity = db.Column(db.Float, nullable=False)
     lowest_equity = db.Column(db.Float, nullable=False)
     last_updated = db.Column(db.DateTime, default=datetime.utcnow)
+    # Running ledger, maintained per trade (see services/ledger.py)
+    realized_pnl = db.Column(db.Float, default=0.0)
+    cash_balance = db.Column(db.Float)
+    trade_count = db.Column(db.Integer, default=0)
+    # Deepest fall from highest_equity so far, in percent (see challenge_engine.apply_rules)
+    max_drawdown_pct = db.Column(db.Float, default=0.0)
+
+    __table_args__ = (
+        # Login and /api/challenges/active: WHERE user_id = ? AND status = 'active'
+        db.Index("ix_user_challenge_user_status", "user_id", "status"),
+        # Risk sweep: WHERE status = 'active' ORDER BY id
+        db.Index("ix_user_challenge_status_id", "status", "id"),
+    )
 
 class Trade(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -39,6 +52,11 @@ class Trade(db.Model):
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     pnl = db.Column(db.Float, default=0.0)
 
+    __table_args__ = (
+        # History pages and per-challenge scans: WHERE user_challenge_id = ? ORDER BY timestamp
+        db.Index("ix_trade_uc_ts", "user_challenge_id", "timestamp"),
+    )
+
 class Position(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_challenge_id = db.Column(db.Integer, db.ForeignKey("user_challenge.id"), nullable=False)
@@ -48,6 +66,76 @@ class Position(db.Model):
     side = db.Column(db.String(10), nullable=False)  # long or short
     opened_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # One netted position per symbol; also serves the per-order lookup
+        db.Index("uq_position_uc_symbol", "user_challenge_id", "symbol", unique=True),
+    )
+
+class PendingOrder(db.Model):
+    """
+    Resting limit / stop / take-profit order, filled by services/order_book.py
+    when the price feed crosses trigger_price.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_challenge_id = db.Column(db.Integer, db.ForeignKey("user_challenge.id"), nullable=False)
+    symbol = db.Column(db.String(50), nullable=False)
+    side = db.Column(db.String(10), nullable=False)  # buy or sell
+    order_type = db.Column(db.String(20), nullable=False)  # limit, stop or take_profit
+    trigger_price = db.Column(db.Float, nullable=False)
+    quantity = db.Column(db.Float, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="open")  # open, filled, cancelled or failed
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    filled_at = db.Column(db.DateTime)
+    fill_price = db.Column(db.Float)
+    trade_id = db.Column(db.Integer, db.ForeignKey("trade.id"))
+    # Fill transactions that raised; the order is marked failed after execution.MAX_FILL_ATTEMPTS
+    fill_attempts = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        # Matching engine catch-up: WHERE status = 'open' AND id > ?
+        db.Index("ix_pending_order_status_id", "status", "id"),
+        db.Index("ix_pending_order_uc_status", "user_challenge_id", "status"),
+    )
+
+class EquitySnapshot(db.Model):
+    """
+    Append-only equity series. resolution 0 rows are raw ticks (open = high =
+    low = close); 60/3600/86400 rows are rollups of the next finer level with
+    `bucket` the start of the period (see services/equity_series.py).
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_challenge_id = db.Column(db.Integer, db.ForeignKey("user_challenge.id"), nullable=False)
+    resolution = db.Column(db.Integer, nullable=False)  # seconds, 0 = tick
+    bucket = db.Column(db.DateTime, nullable=False)
+    open = db.Column(db.Float, nullable=False)
+    high = db.Column(db.Float, nullable=False)
+    low = db.Column(db.Float, nullable=False)
+    close = db.Column(db.Float, nullable=False)
+
+    __table_args__ = (
+        # Curve reads: WHERE user_challenge_id = ? AND resolution = ? AND bucket BETWEEN ...
+        db.Index("ix_equity_snapshot_uc_res_bucket", "user_challenge_id", "resolution", "bucket"),
+        # Rollups and retention: WHERE resolution = ? AND bucket >= ? across all challenges
+        db.Index("ix_equity_snapshot_res_bucket", "resolution", "bucket"),
+    )
+
+class MonthlyStat(db.Model):
+    """
+    Per-month trading totals for one challenge, kept up to date as trades are
+    inserted so the leaderboard never aggregates the trade table.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.String(7), nullable=False)  # YYYY-MM
+    user_challenge_id = db.Column(db.Integer, db.ForeignKey("user_challenge.id"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    starting_balance = db.Column(db.Float, nullable=False)
+    pnl = db.Column(db.Float, nullable=False, default=0.0)
+    trade_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint("month", "user_challenge_id", name="uq_monthly_stat_month_uc"),
+    )
+
 class Payment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
@@ -65,3 +153,11 @@ class Settings(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     paypal_client_id = db.Column(db.String(255))
     paypal_secret = db.Column(db.String(255))
+
+class JobLease(db.Model):
+    """
+    Cross-process lease for singleton background jobs (see services/job_lease.py).
+    """
+    name = db.Column(db.String(100), primary_key=True)
+    owner = db.Column(db.String(100), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
@@ -0,0 +1,124 @@
+import logging
+import os
+import threading
+import time
+from datetime import date, timedelta
+from typing import Dict, Tuple
+from .metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+class BarStore:
+    """
+    Daily close history per symbol, kept in memory and persisted as compact
+    .npz arrays (day number, close). Refreshes only download the bars after the
+    last one stored, at most once per REFRESH_TTL per symbol.
+
+    numpy (and yfinance) are imported on first use so worker boot stays light.
+    """
+    DIRECTORY = None
+    REFRESH_TTL = 3600
+    HISTORY_DAYS = 120
+    # symbol -> (days as datetime64[D], closes)
+    _bars: Dict[str, Tuple["np.ndarray", "np.ndarray"]] = {}
+    _checked: Dict[str, float] = {}
+    _lock = threading.Lock()
+    feed_running = False
+
+    @classmethod
+    def configure(cls, app_config):
+        cls.DIRECTORY = app_config.get("BAR_STORE_DIR")
+        cls.REFRESH_TTL = app_config.get("BAR_REFRESH_TTL", cls.REFRESH_TTL)
+
+    @classmethod
+    def _path(cls, symbol):
+        safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in symbol)
+        return os.path.join(cls.DIRECTORY, f"{safe}.npz")
+
+    @classmethod
+    def _load(cls, symbol):
+        if symbol in cls._bars:
+            return cls._bars[symbol]
+        import numpy as np
+        bars = (np.array([], dtype="datetime64[D]"), np.array([], dtype=np.float64))
+        if cls.DIRECTORY:
+            path = cls._path(symbol)
+            if os.path.exists(path):
+                with np.load(path) as f:
+                    bars = (f["days"].astype("datetime64[D]"), f["close"])
+        cls._bars[symbol] = bars
+        return bars
+
+    @classmethod
+    def _save(cls, symbol, days, closes):
+        if not cls.DIRECTORY:
+            return
+        import numpy as np
+        os.makedirs(cls.DIRECTORY, exist_ok=True)
+        tmp = cls._path(symbol) + ".tmp.npz"
+        np.savez(tmp, days=days.astype(np.int64), close=closes)
+        os.replace(tmp, cls._path(symbol))
+
+    @classmethod
+    def _download(cls, symbol, start: date):
+        import numpy as np
+        import yfinance as yf
+        data = yf.Ticker(symbol).history(start=start.isoformat(), interval="1d")
+        if data is None or data.empty:
+            return np.array([], dtype="datetime64[D]"), np.array([], dtype=np.float64)
+        days = np.array([d.date() for d in data.index], dtype="datetime64[D]")
+        return days, data["Close"].to_numpy(dtype=np.float64)
+
+    @classmethod
+    def refresh(cls, symbol) -> int:
+        """
+        Append bars newer than the last stored one. Returns how many were added.
+        Today's bar is still forming, so only completed days are stored.
+        """
+        import numpy as np
+        days, closes = cls._load(symbol)
+        today = np.datetime64(date.today(), "D")
+        if len(days):
+            start = (days[-1] + 1).astype(date)
+        else:
+            start = date.today() - timedelta(days=cls.HISTORY_DAYS)
+        cls._checked[symbol] = time.monotonic()
+        if np.datetime64(start, "D") >= today:
+            return 0
+        try:
+            new_days, new_closes = cls._download(symbol, start)
+        except Exception as e:
+            logger.warning("BarStore error for %s: %s", symbol, e)
+            Metrics.inc("bar_store_errors_total")
+            return 0
+        keep = (new_days < today) & (new_days > (days[-1] if len(days) else np.datetime64("1970-01-01")))
+        new_days, new_closes = new_days[keep], new_closes[keep]
+        if not len(new_days):
+            return 0
+        with cls._lock:
+            days = np.concatenate([days, new_days])
+            closes = np.concatenate([closes, new_closes])
+            cls._bars[symbol] = (days, closes)
+        cls._save(symbol, days, closes)
+        return len(new_days)
+
+    @classmethod
+    def get(cls, symbol):
+        """
+        Stored daily bars. Network is only touched for a symbol with no bars at
+        all, or (without a background feed) when its refresh is due.
+        """
+        days, closes = cls._load(symbol)
+        checked = cls._checked.get(symbol)
+        due = checked is None or time.monotonic() - checked > cls.REFRESH_TTL
+        if (not len(days) and checked is None) or (due and not cls.feed_running):
+            if cls.refresh(symbol):
+                days, closes = cls._bars[symbol]
+        elif checked is None:
+            cls._checked[symbol] = time.monotonic()
+        return days, closes
+
+    @classmethod
+    def refresh_all(cls):
+        for symbol in list(cls._bars):
+            cls.refresh(symbol)
@@ -0,0 +1,147 @@
+from datetime import datetime
+from sqlalchemy import DateTime, Float, Integer, String, insert, literal, select, update
+from ..db import db
+from ..db_engine import retry_on_busy
+from ..models import User, UserChallenge, ChallengePlan
+from .execution import begin_write
+from .metrics import Metrics
+
+# Set-based admin operations over many challenges. Everything runs as Core
+# statements over id chunks, one transaction per chunk, and never loads
+# UserChallenge objects into the session.
+
+# Rows per chunk (one transaction each)
+CHUNK_SIZE = 1000
+STATUSES = ("active", "passed", "failed")
+
+def challenge_filters(args):
+    """
+    WHERE conditions on UserChallenge from a filter mapping (query args or JSON):
+    status, plan (id or name), min_equity, max_equity. Raises ValueError on bad values.
+    """
+    conditions = []
+    status = args.get("status")
+    if status:
+        if status not in STATUSES:
+            raise ValueError("status")
+        conditions.append(UserChallenge.status == status)
+    plan = args.get("plan")
+    if plan not in (None, ""):
+        plan = str(plan)
+        if plan.isdigit():
+            conditions.append(UserChallenge.challenge_id == int(plan))
+        else:
+            conditions.append(UserChallenge.challenge_id.in_(
+                select(ChallengePlan.id).where(ChallengePlan.name == plan).scalar_subquery()))
+    if args.get("min_equity") not in (None, ""):
+        conditions.append(UserChallenge.equity >= float(args["min_equity"]))
+    if args.get("max_equity") not in (None, ""):
+        conditions.append(UserChallenge.equity <= float(args["max_equity"]))
+    return conditions
+
+def id_chunks(ids, size=CHUNK_SIZE):
+    ids = sorted({int(i) for i in ids})
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+def filtered_id_chunks(conditions, size=CHUNK_SIZE):
+    """
+    Walk the challenges matching `conditions` by id (keyset), one chunk at a time.
+    """
+    last_id = 0
+    while True:
+        ids = db.session.execute(
+            select(UserChallenge.id).where(*conditions, UserChallenge.id > last_id)
+            .order_by(UserChallenge.id).limit(size)
+        ).scalars().all()
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+@retry_on_busy
+def _set_status_chunk(ids, status, conditions):
+    table = UserChallenge.__table__
+    try:
+        begin_write()
+        # Conditions are re-checked so rows that changed since the id scan are left alone
+        res = db.session.execute(
+            update(table).where(table.c.id.in_(ids), table.c.status != status, *conditions)
+            .values(status=status, end_date=None if status == "active" else datetime.utcnow())
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return res.rowcount
+
+def set_status(status, ids=None, conditions=None, size=CHUNK_SIZE):
+    """
+    Move every challenge in `ids`, or matching `conditions`, to `status`.
+    Generator: yields one progress dict per committed chunk, then a final
+    {"done": True, ...} summary.
+    """
+    conditions = conditions or []
+    chunks = id_chunks(ids, size) if ids is not None else filtered_id_chunks(conditions, size)
+    matched = updated = 0
+    for n, chunk in enumerate(chunks, 1):
+        count = _set_status_chunk(chunk, status, conditions)
+        matched += len(chunk)
+        updated += count
+        Metrics.inc("bulk_rows_total", count, op="set_status")
+        yield {"chunk": n, "matched": matched, "updated": updated}
+    yield {"done": True, "matched": matched, "updated": updated}
+
+@retry_on_busy
+def _provision_chunk(user_ids, plan_id, starting_balance, skip_active):
+    users = User.__table__
+    table = UserChallenge.__table__
+    now = datetime.utcnow()
+    balance = literal(starting_balance, Float)
+    source = select(
+        users.c.id, literal(plan_id, Integer), literal("active", String), literal(now, DateTime),
+        balance, balance, balance, balance, literal(now, DateTime),
+        literal(0.0, Float), balance, literal(0, Integer)
+    ).where(users.c.id.in_(user_ids))
+    if skip_active:
+        source = source.where(~select(table.c.id).where(
+            table.c.user_id == users.c.id, table.c.status == "active").exists())
+    stmt = insert(table).from_select([
+        "user_id", "challenge_id", "status", "start_date",
+        "equity", "daily_start_equity", "highest_equity", "lowest_equity", "last_updated",
+        "realized_pnl", "cash_balance", "trade_count"
+    ], source)
+    try:
+        begin_write()
+        res = db.session.execute(stmt)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return res.rowcount
+
+def provision(plan_id, user_ids, skip_active=True, size=CHUNK_SIZE):
+    """
+    Open a fresh challenge on `plan_id` for every existing user in `user_ids`
+    with INSERT ... SELECT, the same initial state as payment.checkout but
+    without a Payment row (promotional accounts). Users that already have an
+    active challenge are skipped unless skip_active is False. Unknown ids are
+    ignored. Generator with the same progress protocol as set_status.
+    Raises ValueError for an unknown plan before anything is written.
+    """
+    plan = db.session.execute(
+        select(ChallengePlan.id, ChallengePlan.starting_balance).where(ChallengePlan.id == plan_id)
+    ).first()
+    if not plan:
+        raise ValueError("plan")
+
+    def steps():
+        requested = created = 0
+        for n, chunk in enumerate(id_chunks(user_ids, size), 1):
+            count = _provision_chunk(chunk, plan.id, plan.starting_balance, skip_active)
+            created += count
+            requested += len(chunk)
+            Metrics.inc("bulk_rows_total", count, op="provision")
+            yield {"chunk": n, "requested": requested, "created": created}
+        yield {"done": True, "requested": requested, "created": created}
+    return steps()
@@ -0,0 +1,217 @@
+import logging
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Optional, Tuple
+from .metrics import Metrics
+from .price_cache import MemoryPriceCache, make_cache
+
+logger = logging.getLogger(__name__)
+
+# Mapping between Tickers and BVC internal codes if necessary, or just using the symbol
+BVC_MAPPING = {
+    "IAM": "IAM",
+    "ATW": "ATW",
+    "BCP": "BCP",
+    "LXV": "LXV",
+    "SID": "SID"
+}
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8"
+}
+
+# Targeted extractors, tried before falling back to a full BeautifulSoup parse
+_PRICE_PATTERNS = [
+    re.compile(r'id="ctl00_Contenu_PlaceHolder_Contenu_lblCours"[^>]*>\s*([^<]+?)\s*<', re.I),
+    re.compile(r'class="[^"]*\bval-closing\b[^"]*"[^>]*>\s*([^<]+?)\s*<', re.I),
+]
+
+def parse_price_text(raw_text: str) -> Optional[float]:
+    # Robust cleaning: "1 234,50 MAD" -> 1234.50
+    clean_text = raw_text.replace(" ", "").replace("\xa0", "").replace(",", ".").upper()
+    clean_text = "".join(c for c in clean_text if c.isdigit() or c == ".")
+    if not clean_text:
+        return None
+    try:
+        price = float(clean_text)
+    except ValueError:
+        return None
+    return price if price > 0 else None
+
+def extract_price(html: str) -> Optional[float]:
+    for pattern in _PRICE_PATTERNS:
+        m = pattern.search(html)
+        if m:
+            price = parse_price_text(m.group(1))
+            if price:
+                return price
+
+    # Slow path: the page layout changed, search by text label
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "html.parser")
+    labels = soup.find_all(string=lambda t: "Cours" in t or "Dernier" in t)
+    for label in labels:
+        val = label.parent.find_next("span") or label.parent.find_next("td")
+        if val and any(c.isdigit() for c in val.text):
+            price = parse_price_text(val.text.strip())
+            if price:
+                return price
+    return None
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and rejects calls for `cooldown`
+    seconds; then lets a single trial call through (half-open).
+    """
+
+    def __init__(self, threshold=3, cooldown=120.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "half-open":
+                # Let this caller probe; others keep being rejected until it reports back
+                self.opened_at = time.monotonic()
+                return True
+            return state == "closed"
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+class BVCFeed:
+    """
+    Background fetcher for Casablanca Stock Exchange prices. Requests read the
+    parsed-price cache; only the scheduler job (or a symbol never fetched)
+    touches casablanca-bourse.com. Parsed prices live in a price cache backend
+    of their own (make_cache), so with the SQLite backend one worker per host
+    scrapes for all of them.
+    """
+    BASE_URL = "https://www.casablanca-bourse.com/bourseweb/indice-cours-entreprise.aspx"
+    TIMEOUT = 10
+    FRESH_TTL = 120
+    MAX_AGE = 24 * 3600
+    MAX_WATCHED = 50
+    # "bvc:<symbol>" -> (price, fetched_at, "bvc")
+    _store = MemoryPriceCache()
+    KEY_PREFIX = "bvc:"
+    _requested = set()
+    _session = None
+    breaker = CircuitBreaker()
+    feed_running = False
+
+    @classmethod
+    def configure(cls, app_config):
+        cls.BASE_URL = app_config.get("BVC_BASE_URL", cls.BASE_URL)
+        cls.TIMEOUT = app_config.get("BVC_TIMEOUT", cls.TIMEOUT)
+        cls.FRESH_TTL = app_config.get("BVC_FRESH_TTL", cls.FRESH_TTL)
+        cls.breaker = CircuitBreaker(app_config.get("BVC_BREAKER_THRESHOLD", 3),
+                                     app_config.get("BVC_BREAKER_COOLDOWN", 120))
+        cls._store = make_cache(app_config)
+
+    @classmethod
+    def shared(cls) -> bool:
+        """
+        True when parsed prices are visible to every worker on the host.
+        """
+        return cls._store.shared
+
+    @classmethod
+    def _entry(cls, symbol) -> Optional[Tuple[float, datetime]]:
+        entry = cls._store.get(cls.KEY_PREFIX + symbol)
+        return entry[:2] if entry else None
+
+    @classmethod
+    def session(cls):
+        if cls._session is None:
+            # requests is only imported once the scraper actually runs
+            import requests
+            from requests.adapters import HTTPAdapter
+            s = requests.Session()
+            s.headers.update(HEADERS)
+            s.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+            s.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+            cls._session = s
+        return cls._session
+
+    @classmethod
+    def fetch(cls, symbol: str) -> Optional[float]:
+        """
+        Fetch and parse one symbol, honouring the circuit breaker. Stores the result.
+        """
+        if not cls.breaker.allow():
+            return None
+        import requests
+        ticker = BVC_MAPPING.get(symbol, symbol)
+        try:
+            r = cls.session().get(cls.BASE_URL, params={"code": ticker}, timeout=cls.TIMEOUT)
+        except requests.RequestException as e:
+            logger.warning("[MAROC_SCRAPER] Request failed for %s: %s", symbol, e)
+            Metrics.inc("bvc_scrape_errors_total", stage="request")
+            cls.breaker.record_failure()
+            return None
+        # Only an unreachable or erroring site trips the breaker, not an unknown symbol
+        if r.status_code >= 500:
+            cls.breaker.record_failure()
+            return None
+        cls.breaker.record_success()
+        price = extract_price(r.text) if r.status_code == 200 else None
+        if price is None:
+            logger.warning("[MAROC_SCRAPER] Parsing failed for %s (status %s)", symbol, r.status_code)
+            Metrics.inc("bvc_scrape_errors_total", stage="parse")
+            return None
+        cls._store.set(cls.KEY_PREFIX + symbol, price, datetime.utcnow(), "bvc")
+        return price
+
+    @classmethod
+    def refresh_all(cls):
+        # Also symbols other workers asked for: they are in the shared store once fetched
+        stored = {key[len(cls.KEY_PREFIX):] for key in cls._store.keys(cls.KEY_PREFIX)}
+        for symbol in list(BVC_MAPPING) + sorted((cls._requested | stored) - set(BVC_MAPPING)):
+            if cls.breaker.state == "open":
+                break
+            cls.fetch(symbol)
+
+    @classmethod
+    def get(cls, symbol: str) -> Optional[dict]:
+        """
+        Latest parsed price from memory, with its age. None if never fetched.
+        """
+        if len(cls._requested) < cls.MAX_WATCHED:
+            cls._requested.add(symbol)
+        entry = cls._entry(symbol)
+        stale = entry is None or (datetime.utcnow() - entry[1]).total_seconds() > cls.FRESH_TTL
+        if entry is None or (stale and not cls.feed_running):
+            # Never fetched, or no background job (scripts, tests): fetch inline
+            cls.fetch(symbol)
+            entry = cls._entry(symbol)
+        if entry is None:
+            return None
+        price, fetched_at = entry
+        age = (datetime.utcnow() - fetched_at).total_seconds()
+        if age > cls.MAX_AGE:
+            return None
+        return {"price": price, "fetched_at": fetched_at, "age": age, "fresh": age <= cls.FRESH_TTL}
@@ -1,33 +1,55 @@
 from datetime import datetime
-from sqlalchemy import func
 from ..db import db
-from ..models import UserChallenge, ChallengePlan, Trade
+from ..models import UserChallenge, ChallengePlan
+from .equity_series import EquitySeries
 
-def evaluate_rules(user_challenge_id):
-    uc = db.session.get(UserChallenge, user_challenge_id)
-    if not uc:
-        return None
-    plan = db.session.get(ChallengePlan, uc.challenge_id)
-    
-    now = datetime.utcnow()
-    # If it's a new day, update daily_start_equity
-    if uc.last_updated.date() < now.date():
-        uc.daily_start_equity = uc.equity
-    
-    uc.last_updated = now
-    
+def compute_metrics(equity, daily_start_equity, starting_balance):
+    """
+    Returns (daily_loss_pct, total_loss_pct, profit_pct) for an equity value.
+    """
     # Formula 1: Daily Loss (%)
     # (Equity Actuelle - Equity au début du jour) / Equity Initiale * 100
     # Note: user said "equity_initiale" which usually means the plan's starting balance
-    daily_loss_amount = uc.equity - uc.daily_start_equity
-    daily_loss_pct = abs(daily_loss_amount) / plan.starting_balance * 100.0 if daily_loss_amount < 0 else 0.0
+    daily_loss_amount = equity - daily_start_equity
+    daily_loss_pct = abs(daily_loss_amount) / starting_balance * 100.0 if daily_loss_amount < 0 else 0.0
     
     # Formula 2: Total Loss (%)
     # (Equity Actuelle - Solde Initial) / Solde Initial * 100
-    total_loss_amount = uc.equity - plan.starting_balance
-    total_loss_pct = abs(total_loss_amount) / plan.starting_balance * 100.0 if total_loss_amount < 0 else 0.0
+    total_loss_amount = equity - starting_balance
+    total_loss_pct = abs(total_loss_amount) / starting_balance * 100.0 if total_loss_amount < 0 else 0.0
     
-    profit_pct = (uc.equity - plan.starting_balance) / plan.starting_balance * 100.0 if plan.starting_balance else 0.0
+    profit_pct = (equity - starting_balance) / starting_balance * 100.0 if starting_balance else 0.0
+    
+    return daily_loss_pct, total_loss_pct, profit_pct
+
+def track_extremes(uc):
+    """
+    Move the high/low-water marks and the running max drawdown to the current equity.
+    """
+    equity = uc.equity
+    if uc.highest_equity is None or equity > uc.highest_equity:
+        uc.highest_equity = equity
+    if uc.lowest_equity is None or equity < uc.lowest_equity:
+        uc.lowest_equity = equity
+    drawdown = (uc.highest_equity - equity) / uc.highest_equity * 100.0 if uc.highest_equity > 0 else 0.0
+    if drawdown > (uc.max_drawdown_pct or 0.0):
+        uc.max_drawdown_pct = drawdown
+
+def apply_rules(uc, plan, now=None):
+    """
+    Roll the daily baseline, track the water marks, apply pass/fail rules to a
+    loaded challenge and append an equity tick. Does not commit; the caller
+    owns the transaction.
+    """
+    now = now or datetime.utcnow()
+    # If it's a new day, update daily_start_equity
+    if uc.last_updated is None or uc.last_updated.date() < now.date():
+        uc.daily_start_equity = uc.equity
+    
+    uc.last_updated = now
+    track_extremes(uc)
+    
+    daily_loss_pct, total_loss_pct, profit_pct = compute_metrics(uc.equity, uc.daily_start_equity, plan.starting_balance)
     
     if daily_loss_pct >= plan.max_daily_loss_pct:
         uc.status = "failed"
@@ -38,10 +60,19 @@ def evaluate_rules(user_challenge_id):
     elif profit_pct >= plan.profit_target_pct:
         uc.status = "passed"
         uc.end_date = now
+    EquitySeries.record(uc, now)
         
-    db.session.commit()
     return {
         "daily_loss_pct": round(daily_loss_pct, 2),
         "total_loss_pct": round(total_loss_pct, 2),
         "profit_pct": round(profit_pct, 2)
     }
+
+def evaluate_rules(user_challenge_id):
+    uc = db.session.get(UserChallenge, user_challenge_id)
+    if not uc:
+        return None
+    plan = db.session.get(ChallengePlan, uc.challenge_id)
+    metrics = apply_rules(uc, plan)
+    db.session.commit()
+    return metrics
@@ -0,0 +1,205 @@
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, insert, select
+from ..db import db
+from ..models import EquitySnapshot
+
+TICK, MINUTE, HOUR, DAY = 0, 60, 3600, 86400
+RESOLUTIONS = {"tick": TICK, "minute": MINUTE, "hour": HOUR, "day": DAY}
+# (source, target) rollup steps, finest first so each step sees the previous one's output
+ROLLUPS = ((TICK, MINUTE), (MINUTE, HOUR), (HOUR, DAY))
+EPOCH = datetime(1970, 1, 1)
+
+def floor_bucket(ts, resolution):
+    if not resolution:
+        return ts
+    seconds = int((ts - EPOCH).total_seconds())
+    return EPOCH + timedelta(seconds=seconds - seconds % resolution)
+
+class EquitySeries:
+    """
+    Per-challenge equity curve. apply_rules and the risk sweep append ticks;
+    a scheduled rollup folds completed periods into minute, hour and day OHLC
+    rows, and retention drops old rows of each fine level once they are rolled up.
+    Reads pick the finest level that still covers the range within MAX_POINTS,
+    so any range costs one bounded index scan.
+    """
+    # Unchanged equity is written at most once per TICK_INTERVAL per challenge
+    TICK_INTERVAL = 5
+    # Seconds after a period ends before it is rolled up (in-flight writes)
+    GRACE = 5
+    RETENTION = {TICK: timedelta(days=2), MINUTE: timedelta(days=30), HOUR: timedelta(days=365), DAY: None}
+    MAX_POINTS = 1000
+    # challenge id -> (equity, time) of the last tick written by this process
+    _last = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, app_config):
+        cls.TICK_INTERVAL = app_config.get("EQUITY_TICK_INTERVAL", cls.TICK_INTERVAL)
+        cls.MAX_POINTS = app_config.get("EQUITY_MAX_POINTS", cls.MAX_POINTS)
+        cls.RETENTION = {
+            TICK: timedelta(days=app_config.get("EQUITY_TICK_RETENTION_DAYS", 2)),
+            MINUTE: timedelta(days=app_config.get("EQUITY_MINUTE_RETENTION_DAYS", 30)),
+            HOUR: timedelta(days=app_config.get("EQUITY_HOUR_RETENTION_DAYS", 365)),
+            DAY: None,
+        }
+
+    @classmethod
+    def _due(cls, uc_id, equity, now):
+        with cls._lock:
+            last = cls._last.get(uc_id)
+            if last and last[0] == equity and (now - last[1]).total_seconds() < cls.TICK_INTERVAL:
+                return False
+            cls._last[uc_id] = (equity, now)
+            return True
+
+    @classmethod
+    def record(cls, uc, now=None):
+        """
+        Append a tick for a loaded challenge inside the caller's transaction.
+        """
+        now = now or datetime.utcnow()
+        if uc.id is None or uc.equity is None or not cls._due(uc.id, uc.equity, now):
+            return
+        db.session.execute(insert(EquitySnapshot.__table__), [cls._tick(uc.id, uc.equity, now)])
+
+    @classmethod
+    def record_many(cls, points, now=None):
+        """
+        Append ticks for (challenge id, equity) pairs with one executemany. Does not commit.
+        """
+        now = now or datetime.utcnow()
+        rows = [cls._tick(uc_id, equity, now) for uc_id, equity in points if cls._due(uc_id, equity, now)]
+        if rows:
+            db.session.execute(insert(EquitySnapshot.__table__), rows)
+        return len(rows)
+
+    @staticmethod
+    def _tick(uc_id, equity, now):
+        return {"user_challenge_id": uc_id, "resolution": TICK, "bucket": now,
+                "open": equity, "high": equity, "low": equity, "close": equity}
+
+    @classmethod
+    def _watermark(cls, resolution):
+        """
+        End of the newest period already written at `resolution`, or None.
+        """
+        latest = db.session.execute(
+            select(func.max(EquitySnapshot.bucket)).where(EquitySnapshot.resolution == resolution)
+        ).scalar()
+        return latest + timedelta(seconds=resolution) if latest else None
+
+    @classmethod
+    def rollup(cls, now=None) -> dict:
+        """
+        Fold every completed, not yet rolled period of each level into the next
+        one. Safe to re-run. Each step reads its watermark inside a write
+        transaction, so on SQLite concurrent runs serialise instead of doubling
+        up; elsewhere the scheduler's lease keeps it to one worker.
+        """
+        from .execution import begin_write  # execution -> challenge_engine -> this module
+        now = now or datetime.utcnow()
+        table = EquitySnapshot.__table__
+        written = {}
+        for source, target in ROLLUPS:
+            begin_write()
+            start = cls._watermark(target)
+            if start is None:
+                first = db.session.execute(
+                    select(func.min(table.c.bucket)).where(table.c.resolution == source)).scalar()
+                if first is None:
+                    db.session.rollback()
+                    continue
+                start = floor_bucket(first, target)
+            end = floor_bucket(now - timedelta(seconds=cls.GRACE), target)
+            if start >= end:
+                db.session.rollback()
+                continue
+            rows = db.session.execute(
+                select(table.c.user_challenge_id, table.c.bucket, table.c.open, table.c.high,
+                       table.c.low, table.c.close)
+                .where(table.c.resolution == source, table.c.bucket >= start, table.c.bucket < end)
+                .order_by(table.c.user_challenge_id, table.c.bucket)
+                .execution_options(yield_per=5000)
+            )
+            # Rows arrive ordered, so open is the first row of a period and close the last
+            periods = {}
+            for r in rows:
+                key = (r.user_challenge_id, floor_bucket(r.bucket, target))
+                p = periods.get(key)
+                if p is None:
+                    periods[key] = {"user_challenge_id": key[0], "resolution": target, "bucket": key[1],
+                                    "open": r.open, "high": r.high, "low": r.low, "close": r.close}
+                else:
+                    p["high"] = max(p["high"], r.high)
+                    p["low"] = min(p["low"], r.low)
+                    p["close"] = r.close
+            batch = list(periods.values())
+            for i in range(0, len(batch), 5000):
+                db.session.execute(insert(table), batch[i:i + 5000])
+            db.session.commit()
+            written[target] = len(batch)
+        return written
+
+    @classmethod
+    def prune(cls, now=None) -> int:
+        """
+        Drop rows past their level's retention, but never rows not yet rolled up.
+        """
+        now = now or datetime.utcnow()
+        table = EquitySnapshot.__table__
+        removed = 0
+        for source, target in ROLLUPS:
+            keep = cls.RETENTION.get(source)
+            rolled = cls._watermark(target)
+            if keep is None or rolled is None:
+                continue
+            cutoff = min(now - keep, rolled)
+            res = db.session.execute(delete(table).where(table.c.resolution == source, table.c.bucket < cutoff))
+            removed += res.rowcount or 0
+        db.session.commit()
+        return removed
+
+    @classmethod
+    def maintain(cls, now=None):
+        written = cls.rollup(now)
+        removed = cls.prune(now)
+        return {"rolled_up": written, "pruned": removed}
+
+    @classmethod
+    def pick_resolution(cls, start, end, now=None):
+        """
+        Finest level whose retention still reaches `start` and whose point count fits MAX_POINTS.
+        """
+        now = now or datetime.utcnow()
+        span = (end - start).total_seconds()
+        for name, resolution in RESOLUTIONS.items():
+            keep = cls.RETENTION.get(resolution)
+            if keep is not None and start < now - keep:
+                continue
+            if span / (resolution or cls.TICK_INTERVAL) <= cls.MAX_POINTS:
+                return name
+        return "day"
+
+    @classmethod
+    def series(cls, uc_id, start, end, resolution="auto"):
+        """
+        Points of one challenge in [start, end) at the given level, at most
+        MAX_POINTS. Returns (resolution name, points, next start or None).
+        """
+        if resolution == "auto":
+            resolution = cls.pick_resolution(start, end)
+        # Include the period that contains `start`
+        start = floor_bucket(start, RESOLUTIONS[resolution])
+        table = EquitySnapshot.__table__
+        rows = db.session.execute(
+            select(table.c.bucket, table.c.open, table.c.high, table.c.low, table.c.close)
+            .where(table.c.user_challenge_id == uc_id, table.c.resolution == RESOLUTIONS[resolution],
+                   table.c.bucket >= start, table.c.bucket < end)
+            .order_by(table.c.bucket).limit(cls.MAX_POINTS + 1)
+        ).all()
+        next_start = rows[cls.MAX_POINTS].bucket if len(rows) > cls.MAX_POINTS else None
+        points = [{"t": r.bucket.isoformat(), "open": r.open, "high": r.high, "low": r.low, "close": r.close}
+                  for r in rows[:cls.MAX_POINTS]]
+        return resolution, points, next_start
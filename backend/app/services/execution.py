@@ -0,0 +1,304 @@
+import logging
+import math
+from datetime import datetime
+from sqlalchemy import bindparam, case, update
+from ..db import db
+from ..db_engine import retry_on_busy
+from ..models import UserChallenge, ChallengePlan, Trade, Position, PendingOrder
+from .challenge_engine import apply_rules
+from .ledger import ensure_ledger, position_cash, record_trade
+from .leaderboard_service import record_trade_stat
+from .price_service import PriceService
+from .metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+# Largest order list accepted by execute_batch
+MAX_BATCH = 500
+# Failed fill transactions before a resting order is marked failed
+MAX_FILL_ATTEMPTS = 3
+# Trade.symbol / Position.symbol column width
+SYMBOL_MAX_LENGTH = 50
+
+class ExecutionError(Exception):
+    """
+    Order rejected before anything was written. `code` is the API error string.
+    """
+
+    def __init__(self, code):
+        super().__init__(code)
+        self.code = code
+
+def begin_write():
+    """
+    Open the write transaction up front so concurrent orders serialise instead
+    of interleaving. SQLite: BEGIN IMMEDIATE takes the database write lock now
+    rather than at the first INSERT. Postgres relies on the SELECT ... FOR UPDATE
+    row locks taken while loading.
+    """
+    conn = db.session.connection()
+    if conn.dialect.name == "sqlite":
+        dbapi_conn = conn.connection.dbapi_connection
+        if not dbapi_conn.in_transaction:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+def net_position(pos, user_challenge_id, symbol, side, quantity, price):
+    """
+    Apply one fill to the symbol's position. Returns (position or None, realized pnl).
+    Closing more than the open quantity only closes the position (no flip).
+    """
+    pnl = 0.0
+    opposite = "short" if side == "buy" else "long"
+    direction = "long" if side == "buy" else "short"
+    if pos and pos.side == opposite:
+        close_qty = min(quantity, pos.quantity)
+        if pos.side == "long":
+            pnl = (price - pos.avg_price) * close_qty
+        else:
+            pnl = (pos.avg_price - price) * close_qty
+        pos.quantity -= close_qty
+        if pos.quantity == 0:
+            if pos in db.session.new:
+                # Opened and closed within the same batch: never written
+                db.session.expunge(pos)
+            else:
+                # Flush the DELETE now so a later reopen in the same transaction
+                # doesn't INSERT the (challenge, symbol) row before it is removed
+                db.session.delete(pos)
+                db.session.flush()
+    else:
+        if pos:
+            new_qty = pos.quantity + quantity
+            pos.avg_price = (pos.avg_price * pos.quantity + price * quantity) / new_qty
+            pos.quantity = new_qty
+            pos.side = direction
+        else:
+            pos = Position(user_challenge_id=user_challenge_id, symbol=symbol, quantity=quantity, avg_price=price, side=direction)
+            db.session.add(pos)
+    return pos, pnl
+
+def load_for_update(user_challenge_id):
+    """
+    Lock and load the challenge with its plan and all open positions.
+    """
+    begin_write()
+    row = db.session.query(UserChallenge, ChallengePlan)\
+        .join(ChallengePlan, ChallengePlan.id == UserChallenge.challenge_id)\
+        .filter(UserChallenge.id == user_challenge_id)\
+        .with_for_update(of=UserChallenge).first()
+    if not row:
+        return None, None, {}
+    uc, plan = row
+    positions = db.session.query(Position).filter_by(user_challenge_id=uc.id).with_for_update().all()
+    return uc, plan, {p.symbol: p for p in positions}
+
+def fill(uc, positions, symbol, side, quantity, price, now=None, stat=True):
+    """
+    Net one order into an already locked challenge and record the trade.
+    Does not commit and does not re-evaluate rules.
+    """
+    pos = positions.get(symbol)
+    cash_before = position_cash(pos)
+    pos, pnl = net_position(pos, uc.id, symbol, side, quantity, price)
+    if pos is not None and pos.quantity > 0:
+        positions[symbol] = pos
+    else:
+        positions.pop(symbol, None)
+    now = now or datetime.utcnow()
+    t = Trade(user_challenge_id=uc.id, symbol=symbol, side=side, quantity=quantity, price=price, pnl=pnl,
+              timestamp=now)
+    db.session.add(t)
+    record_trade(uc, pnl, cash_before, position_cash(pos), stat=stat, when=now)
+    return t
+
+def market_prices(symbols):
+    """
+    Snapshot prices to fill market orders at. Symbols with no real quote (the
+    simulated fallback) are left out, and their orders are rejected.
+    """
+    quotes = PriceService.get_quotes(symbols) if symbols else {}
+    return {s: q["price"] for s, q in quotes.items() if q["source"] != "simulated"}
+
+def validate_price(price):
+    if not isinstance(price, (int, float)) or not math.isfinite(price) or price <= 0:
+        raise ExecutionError("invalid_price")
+
+def validate_order(symbol, side, quantity):
+    if not isinstance(symbol, str) or not symbol.strip() or len(symbol) > SYMBOL_MAX_LENGTH:
+        raise ExecutionError("invalid_symbol")
+    if side not in ("buy", "sell"):
+        raise ExecutionError("invalid_side")
+    if not isinstance(quantity, (int, float)) or not math.isfinite(quantity) or quantity <= 0:
+        raise ExecutionError("invalid_quantity")
+
+@retry_on_busy
+def execute_order(user_challenge_id, symbol, side, quantity, price, now=None):
+    """
+    Net the position, write the trade, update the ledger aggregates and apply
+    the challenge rules in one transaction with one commit. Equity itself is
+    re-marked by the summary and the risk sweep, as before. `now` defaults to
+    the wall clock (the replay harness passes its own).
+    """
+    validate_order(symbol, side, quantity)
+    validate_price(price)
+    try:
+        uc, plan, positions = load_for_update(user_challenge_id)
+        if not uc or uc.status != "active":
+            raise ExecutionError("invalid")
+        ensure_ledger(uc, plan)
+        now = now or datetime.utcnow()
+        t = fill(uc, positions, symbol, side, quantity, price, now=now)
+        metrics = apply_rules(uc, plan, now)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return t, uc, metrics
+
+def _parse_order(order):
+    if not isinstance(order, dict):
+        raise ExecutionError("invalid_symbol")
+    try:
+        quantity = float(order.get("quantity", 0))
+    except (TypeError, ValueError):
+        raise ExecutionError("invalid_quantity")
+    side = order.get("side")
+    validate_order(order.get("symbol"), side, quantity)
+    price = order.get("price")
+    if price is not None:
+        try:
+            price = float(price)
+        except (TypeError, ValueError):
+            price = None
+    if price is not None:
+        validate_price(price)
+    return order["symbol"], side, quantity, price
+
+@retry_on_busy
+def execute_batch(user_challenge_id, orders):
+    """
+    Fill a list of orders for one challenge in submission order: prices are
+    resolved in one PriceService call, positions are netted in memory under a
+    single lock, the monthly stat is upserted once, rules run once at the end
+    and everything commits together.
+
+    Returns (results, uc, metrics); results holds one entry per order, either
+    {"index", "status": "ok", "trade_id", "price", "pnl"} or
+    {"index", "status": "rejected", "error"}. Rejected orders don't abort the batch.
+    """
+    if not isinstance(orders, list) or not orders or len(orders) > MAX_BATCH:
+        raise ExecutionError("invalid_orders")
+    results = [None] * len(orders)
+    parsed = []
+    for i, order in enumerate(orders):
+        try:
+            parsed.append((i,) + _parse_order(order))
+        except ExecutionError as e:
+            results[i] = {"index": i, "status": "rejected", "error": e.code}
+    # Market orders take the current snapshot price, fetched before the lock
+    quotes = market_prices(sorted({symbol for _, symbol, _, _, price in parsed if price is None}))
+    priced = []
+    for i, symbol, side, quantity, price in parsed:
+        if price is None and symbol not in quotes:
+            results[i] = {"index": i, "status": "rejected", "error": "price_unavailable"}
+        else:
+            priced.append((i, symbol, side, quantity, quotes[symbol] if price is None else price))
+
+    filled = []
+    try:
+        uc, plan, positions = load_for_update(user_challenge_id)
+        if not uc or uc.status != "active":
+            raise ExecutionError("invalid")
+        ensure_ledger(uc, plan)
+        now = datetime.utcnow()
+        for i, symbol, side, quantity, price in priced:
+            filled.append((i, fill(uc, positions, symbol, side, quantity, price, now=now, stat=False)))
+        if filled:
+            record_trade_stat(uc, sum(t.pnl for _, t in filled), now, count=len(filled))
+        metrics = apply_rules(uc, plan, now)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    for i, t in filled:
+        results[i] = {"index": i, "status": "ok", "trade_id": t.id, "price": t.price, "pnl": t.pnl}
+    return results, uc, metrics
+
+def fill_pending(order_ids, prices, now=None):
+    """
+    Fill triggered resting orders at the tick price, one locked transaction per
+    challenge. Each order is claimed with a conditional status='open' update, so
+    one cancelled meanwhile or filled by another worker is skipped. Orders on
+    challenges that are no longer active are cancelled.
+    A transaction that raises counts an attempt on its orders (see
+    _record_fill_failure); after MAX_FILL_ATTEMPTS they are marked failed.
+    Returns (fill count, rows of orders whose transaction failed and should rest again).
+    """
+    rows = db.session.query(
+        PendingOrder.id, PendingOrder.user_challenge_id, PendingOrder.symbol, PendingOrder.side,
+        PendingOrder.order_type, PendingOrder.trigger_price, PendingOrder.quantity
+    ).filter(PendingOrder.id.in_(order_ids), PendingOrder.status == "open")\
+     .order_by(PendingOrder.id).all()
+    by_challenge = {}
+    for r in rows:
+        by_challenge.setdefault(r.user_challenge_id, []).append(r)
+
+    table = PendingOrder.__table__
+    claim = update(table).where(table.c.id == bindparam("b_id"), table.c.status == "open")
+    link = update(table).where(table.c.id == bindparam("b_id")).values(trade_id=bindparam("b_trade_id"))
+    total = 0
+    failed = []
+    for uc_id, orders in by_challenge.items():
+        try:
+            uc, plan, positions = load_for_update(uc_id)
+            if not uc or uc.status != "active":
+                db.session.execute(claim.values(status="cancelled"), [{"b_id": o.id} for o in orders])
+                db.session.commit()
+                continue
+            ensure_ledger(uc, plan)
+            at = now or datetime.utcnow()
+            filled = []
+            for o in orders:
+                price = prices[o.symbol]
+                res = db.session.execute(claim.values(status="filled", filled_at=at, fill_price=price), {"b_id": o.id})
+                if res.rowcount != 1:
+                    continue
+                filled.append((o.id, fill(uc, positions, o.symbol, o.side, o.quantity, price, now=at, stat=False)))
+            if filled:
+                record_trade_stat(uc, sum(t.pnl for _, t in filled), at, count=len(filled))
+                db.session.flush()
+                db.session.execute(link, [{"b_id": oid, "b_trade_id": t.id} for oid, t in filled])
+            apply_rules(uc, plan, at)
+            db.session.commit()
+            total += len(filled)
+        except Exception:
+            db.session.rollback()
+            logger.exception("Order fill failed for challenge %s", uc_id)
+            Metrics.inc("order_fill_errors_total")
+            failed.extend(_record_fill_failure(orders))
+    return total, failed
+
+def _record_fill_failure(orders):
+    """
+    Count a failed fill on each order and mark those out of attempts as
+    failed, so a fill that can never succeed stops being retried every tick.
+    Returns the orders that should rest again.
+    """
+    table = PendingOrder.__table__
+    ids = [o.id for o in orders]
+    attempts = table.c.fill_attempts + 1
+    try:
+        db.session.execute(update(table).where(table.c.id.in_(ids), table.c.status == "open").values(
+            fill_attempts=attempts,
+            status=case((attempts >= MAX_FILL_ATTEMPTS, "failed"), else_=table.c.status)))
+        gave_up = {r.id for r in db.session.query(PendingOrder.id)
+                   .filter(PendingOrder.id.in_(ids), PendingOrder.status == "failed")}
+        db.session.commit()
+    except Exception:
+        # Can't even count it (database unavailable): rest them and retry next tick
+        db.session.rollback()
+        return list(orders)
+    if gave_up:
+        logger.warning("Gave up filling orders %s after %d attempts", sorted(gave_up), MAX_FILL_ATTEMPTS)
+        Metrics.inc("order_fill_abandoned_total", len(gave_up))
+    return [o for o in orders if o.id not in gave_up]
@@ -0,0 +1,141 @@
+import math
+from collections import deque
+from typing import Dict, List
+import numpy as np
+from .bar_store import BarStore
+
+MA_WINDOW = 20
+EMA_SPAN = 20
+RSI_PERIOD = 14
+
+class IndicatorState:
+    """
+    Rolling MA/EMA/RSI/volatility over daily closes. push() folds in one new
+    bar in O(1); preview() evaluates the indicators for a live price as if it
+    were the next close, without changing the state.
+    """
+
+    def __init__(self):
+        self.window = deque(maxlen=MA_WINDOW)
+        self.sum = 0.0
+        self.sumsq = 0.0
+        self.ema = None
+        self.alpha = 2.0 / (EMA_SPAN + 1)
+        self.avg_gain = None
+        self.avg_loss = None
+        self.seed_changes = []
+        self.last_close = None
+        self.count = 0
+        self.last_day = None
+
+    def push(self, close, day=None):
+        if len(self.window) == self.window.maxlen:
+            old = self.window[0]
+            self.sum -= old
+            self.sumsq -= old * old
+        self.window.append(close)
+        self.sum += close
+        self.sumsq += close * close
+
+        self.ema = close if self.ema is None else self.alpha * close + (1 - self.alpha) * self.ema
+
+        if self.last_close is not None:
+            change = close - self.last_close
+            if self.avg_gain is None:
+                # Wilder's RSI: seed with a simple average of the first RSI_PERIOD changes
+                self.seed_changes.append(change)
+                if len(self.seed_changes) == RSI_PERIOD:
+                    self.avg_gain = sum(max(c, 0.0) for c in self.seed_changes) / RSI_PERIOD
+                    self.avg_loss = sum(max(-c, 0.0) for c in self.seed_changes) / RSI_PERIOD
+                    self.seed_changes = []
+            else:
+                self.avg_gain = (self.avg_gain * (RSI_PERIOD - 1) + max(change, 0.0)) / RSI_PERIOD
+                self.avg_loss = (self.avg_loss * (RSI_PERIOD - 1) + max(-change, 0.0)) / RSI_PERIOD
+        self.last_close = close
+        self.count += 1
+        if day is not None:
+            self.last_day = day
+
+    def preview(self, price):
+        """
+        Indicators with `price` standing in for the next close. O(1).
+        """
+        n = len(self.window)
+        if n == 0:
+            return {"ma20": price, "ema20": price, "rsi14": None, "volatility": None}
+        total, total_sq = self.sum, self.sumsq
+        if n == self.window.maxlen:
+            old = self.window[0]
+            total -= old
+            total_sq -= old * old
+        else:
+            n += 1
+        total += price
+        total_sq += price * price
+        ma = total / n
+        var = max(total_sq / n - ma * ma, 0.0)
+        ema = self.alpha * price + (1 - self.alpha) * self.ema
+
+        rsi = None
+        if self.avg_gain is not None:
+            change = price - self.last_close
+            gain = (self.avg_gain * (RSI_PERIOD - 1) + max(change, 0.0)) / RSI_PERIOD
+            loss = (self.avg_loss * (RSI_PERIOD - 1) + max(-change, 0.0)) / RSI_PERIOD
+            rsi = 100.0 if loss == 0 else 100.0 - 100.0 / (1 + gain / loss)
+        return {
+            "ma20": ma,
+            "ema20": ema,
+            "rsi14": rsi,
+            # Relative standard deviation of the window, in percent
+            "volatility": math.sqrt(var) / ma * 100 if ma else None,
+        }
+
+class IndicatorEngine:
+    # symbol -> IndicatorState, advanced incrementally as BarStore gains bars
+    _states: Dict[str, IndicatorState] = {}
+
+    @classmethod
+    def state(cls, symbol) -> IndicatorState:
+        days, closes = BarStore.get(symbol)
+        st = cls._states.get(symbol)
+        if st is None:
+            st = cls._states[symbol] = IndicatorState()
+        # Fold in only the bars this state hasn't seen yet
+        start = 0
+        if st.last_day is not None:
+            start = int(np.searchsorted(days, st.last_day, side="right"))
+        for i in range(start, len(days)):
+            st.push(float(closes[i]), days[i])
+        return st
+
+    @classmethod
+    def signals(cls, symbols: List[str], prices: Dict[str, float]) -> List[dict]:
+        """
+        Signals for a whole watchlist: indicator snapshots are gathered per
+        symbol, then the decision rule runs once over arrays.
+        """
+        states = [cls.state(s) for s in symbols]
+        snaps = [st.preview(prices[s]) if st.count else None for st, s in zip(states, symbols)]
+        price = np.array([prices[s] for s in symbols], dtype=np.float64)
+        ma = np.array([snap["ma20"] if snap else p for snap, p in zip(snaps, price)], dtype=np.float64)
+
+        action = np.where(price > ma, "BUY", np.where(price < ma, "SELL", "HOLD"))
+        confidence = np.minimum(100, np.round(np.abs(price - ma) / np.where(ma == 0, 1, ma) * 100))
+
+        out = []
+        for i, symbol in enumerate(symbols):
+            snap = snaps[i]
+            if snap is None:
+                out.append({"symbol": symbol, "action": "HOLD", "confidence": 0, "ma20": float(price[i]), "price": float(price[i])})
+                continue
+            out.append({
+                "symbol": symbol,
+                "action": str(action[i]),
+                "confidence": int(confidence[i]),
+                "ma20": float(ma[i]),
+                "ema20": snap["ema20"],
+                "rsi14": round(snap["rsi14"], 2) if snap["rsi14"] is not None else None,
+                "volatility": round(snap["volatility"], 3) if snap["volatility"] is not None else None,
+                "price": float(price[i])
+            })
+        return out
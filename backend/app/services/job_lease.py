@@ -0,0 +1,33 @@
+import os
+import socket
+from datetime import datetime, timedelta
+from sqlalchemy import DateTime, bindparam, text
+from ..db import db
+
+# Leases for jobs that every gunicorn worker schedules but only one should run
+# per interval. They live in the application database, so they hold across
+# processes and hosts whatever the price cache backend is.
+
+# Takes a free or expired lease, or renews our own; same statement on SQLite (3.24+) and Postgres
+_CLAIM = text(
+    "INSERT INTO job_lease (name, owner, expires_at) VALUES (:name, :owner, :expires) "
+    "ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+    "WHERE job_lease.expires_at < :now OR job_lease.owner = excluded.owner"
+).bindparams(bindparam("now", type_=DateTime), bindparam("expires", type_=DateTime))
+
+def claim(name, ttl: timedelta) -> bool:
+    """
+    Try to hold the `name` lease for `ttl`. Commits. Needs an app context.
+    The lease is not released when the job finishes: holding it for the rest
+    of the interval keeps the other workers from running the job again.
+    """
+    now = datetime.utcnow()
+    # Read per call: workers forked from a preloaded app share the import-time pid
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    try:
+        res = db.session.execute(_CLAIM, {"name": name, "owner": owner, "now": now, "expires": now + ttl})
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return res.rowcount == 1
@@ -0,0 +1,140 @@
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import event, func, text
+from sqlalchemy.orm import Session
+from ..db import db
+from ..models import User, UserChallenge, ChallengePlan, Trade, MonthlyStat
+
+# month -> (computed_at, top N rows). Dropped whenever a trade lands in this
+# process; the TTL bounds how stale another worker's copy can get.
+_top_cache = {}
+_cache_lock = threading.Lock()
+CACHE_TTL = 30
+TOP_N = 10
+
+def month_key(when=None):
+    return (when or datetime.utcnow()).strftime('%Y-%m')
+
+def _month_bounds(month_str):
+    start = datetime.strptime(month_str, '%Y-%m')
+    end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+    return start, end
+
+# Same statement on SQLite (3.24+) and Postgres. Kept as text because the dialect
+# insert().on_conflict_do_update() constructs have no cache key in SQLAlchemy 2.0,
+# so they were recompiled on every single trade.
+_UPSERT_STAT = text(
+    "INSERT INTO monthly_stat (month, user_challenge_id, user_id, starting_balance, pnl, trade_count) "
+    "VALUES (:month, :uc_id, :user_id, "
+    "(SELECT starting_balance FROM challenge_plan WHERE id = :plan_id), :pnl, :count) "
+    "ON CONFLICT (month, user_challenge_id) DO UPDATE SET "
+    "pnl = monthly_stat.pnl + excluded.pnl, trade_count = monthly_stat.trade_count + excluded.trade_count"
+)
+
+def record_trade_stat(uc, pnl, when=None, count=1):
+    """
+    Add `count` trades totalling `pnl` to the (month, challenge) aggregate. Runs inside the caller's
+    transaction; the upsert is native on both SQLite and Postgres.
+    """
+    month = month_key(when)
+    db.session.execute(_UPSERT_STAT, {"month": month, "uc_id": uc.id, "user_id": uc.user_id,
+                                      "plan_id": uc.challenge_id, "pnl": pnl, "count": count})
+    # Dropped from the cache once the transaction commits
+    db.session.info.setdefault("leaderboard_months", set()).add(month)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    for month in session.info.pop("leaderboard_months", ()):
+        invalidate(month)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop("leaderboard_months", None)
+
+def invalidate(month=None):
+    with _cache_lock:
+        if month is None:
+            _top_cache.clear()
+        else:
+            _top_cache.pop(month, None)
+
+def rebuild_month(month_str):
+    """
+    Recompute a month's aggregates from the trade table (backfill / repair).
+    Uses a plain timestamp range so it stays portable and index-friendly.
+    """
+    start, end = _month_bounds(month_str)
+    db.session.query(MonthlyStat).filter(MonthlyStat.month == month_str).delete()
+    rows = db.session.query(
+        Trade.user_challenge_id,
+        UserChallenge.user_id,
+        ChallengePlan.starting_balance,
+        func.coalesce(func.sum(Trade.pnl), 0.0),
+        func.count(Trade.id)
+    ).join(UserChallenge, Trade.user_challenge_id == UserChallenge.id)\
+     .join(ChallengePlan, UserChallenge.challenge_id == ChallengePlan.id)\
+     .filter(Trade.timestamp >= start, Trade.timestamp < end)\
+     .group_by(Trade.user_challenge_id, UserChallenge.user_id, ChallengePlan.starting_balance).all()
+    db.session.add_all([
+        MonthlyStat(month=month_str, user_challenge_id=uc_id, user_id=user_id,
+                    starting_balance=balance, pnl=float(pnl), trade_count=count)
+        for uc_id, user_id, balance, pnl, count in rows
+    ])
+    db.session.commit()
+    invalidate(month_str)
+    return len(rows)
+
+def _mask_email(email):
+    # Mask email for privacy (bilal***@gmail.com)
+    name_parts = email.split('@')
+    if len(name_parts[0]) > 3:
+        return name_parts[0][:3] + "***@" + name_parts[1]
+    return email
+
+def _compute_top(month_str):
+    # One row per user: a user with several challenges this month is combined
+    results = db.session.query(
+        User.email,
+        func.sum(MonthlyStat.pnl),
+        func.sum(MonthlyStat.starting_balance),
+        func.sum(MonthlyStat.trade_count)
+    ).join(User, MonthlyStat.user_id == User.id)\
+     .filter(MonthlyStat.month == month_str)\
+     .group_by(User.email).all()
+
+    leaderboard = []
+    for email, pnl, balance, count in results:
+        if not email:
+            continue
+        pnl = float(pnl or 0.0)
+        balance = float(balance or 0.0)
+        profit_pct = (pnl / balance) * 100 if balance > 0 else 0.0
+        leaderboard.append({
+            'user_name': _mask_email(email),
+            'profit_percent': round(profit_pct, 2),
+            'total_pnl': round(pnl, 2),
+            'trades_count': int(count or 0)
+        })
+
+    # Sort by Profit % Descending and Top N
+    leaderboard.sort(key=lambda x: x['profit_percent'], reverse=True)
+    top = leaderboard[:TOP_N]
+    for idx, item in enumerate(top):
+        item['rank'] = idx + 1
+    return top
+
+def get_top(month_str=None):
+    month_str = month_str or month_key()
+    now = time.monotonic()
+    with _cache_lock:
+        cached = _top_cache.get(month_str)
+    if cached and now - cached[0] < CACHE_TTL:
+        return cached[1]
+
+    # Trades predating the aggregate table were backfilled by migration 0007
+    top = _compute_top(month_str)
+
+    with _cache_lock:
+        _top_cache[month_str] = (now, top)
+    return top
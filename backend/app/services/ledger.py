@@ -0,0 +1,45 @@
+from sqlalchemy import func
+from ..db import db
+from ..models import ChallengePlan, Trade, Position
+from .leaderboard_service import record_trade_stat
+
+# Running per-challenge aggregates (realized PnL, cash balance, trade count) so the
+# summary never has to rescan the whole trade history.
+
+def position_cash(pos):
+    """
+    Cash tied up by an open position: buying a long spends cash, opening a short receives it.
+    """
+    if pos is None or not pos.quantity:
+        return 0.0
+    value = pos.avg_price * pos.quantity
+    return -value if pos.side == "long" else value
+
+def ensure_ledger(uc, plan=None):
+    """
+    Backfill the aggregates for challenges created before the ledger existed.
+    Runs the full scan once; afterwards the running totals are kept by record_trade.
+    """
+    if uc.cash_balance is not None and uc.trade_count is not None and uc.realized_pnl is not None:
+        return
+    plan = plan or db.session.get(ChallengePlan, uc.challenge_id)
+    realized, count = db.session.query(
+        func.coalesce(func.sum(Trade.pnl), 0.0), func.count(Trade.id)
+    ).filter(Trade.user_challenge_id == uc.id).one()
+    positions = db.session.query(Position).filter_by(user_challenge_id=uc.id).all()
+    uc.realized_pnl = float(realized)
+    uc.trade_count = int(count)
+    uc.cash_balance = plan.starting_balance + uc.realized_pnl + sum(position_cash(p) for p in positions)
+
+def record_trade(uc, pnl, cash_before, cash_after, stat=True, when=None):
+    """
+    Fold one fill into the running aggregates. The caller holds the challenge
+    row lock (see execution.load_for_update), so plain arithmetic is safe.
+    Call ensure_ledger before the position is modified. Batches pass stat=False
+    and add the monthly aggregate once for all fills.
+    """
+    uc.realized_pnl += pnl
+    uc.cash_balance += pnl + (cash_after - cash_before)
+    uc.trade_count += 1
+    if stat:
+        record_trade_stat(uc, pnl, when)
@@ -0,0 +1,245 @@
+import json
+import threading
+import time
+import zlib
+from typing import Dict, Iterable, Optional
+import numpy as np
+
+# Simulated trading seconds per year (252 sessions of 6.5h); vol and drift are annual
+YEAR_SECONDS = 252 * 6.5 * 3600
+
+# symbol -> price, annual vol, correlation group, loading on the group factor.
+# Missing keys fall back to DEFAULT_PROFILE.
+DEFAULT_PROFILES = {
+    "AAPL": {"price": 190.0, "vol": 0.28, "group": "us_tech", "beta": 0.7},
+    "TSLA": {"price": 220.0, "vol": 0.55, "group": "us_tech", "beta": 0.5},
+    "NVDA": {"price": 500.0, "vol": 0.50, "group": "us_tech", "beta": 0.7},
+    "AMD": {"price": 110.0, "vol": 0.50, "group": "us_tech", "beta": 0.7},
+    "GOOG": {"price": 140.0, "vol": 0.30, "group": "us_tech", "beta": 0.7},
+    "MSFT": {"price": 370.0, "vol": 0.25, "group": "us_tech", "beta": 0.75},
+    "AMZN": {"price": 150.0, "vol": 0.33, "group": "us_tech", "beta": 0.7},
+    "EURUSD": {"price": 1.09, "vol": 0.07, "group": "usd", "beta": 0.6, "jump_rate": 2.0},
+    "GBPUSD": {"price": 1.27, "vol": 0.08, "group": "usd", "beta": 0.6, "jump_rate": 2.0},
+}
+DEFAULT_PROFILE = {
+    "price": 100.0, "vol": 0.30, "drift": 0.0, "group": "equity", "beta": 0.5,
+    # Jumps per year and log jump size mean/std (Merton)
+    "jump_rate": 5.0, "jump_mean": 0.0, "jump_std": 0.02,
+}
+
+def _key(name):
+    return zlib.crc32(name.encode())
+
+class MarketSimulator:
+    """
+    Correlated GBM-with-jumps price model, generated in NumPy blocks and
+    served from a two-block ring buffer (the current block and the next one,
+    generated ahead). Correlation is one factor per group:
+    z = beta * group_factor + sqrt(1 - beta^2) * noise.
+
+    Every block's random draws are seeded from (SEED, block, group or
+    symbol), so a given seed reproduces the same returns whatever the order
+    symbols join in. A symbol joins at its anchor price (the last market
+    price, or its profile price) and rebase() re-anchors it when a real quote
+    arrives.
+
+    With TICK_SECONDS > 0 the simulation follows the wall clock, one step
+    per TICK_SECONDS counted from the Unix epoch, so every worker with the
+    same SEED is on the same step (and, anchored from the shared price cache,
+    at the same price). Without SIM_SEED the seed is derived from the
+    database URL, which all workers of a deployment share. With
+    TICK_SECONDS = 0 it only moves on advance(), for replays and load tests
+    that drive ticks as fast as they like.
+    """
+    SEED = 0
+    TICK_SECONDS = 1.0
+    BLOCK = 4096
+    # Longer idle gaps are skipped rather than simulated step by step
+    MAX_CATCHUP_BLOCKS = 64
+    PROFILES = DEFAULT_PROFILES
+    _lock = threading.RLock()
+    _state = None
+
+    @classmethod
+    def configure(cls, app_config):
+        seed = app_config.get("SIM_SEED")
+        cls.SEED = int(seed) if seed not in (None, "") else _key(app_config.get("SQLALCHEMY_DATABASE_URI") or "")
+        cls.TICK_SECONDS = float(app_config.get("SIM_TICK_SECONDS", cls.TICK_SECONDS))
+        cls.BLOCK = int(app_config.get("SIM_BLOCK", cls.BLOCK))
+        cls.PROFILES = dict(DEFAULT_PROFILES)
+        path = app_config.get("SIM_PROFILES_PATH")
+        if path:
+            with open(path) as f:
+                for symbol, profile in json.load(f).items():
+                    cls.PROFILES[symbol] = {**cls.PROFILES.get(symbol, {}), **profile}
+        cls.reset()
+
+    @classmethod
+    def reset(cls, seed=None):
+        """
+        Drop every symbol and restart at step 0 (with `seed` if given).
+        """
+        with cls._lock:
+            if seed is not None:
+                cls.SEED = seed
+            step = cls._clock_step()
+            cls._state = {
+                "symbols": [], "index": {}, "groups": [],
+                # Per-symbol parameters, one entry per column
+                "drift": np.empty(0), "vol": np.empty(0), "beta": np.empty(0), "group": np.empty(0, int),
+                "jump_rate": np.empty(0), "jump_mean": np.empty(0), "jump_std": np.empty(0),
+                "scale": np.empty(0),
+                # Log price paths: ring[b % 2] holds block b, shape (BLOCK, symbols)
+                "ring": np.zeros((2, cls.BLOCK, 0)),
+                "step": step, "block": step // cls.BLOCK,
+            }
+
+    @classmethod
+    def _clock_step(cls):
+        return int(time.time() / cls.TICK_SECONDS) if cls.TICK_SECONDS > 0 else 0
+
+    @classmethod
+    def _profile(cls, symbol):
+        return {**DEFAULT_PROFILE, **cls.PROFILES.get(symbol, {})}
+
+    @classmethod
+    def _returns(cls, block, columns, state=None):
+        """
+        Log returns of block `block` for the given columns, shape (BLOCK, len(columns)).
+        """
+        s = state or cls._state
+        n = cls.BLOCK
+        dt = (cls.TICK_SECONDS or 1.0) / YEAR_SECONDS
+        columns = np.asarray(columns, dtype=int)
+        groups = np.unique(s["group"][columns])
+        factors = np.empty((n, len(s["groups"])))
+        for g in groups:
+            factors[:, g] = np.random.default_rng([cls.SEED, block, 1, _key(s["groups"][g])]).standard_normal(n)
+        noise = np.empty((n, len(columns)))
+        jumps = np.empty((n, len(columns)))
+        for j, col in enumerate(columns):
+            rng = np.random.default_rng([cls.SEED, block, 2, _key(s["symbols"][col])])
+            noise[:, j] = rng.standard_normal(n)
+            count = rng.poisson(s["jump_rate"][col] * dt, n)
+            jumps[:, j] = count * s["jump_mean"][col] + np.sqrt(count) * s["jump_std"][col] * rng.standard_normal(n)
+        beta = s["beta"][columns]
+        z = beta * factors[:, s["group"][columns]] + np.sqrt(1.0 - beta ** 2) * noise
+        vol = s["vol"][columns]
+        rate, mean, std = s["jump_rate"][columns], s["jump_mean"][columns], s["jump_std"][columns]
+        # Compensate the jumps so the drift is the expected return
+        compensator = rate * (np.exp(mean + 0.5 * std ** 2) - 1.0)
+        return (s["drift"][columns] - 0.5 * vol ** 2 - compensator) * dt + vol * np.sqrt(dt) * z + jumps
+
+    @classmethod
+    def _generate(cls, block, start):
+        """
+        Fill the ring slot of `block` continuing from log prices `start`.
+        """
+        s = cls._state
+        s["ring"][block % 2] = start + np.cumsum(cls._returns(block, range(len(s["symbols"]))), axis=0)
+
+    @classmethod
+    def _add(cls, symbols, anchors):
+        """
+        Add new columns. Everything is built on a copy of the state and swapped
+        in at the end, so a failure leaves the simulator as it was.
+        """
+        old = cls._state
+        new = [sym for sym in dict.fromkeys(symbols) if sym not in old["index"]]
+        if not new:
+            return
+        s = {**old, "symbols": list(old["symbols"]), "index": dict(old["index"]), "groups": list(old["groups"])}
+        first = len(s["symbols"])
+        params = {k: [] for k in ("drift", "vol", "beta", "group", "jump_rate", "jump_mean", "jump_std")}
+        for sym in new:
+            p = cls._profile(sym)
+            if p["group"] not in s["groups"]:
+                s["groups"].append(p["group"])
+            s["index"][sym] = len(s["symbols"])
+            s["symbols"].append(sym)
+            params["group"].append(s["groups"].index(p["group"]))
+            params["beta"].append(min(max(float(p["beta"]), -1.0), 1.0))
+            for k in ("drift", "vol", "jump_rate", "jump_mean", "jump_std"):
+                params[k].append(float(p[k]))
+        for k, values in params.items():
+            s[k] = np.concatenate([s[k], np.asarray(values, dtype=s[k].dtype)])
+        # Paths of the new columns for the current and the buffered next block, from log price 0
+        columns = list(range(first, len(s["symbols"])))
+        current = np.cumsum(cls._returns(s["block"], columns, s), axis=0)
+        ahead = current[-1] + np.cumsum(cls._returns(s["block"] + 1, columns, s), axis=0)
+        ring = np.zeros((2, cls.BLOCK, len(s["symbols"])))
+        ring[:, :, :first] = s["ring"]
+        ring[s["block"] % 2, :, first:] = current
+        ring[(s["block"] + 1) % 2, :, first:] = ahead
+        s["ring"] = ring
+        row = current[s["step"] % cls.BLOCK]
+        anchor = np.asarray([(anchors or {}).get(sym) or cls._profile(sym)["price"] for sym in new], dtype=float)
+        s["scale"] = np.concatenate([s["scale"], anchor / np.exp(row)])
+        cls._state = s
+
+    @classmethod
+    def advance(cls, steps: int = 1) -> int:
+        """
+        Move the simulation `steps` ticks forward. Returns the new step index.
+        """
+        with cls._lock:
+            if cls._state is None:
+                cls.reset()
+            s = cls._state
+            target = s["step"] + steps
+            target_block = target // cls.BLOCK
+            if target_block - s["block"] > cls.MAX_CATCHUP_BLOCKS:
+                # Fast-forward: carry the current prices over instead of walking the gap
+                last = s["ring"][s["block"] % 2][s["step"] % cls.BLOCK]
+                s["block"] = target_block - 1
+                cls._generate(s["block"], last)
+                cls._generate(s["block"] + 1, s["ring"][s["block"] % 2][-1])
+            while s["block"] < target_block:
+                s["block"] += 1
+                # The new current block was generated ahead; generate the one after it
+                cls._generate(s["block"] + 1, s["ring"][s["block"] % 2][-1])
+            s["step"] = target
+            return target
+
+    @classmethod
+    def _sync(cls):
+        if cls.TICK_SECONDS > 0:
+            target = cls._clock_step()
+            if target > cls._state["step"]:
+                cls.advance(target - cls._state["step"])
+
+    @classmethod
+    def prices(cls, symbols: Iterable[str], anchors: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+        """
+        Current simulated prices. Unknown symbols join at `anchors[symbol]`
+        when given, else at their profile price.
+        """
+        symbols = list(symbols)
+        if not all(isinstance(sym, str) and sym for sym in symbols):
+            raise ValueError(f"Symbols must be non-empty strings: {symbols!r}")
+        with cls._lock:
+            if cls._state is None:
+                cls.reset()
+            cls._sync()
+            cls._add(symbols, anchors)
+            s = cls._state
+            columns = [s["index"][sym] for sym in symbols]
+            row = s["ring"][s["block"] % 2][s["step"] % cls.BLOCK, columns]
+            values = s["scale"][columns] * np.exp(row)
+        return {sym: round(float(v), 2 if v >= 10 else 5) for sym, v in zip(symbols, values)}
+
+    @classmethod
+    def price(cls, symbol: str, anchor: Optional[float] = None) -> float:
+        return cls.prices([symbol], {symbol: anchor} if anchor else None)[symbol]
+
+    @classmethod
+    def rebase(cls, symbol: str, price: float):
+        """
+        Continue a known symbol's path from `price` (a real quote). Unknown symbols are ignored.
+        """
+        with cls._lock:
+            s = cls._state
+            if s is None or symbol not in s["index"] or not price:
+                return
+            col = s["index"][symbol]
+            s["scale"][col] = price / np.exp(s["ring"][s["block"] % 2][s["step"] % cls.BLOCK, col])
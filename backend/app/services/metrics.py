@@ -0,0 +1,215 @@
+import threading
+import time
+from bisect import bisect_left
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Default latency buckets in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Queries per request
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+class Metrics:
+    """
+    Process-local counters, gauges and histograms rendered in the Prometheus
+    text format on /metrics. Each gunicorn worker keeps its own values, so
+    scrape every worker (or sum them on the Prometheus side).
+    Recording is a dict update under one lock; nothing is written to stdout.
+    """
+    ENABLED = True
+    _lock = threading.Lock()
+    _help = {}
+    _types = {}
+    # (name, labels) -> value
+    _counters = {}
+    _gauges = {}
+    # (name, labels) -> [count per bucket..., +Inf count, sum]
+    _histograms = {}
+    _buckets = {}
+
+    @classmethod
+    def configure(cls, app_config):
+        cls.ENABLED = app_config.get("METRICS_ENABLED", True)
+
+    @classmethod
+    def describe(cls, name, kind, help_text, buckets=None):
+        cls._types[name] = kind
+        cls._help[name] = help_text
+        if buckets is not None:
+            cls._buckets[name] = tuple(buckets)
+
+    @classmethod
+    def inc(cls, name, value=1, **labels):
+        if not cls.ENABLED:
+            return
+        key = (name, _labels(labels))
+        with cls._lock:
+            cls._counters[key] = cls._counters.get(key, 0) + value
+
+    @classmethod
+    def set(cls, name, value, **labels):
+        if not cls.ENABLED:
+            return
+        with cls._lock:
+            cls._gauges[(name, _labels(labels))] = value
+
+    @classmethod
+    def observe(cls, name, value, **labels):
+        if not cls.ENABLED:
+            return
+        buckets = cls._buckets.get(name, LATENCY_BUCKETS)
+        key = (name, _labels(labels))
+        with cls._lock:
+            h = cls._histograms.get(key)
+            if h is None:
+                h = cls._histograms[key] = [0] * (len(buckets) + 2)
+            h[bisect_left(buckets, value)] += 1
+            h[-1] += value
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._counters.clear()
+            cls._gauges.clear()
+            cls._histograms.clear()
+
+    @classmethod
+    def render(cls) -> str:
+        with cls._lock:
+            counters = dict(cls._counters)
+            gauges = dict(cls._gauges)
+            histograms = {k: list(v) for k, v in cls._histograms.items()}
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name in seen:
+                return
+            seen.add(name)
+            if name in cls._help:
+                lines.append(f"# HELP {name} {cls._help[name]}")
+            lines.append(f"# TYPE {name} {cls._types.get(name, kind)}")
+
+        for (name, labels), value in sorted(counters.items()):
+            header(name, "counter")
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), value in sorted(gauges.items()):
+            header(name, "gauge")
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), h in sorted(histograms.items()):
+            header(name, "histogram")
+            buckets = cls._buckets.get(name, LATENCY_BUCKETS)
+            cumulative = 0
+            for bound, count in zip(buckets, h):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+            cumulative += h[len(buckets)]
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {h[-1]}")
+            lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def init_app(cls, app):
+        """
+        Time every request and count the SQL it runs. Call inside an app
+        context after db.init_app (the engine must exist).
+        """
+        from ..db import db
+        cls.configure(app.config)
+        if not cls.ENABLED:
+            return
+        cls.set("app_info", 1, database=make_url(app.config["SQLALCHEMY_DATABASE_URI"]).get_backend_name())
+
+        @app.before_request
+        def _start_timer():
+            g._metrics_start = time.perf_counter()
+            g._metrics_sql = [0, 0.0]
+
+        @app.after_request
+        def _record_status(response):
+            g._metrics_status = response.status_code
+            return response
+
+        @app.teardown_request
+        def _observe_request(exc):
+            start = g.pop("_metrics_start", None)
+            if start is None:
+                return
+            rule = request.url_rule.rule if request.url_rule else "unmatched"
+            status = g.pop("_metrics_status", 500 if exc else 0)
+            elapsed = time.perf_counter() - start
+            cls.observe("http_request_duration_seconds", elapsed, method=request.method, endpoint=rule)
+            cls.inc("http_requests_total", method=request.method, endpoint=rule, status=status)
+            queries, sql_time = g.pop("_metrics_sql", (0, 0.0))
+            cls.observe("http_request_sql_queries", queries, endpoint=rule)
+            cls.observe("http_request_sql_seconds", sql_time, endpoint=rule)
+
+        @event.listens_for(db.engine, "before_cursor_execute")
+        def _before_cursor(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("_metrics_started", []).append(time.perf_counter())
+
+        @event.listens_for(db.engine, "after_cursor_execute")
+        def _after_cursor(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info.get("_metrics_started")
+            if not started:
+                return
+            elapsed = time.perf_counter() - started.pop()
+            verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+            if verb not in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH"):
+                verb = "OTHER"
+            cls.observe("sql_query_duration_seconds", elapsed, statement=verb)
+            if has_request_context():
+                per_request = g.get("_metrics_sql")
+                if per_request is not None:
+                    per_request[0] += 1
+                    per_request[1] += elapsed
+
+        @event.listens_for(db.engine, "handle_error")
+        def _failed_cursor(context):
+            # A failed statement never reaches after_cursor_execute: drop its start
+            # time, or the next statement on this connection would be timed from it
+            conn = context.connection
+            started = conn.info.get("_metrics_started") if conn is not None else None
+            if started:
+                started.pop()
+            cls.inc("sql_errors_total")
+
+Metrics.describe("app_info", "gauge", "Static information about this worker.")
+Metrics.describe("http_request_duration_seconds", "histogram", "Wall time per request by route.")
+Metrics.describe("http_requests_total", "counter", "Requests by route and status code.")
+Metrics.describe("http_request_sql_queries", "histogram", "SQL statements executed per request.", COUNT_BUCKETS)
+Metrics.describe("http_request_sql_seconds", "histogram", "Time spent in SQL per request.")
+Metrics.describe("sql_query_duration_seconds", "histogram", "Duration of each SQL statement by verb.")
+Metrics.describe("price_cache_requests_total", "counter", "PriceService quote lookups by result (hit, miss).")
+Metrics.describe("price_simulated_total", "counter", "Quotes answered by the simulated fallback.")
+Metrics.describe("price_upstream_fetch_seconds", "histogram", "Latency of upstream market data fetches.")
+Metrics.describe("price_upstream_symbols_total", "counter", "Symbols requested upstream by result (ok, missing).")
+Metrics.describe("price_upstream_errors_total", "counter", "Upstream market data fetches that raised.")
+Metrics.describe("order_book_fills_total", "counter", "Resting orders filled by the price feed.")
+Metrics.describe("bulk_rows_total", "counter", "Rows changed by admin bulk operations.")
+Metrics.describe("price_feed_running", "gauge", "1 while the background price feed owns quote refreshes.")
+Metrics.describe("profiler_enabled", "gauge", "1 while slow-request profiling is switched on.")
+Metrics.describe("profiler_dumps_total", "counter", "Slow-request profiles written to disk.")
+Metrics.describe("profiler_errors_total", "counter", "Profiler failures by stage (control file, dump).")
+Metrics.describe("sql_errors_total", "counter", "SQL statements that raised.")
+Metrics.describe("background_job_errors_total", "counter", "Background job runs that raised, by job.")
+Metrics.describe("order_fill_errors_total", "counter", "Resting-order fill transactions that raised.")
+Metrics.describe("order_fill_abandoned_total", "counter", "Resting orders marked failed after MAX_FILL_ATTEMPTS.")
+Metrics.describe("bar_store_errors_total", "counter", "Daily bar downloads that raised.")
+Metrics.describe("bvc_scrape_errors_total", "counter", "Casablanca scraper failures by stage (request, parse).")
+Metrics.describe("leaderboard_errors_total", "counter", "Leaderboard requests that raised.")
+Metrics.describe("auth_errors_total", "counter", "Register/login requests that raised, by endpoint.")
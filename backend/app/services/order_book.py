@@ -0,0 +1,121 @@
+import heapq
+import math
+import threading
+from typing import Dict, List, Tuple
+from ..db import db
+from ..models import PendingOrder
+from .execution import fill_pending
+
+ORDER_TYPES = ("limit", "stop", "take_profit")
+
+def fires_below(side, order_type):
+    """
+    True if the order triggers when the price falls to trigger_price or lower
+    (buy limit, buy take-profit closing a short, sell stop); False if it
+    triggers when the price rises to it.
+    """
+    if order_type == "stop":
+        return side == "sell"
+    return side == "buy"
+
+class OrderBook:
+    """
+    In-memory index of open PendingOrders, one pair of heaps per symbol:
+    a max-heap of "fires below" triggers and a min-heap of "fires above"
+    triggers. Adding is O(log n); a price tick only pops the orders it crosses.
+
+    The database stays the source of truth. Each process catches up on orders
+    created elsewhere by id (sync) and fills go through a conditional
+    status='open' update, so a cancelled or already-filled order is skipped.
+    """
+    # symbol -> heap of (-trigger, id)
+    _below: Dict[str, List[Tuple[float, int]]] = {}
+    # symbol -> heap of (trigger, id)
+    _above: Dict[str, List[Tuple[float, int]]] = {}
+    # ids still resting in this process's heaps; cancelled ones are dropped lazily on pop
+    _live = set()
+    _last_id = 0
+    _lock = threading.Lock()
+
+    @classmethod
+    def add(cls, order_id, symbol, side, order_type, trigger_price):
+        with cls._lock:
+            if order_id in cls._live:
+                return
+            cls._last_id = max(cls._last_id, order_id)
+            if not math.isfinite(trigger_price):
+                # Rows stored before triggers were validated: would never compare as crossed
+                return
+            if fires_below(side, order_type):
+                heapq.heappush(cls._below.setdefault(symbol, []), (-trigger_price, order_id))
+            else:
+                heapq.heappush(cls._above.setdefault(symbol, []), (trigger_price, order_id))
+            cls._live.add(order_id)
+
+    @classmethod
+    def discard(cls, order_id):
+        with cls._lock:
+            cls._live.discard(order_id)
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._below.clear()
+            cls._above.clear()
+            cls._live.clear()
+            cls._last_id = 0
+
+    @classmethod
+    def sync(cls) -> int:
+        """
+        Load open orders created since the last sync (by this or another worker).
+        """
+        rows = db.session.query(
+            PendingOrder.id, PendingOrder.symbol, PendingOrder.side,
+            PendingOrder.order_type, PendingOrder.trigger_price
+        ).filter(PendingOrder.status == "open", PendingOrder.id > cls._last_id)\
+         .order_by(PendingOrder.id).all()
+        for r in rows:
+            cls.add(r.id, r.symbol, r.side, r.order_type, r.trigger_price)
+        return len(rows)
+
+    @classmethod
+    def symbols(cls) -> set:
+        with cls._lock:
+            return {s for s, h in cls._below.items() if h} | {s for s, h in cls._above.items() if h}
+
+    @classmethod
+    def triggered(cls, prices: Dict[str, float]) -> List[int]:
+        """
+        Pop every resting order crossed by the given prices, oldest first per trigger level.
+        """
+        hits = []
+        with cls._lock:
+            for symbol, price in prices.items():
+                below = cls._below.get(symbol)
+                while below and -below[0][0] >= price:
+                    _, order_id = heapq.heappop(below)
+                    if order_id in cls._live:
+                        cls._live.discard(order_id)
+                        hits.append(order_id)
+                above = cls._above.get(symbol)
+                while above and above[0][0] <= price:
+                    _, order_id = heapq.heappop(above)
+                    if order_id in cls._live:
+                        cls._live.discard(order_id)
+                        hits.append(order_id)
+        return hits
+
+    @classmethod
+    def match(cls, prices: Dict[str, float], now=None) -> int:
+        """
+        Fill the orders crossed by this tick. Returns how many were filled.
+        """
+        cls.sync()
+        hits = cls.triggered(prices)
+        if not hits:
+            return 0
+        filled, failed = fill_pending(hits, prices, now)
+        for r in failed:
+            cls.add(r.id, r.symbol, r.side, r.order_type, r.trigger_price)
+        return filled
@@ -0,0 +1,83 @@
+import multiprocessing as mp
+import threading
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Run in the pool's processes: module-level so they pickle by reference
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+def _verify(stored, password):
+    return check_password_hash(stored, password)
+
+class HasherBusy(Exception):
+    """
+    Too many hash jobs in flight; the endpoint answers 503 instead of queueing.
+    """
+
+class PasswordHasher:
+    """
+    Password hashing off the request threads. scrypt/pbkdf2 are deliberately
+    CPU-heavy, so jobs go to a small process pool; at most WORKERS + MAX_QUEUE
+    jobs are admitted per app process and the rest are rejected immediately
+    (HasherBusy) so a login burst can't starve trade execution.
+    Without configure() (scripts) or with WORKERS = 0, hashing runs inline.
+    """
+    METHOD = "scrypt:32768:8:1"
+    WORKERS = 2
+    MAX_QUEUE = 32
+    TIMEOUT = 10.0
+    _pool = None
+    _slots = threading.BoundedSemaphore(WORKERS + MAX_QUEUE)
+
+    @classmethod
+    def configure(cls, app_config):
+        cls.METHOD = app_config.get("PASSWORD_HASH_METHOD", cls.METHOD)
+        cls.WORKERS = app_config.get("PASSWORD_HASH_WORKERS", cls.WORKERS)
+        cls.MAX_QUEUE = app_config.get("PASSWORD_HASH_QUEUE", cls.MAX_QUEUE)
+        cls.TIMEOUT = app_config.get("PASSWORD_HASH_TIMEOUT", cls.TIMEOUT)
+        cls._slots = threading.BoundedSemaphore(cls.WORKERS + cls.MAX_QUEUE)
+        cls.shutdown()
+        if cls.WORKERS:
+            # Started from create_app, i.e. in each gunicorn worker before the feed,
+            # stream and request threads exist, so forking here is safe and cheap
+            method = "fork" if "fork" in mp.get_all_start_methods() else "spawn"
+            cls._pool = mp.get_context(method).Pool(cls.WORKERS)
+
+    @classmethod
+    def _run(cls, fn, *args):
+        if cls._pool is None:
+            return fn(*args)
+        slots = cls._slots
+        if not slots.acquire(blocking=False):
+            raise HasherBusy()
+        # The slot belongs to the pool task, not to this request: a timed-out job
+        # keeps its worker busy, so the slot is only freed once the task finishes
+        release = lambda _: slots.release()
+        try:
+            result = cls._pool.apply_async(fn, args, callback=release, error_callback=release)
+        except Exception:
+            slots.release()
+            raise
+        try:
+            return result.get(timeout=cls.TIMEOUT)
+        except mp.TimeoutError:
+            raise HasherBusy()
+
+    @classmethod
+    def hash(cls, password) -> str:
+        return cls._run(_hash, password, cls.METHOD)
+
+    @classmethod
+    def verify(cls, stored, password) -> bool:
+        return cls._run(_verify, stored, password)
+
+    @classmethod
+    def needs_rehash(cls, stored) -> bool:
+        # Werkzeug hashes look like "<method>$<salt>$<hash>"
+        return stored.split("$", 1)[0] != cls.METHOD
+
+    @classmethod
+    def shutdown(cls):
+        if cls._pool is not None:
+            cls._pool.terminate()
+            cls._pool = None
@@ -0,0 +1,195 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# (price, fetched_at, source)
+Quote = Tuple[float, datetime, str]
+
+
+class MemoryPriceCache:
+    """
+    Default backend: plain dicts inside the current process.
+    """
+    shared = False
+
+    def __init__(self):
+        self._quotes: Dict[str, Quote] = {}
+        self._lock = threading.Lock()
+
+    def get(self, symbol: str) -> Optional[Quote]:
+        return self._quotes.get(symbol)
+
+    def get_many(self, symbols: Iterable[str]) -> Dict[str, Quote]:
+        return {s: self._quotes[s] for s in symbols if s in self._quotes}
+
+    def set(self, symbol: str, price: float, fetched_at: datetime, source: str):
+        with self._lock:
+            self._quotes[symbol] = (price, fetched_at, source)
+
+    def keys(self, prefix: str = "") -> List[str]:
+        return [s for s in list(self._quotes) if s.startswith(prefix)]
+
+    def claim(self, symbols: Iterable[str], ttl: timedelta) -> List[str]:
+        # Only one process, so nobody else can be fetching.
+        return list(symbols)
+
+    def release(self, symbols: Iterable[str]):
+        pass
+
+    def clear(self):
+        with self._lock:
+            self._quotes.clear()
+
+
+class SQLitePriceCache:
+    """
+    Shared backend for several workers on one host: quotes and fetch leases
+    live in a small SQLite file in WAL mode.
+    """
+    shared = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS quote (
+              symbol TEXT PRIMARY KEY,
+              price REAL NOT NULL,
+              fetched_at TEXT NOT NULL,
+              source TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS lease (
+              symbol TEXT PRIMARY KEY,
+              expires_at TEXT NOT NULL
+            );
+        """)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, symbol: str) -> Optional[Quote]:
+        row = self._conn().execute(
+            "SELECT price, fetched_at, source FROM quote WHERE symbol = ?", (symbol,)
+        ).fetchone()
+        return (row[0], datetime.fromisoformat(row[1]), row[2]) if row else None
+
+    def get_many(self, symbols: Iterable[str]) -> Dict[str, Quote]:
+        symbols = list(symbols)
+        if not symbols:
+            return {}
+        marks = ",".join("?" * len(symbols))
+        rows = self._conn().execute(
+            f"SELECT symbol, price, fetched_at, source FROM quote WHERE symbol IN ({marks})", symbols
+        ).fetchall()
+        return {r[0]: (r[1], datetime.fromisoformat(r[2]), r[3]) for r in rows}
+
+    def set(self, symbol: str, price: float, fetched_at: datetime, source: str):
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("INSERT OR REPLACE INTO quote VALUES (?, ?, ?, ?)",
+                         (symbol, price, fetched_at.isoformat(), source))
+
+    def keys(self, prefix: str = "") -> List[str]:
+        rows = self._conn().execute(
+            "SELECT symbol FROM quote WHERE substr(symbol, 1, ?) = ?", (len(prefix), prefix)
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def claim(self, symbols: Iterable[str], ttl: timedelta) -> List[str]:
+        """
+        Take a short lease on each symbol; returns the ones this process should fetch.
+        Symbols leased by another worker are being fetched there already.
+        """
+        now = datetime.utcnow()
+        claimed = []
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM lease WHERE expires_at < ?", (now.isoformat(),))
+            for symbol in symbols:
+                cur = conn.execute("INSERT OR IGNORE INTO lease VALUES (?, ?)",
+                                   (symbol, (now + ttl).isoformat()))
+                if cur.rowcount:
+                    claimed.append(symbol)
+        return claimed
+
+    def release(self, symbols: Iterable[str]):
+        symbols = list(symbols)
+        if not symbols:
+            return
+        marks = ",".join("?" * len(symbols))
+        self._conn().execute(f"DELETE FROM lease WHERE symbol IN ({marks})", symbols)
+
+    def clear(self):
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for table in ("quote", "lease"):
+                conn.execute(f"DELETE FROM {table}")
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent fetches of the same key inside one process: the first
+    caller runs the fetch, everyone else arriving meanwhile waits for its result.
+    """
+
+    class _Call:
+        def __init__(self):
+            self.event = threading.Event()
+            self.result = None
+
+    def __init__(self, timeout: float = 15.0):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._calls: Dict[str, "SingleFlight._Call"] = {}
+
+    def do_many(self, keys: Iterable[str], fn: Callable[[List[str]], Dict[str, float]]) -> Dict[str, float]:
+        mine, theirs = [], {}
+        with self._lock:
+            for key in keys:
+                call = self._calls.get(key)
+                if call is None:
+                    self._calls[key] = self._Call()
+                    mine.append(key)
+                else:
+                    theirs[key] = call
+
+        results: Dict[str, float] = {}
+        if mine:
+            try:
+                results = dict(fn(mine) or {})
+            finally:
+                with self._lock:
+                    for key in mine:
+                        call = self._calls.pop(key)
+                        call.result = results.get(key)
+                        call.event.set()
+
+        for key, call in theirs.items():
+            call.event.wait(self.timeout)
+            if call.result is not None:
+                results[key] = call.result
+        return results
+
+
+def make_cache(app_config) -> "MemoryPriceCache | SQLitePriceCache":
+    backend = app_config.get("PRICE_CACHE_BACKEND", "memory")
+    if backend == "sqlite":
+        return SQLitePriceCache(app_config["PRICE_CACHE_PATH"])
+    if backend != "memory":
+        raise ValueError(f"Unknown PRICE_CACHE_BACKEND: {backend}")
+    return MemoryPriceCache()
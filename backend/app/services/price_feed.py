@@ -0,0 +1,159 @@
+import logging
+import socket
+from datetime import datetime, timedelta
+from apscheduler.schedulers.background import BackgroundScheduler
+from ..db import db
+from ..models import Position, UserChallenge
+from .price_service import PriceService
+from .bvc_feed import BVCFeed
+from .bar_store import BarStore
+from .execution import market_prices
+from .order_book import OrderBook
+from .equity_series import EquitySeries
+from .metrics import Metrics
+from . import job_lease
+
+logger = logging.getLogger(__name__)
+
+class PriceFeed:
+    """
+    Background refresher that keeps PriceService's snapshot warm.
+
+    The watch-set is every symbol with an open position on an active challenge
+    or a resting order, plus every symbol requested within PriceService.WATCH_TTL. Requests then
+    read the snapshot, waiting on the upstream only for a symbol's first quote.
+    """
+    _scheduler = None
+    _app = None
+    _max_age = None
+    # job id -> seconds between runs (lease length for the singleton jobs)
+    _intervals = {}
+
+    @classmethod
+    def init_app(cls, app):
+        if not app.config.get("PRICE_FEED_ENABLED", True) or cls._scheduler is not None:
+            return
+        cls._app = app
+        interval = app.config.get("PRICE_FEED_INTERVAL", 5)
+        cls._max_age = timedelta(seconds=interval / 2)
+        PriceService.WATCH_TTL = app.config.get("PRICE_WATCH_TTL", PriceService.WATCH_TTL)
+
+        scheduler = BackgroundScheduler(daemon=True)
+        scheduler.add_job(cls.tick, "interval", seconds=interval, id="price_feed",
+                          max_instances=1, coalesce=True, next_run_time=datetime.now())
+        bvc_interval = app.config.get("BVC_REFRESH_INTERVAL", 0)
+        if bvc_interval:
+            scheduler.add_job(cls.refresh_bvc, "interval", seconds=bvc_interval, id="bvc_feed",
+                              max_instances=1, coalesce=True, next_run_time=datetime.now())
+            BVCFeed.feed_running = True
+        bar_interval = app.config.get("BAR_REFRESH_TTL", 0)
+        if bar_interval:
+            scheduler.add_job(BarStore.refresh_all, "interval", seconds=bar_interval, id="bar_store",
+                              max_instances=1, coalesce=True)
+            BarStore.feed_running = True
+        sweep_interval = app.config.get("RISK_SWEEP_INTERVAL", 0)
+        equity_interval = app.config.get("EQUITY_ROLLUP_INTERVAL", 0)
+        cls._intervals = {"risk_sweep": sweep_interval, "equity_rollup": equity_interval, "bvc_feed": bvc_interval}
+        if sweep_interval:
+            scheduler.add_job(cls.sweep_risk, "interval", seconds=sweep_interval, id="risk_sweep",
+                              max_instances=1, coalesce=True)
+        if equity_interval:
+            scheduler.add_job(cls.maintain_equity, "interval", seconds=equity_interval, id="equity_rollup",
+                              max_instances=1, coalesce=True)
+        scheduler.start()
+        cls._scheduler = scheduler
+        PriceService.feed_running = True
+
+    @classmethod
+    def shutdown(cls):
+        if cls._scheduler is not None:
+            cls._scheduler.shutdown(wait=False)
+            cls._scheduler = None
+        PriceService.feed_running = False
+        BVCFeed.feed_running = False
+        BarStore.feed_running = False
+
+    @classmethod
+    def watch_set(cls) -> set:
+        symbols = PriceService.recently_requested()
+        rows = db.session.query(Position.symbol).join(
+            UserChallenge, UserChallenge.id == Position.user_challenge_id
+        ).filter(UserChallenge.status == "active").distinct().all()
+        symbols.update(r.symbol for r in rows)
+        symbols.update(OrderBook.symbols())
+        return symbols
+
+    @classmethod
+    def tick(cls):
+        try:
+            with cls._app.app_context():
+                OrderBook.sync()
+                symbols = cls.watch_set()
+                db.session.remove()
+            if symbols:
+                # Skip symbols another worker refreshed within the last half interval
+                PriceService.refresh(symbols, max_age=cls._max_age)
+            cls.match_orders()
+        except Exception:
+            logger.exception("PriceFeed tick failed")
+            Metrics.inc("background_job_errors_total", job="price_feed")
+
+    @classmethod
+    def match_orders(cls):
+        """
+        Fill resting orders crossed by the snapshot just refreshed.
+        """
+        symbols = OrderBook.symbols()
+        if not symbols:
+            return
+        # Orders on a symbol with only a simulated quote keep resting
+        prices = market_prices(sorted(symbols))
+        with cls._app.app_context():
+            filled = OrderBook.match(prices)
+            db.session.remove()
+        if filled:
+            Metrics.inc("order_book_fills_total", filled)
+
+    @classmethod
+    def _claim(cls, job, name=None):
+        # Every worker schedules the job; the database lease lets one of them run
+        # it per interval. It is held for most of the interval and not released,
+        # so the others skip this round rather than running it right after.
+        return job_lease.claim(name or job, timedelta(seconds=cls._intervals[job] * 0.9))
+
+    @classmethod
+    def refresh_bvc(cls):
+        try:
+            with cls._app.app_context():
+                # One scraper per shared price store, i.e. per host with the SQLite
+                # backend. With the in-process store each worker scrapes for itself.
+                run = not BVCFeed.shared() or cls._claim("bvc_feed", f"bvc_feed:{socket.gethostname()}")
+                db.session.remove()
+            if run:
+                BVCFeed.refresh_all()
+        except Exception:
+            logger.exception("BVC refresh failed")
+            Metrics.inc("background_job_errors_total", job="bvc_feed")
+
+    @classmethod
+    def sweep_risk(cls):
+        try:
+            with cls._app.app_context():
+                if cls._claim("risk_sweep"):
+                    from . import risk_engine  # numpy, imported by the first sweep
+                    risk_engine.sweep()
+                db.session.remove()
+        except Exception:
+            logger.exception("Risk sweep failed")
+            Metrics.inc("background_job_errors_total", job="risk_sweep")
+
+    @classmethod
+    def maintain_equity(cls):
+        try:
+            with cls._app.app_context():
+                if cls._claim("equity_rollup"):
+                    EquitySeries.maintain()
+                db.session.remove()
+        except Exception:
+            logger.exception("Equity rollup failed")
+            Metrics.inc("background_job_errors_total", job="equity_rollup")
@@ -1,38 +1,102 @@
-import yfinance as yf
-import random
-from typing import Dict, Tuple, Optional
+import logging
+import time
+from typing import Dict, Optional
 from datetime import datetime, timedelta
+from .metrics import Metrics
+from .price_cache import MemoryPriceCache, SingleFlight, make_cache
+
+logger = logging.getLogger(__name__)
 
 class PriceService:
-    _cache: Dict[str, Tuple[float, datetime]] = {}
-    _simulated_base: Dict[str, float] = {}
+    # Quote snapshot. In-process by default; configure() can swap in a SQLite
+    # file shared by every worker on the host.
+    _cache = MemoryPriceCache()
+    # Coalesces concurrent upstream fetches of the same symbol in this process
+    _flight = SingleFlight()
+    # symbol -> last time a request asked for it (feeds the background watch-set)
+    _requested: Dict[str, datetime] = {}
     CACHE_DURATION = timedelta(seconds=10)
+    WATCH_TTL = timedelta(minutes=5)
+    FETCH_LEASE = timedelta(seconds=15)
+    # Set by PriceFeed once the background refresher is running. While it is,
+    # request threads read the snapshot and only hit the network for a symbol
+    # the feed has never fetched.
+    feed_running = False
+    # "market" (yfinance, simulated on failure) or "sim" (MarketSimulator only, no network)
+    SOURCE = "market"
+    _sim_config = {}
+    _simulator = None
+
+    @classmethod
+    def configure(cls, app_config):
+        cls._cache = make_cache(app_config)
+        cls.SOURCE = app_config.get("PRICE_SOURCE", "market")
+        sim_keys = ("SIM_SEED", "SIM_TICK_SECONDS", "SIM_BLOCK", "SIM_PROFILES_PATH", "SQLALCHEMY_DATABASE_URI")
+        cls._sim_config = {k: app_config.get(k) for k in sim_keys if app_config.get(k) is not None}
+        cls._simulator = None
+        # Simulated quotes are cheap to make, so they are only cached for one simulated tick
+        cls.CACHE_DURATION = (timedelta(seconds=app_config.get("SIM_TICK_SECONDS", 1.0))
+                              if cls.SOURCE == "sim" else timedelta(seconds=10))
+
+    @classmethod
+    def simulator(cls):
+        if cls._simulator is None:
+            from .market_sim import MarketSimulator  # numpy, loaded on first use
+            MarketSimulator.configure(cls._sim_config)
+            cls._simulator = MarketSimulator
+        return cls._simulator
+
+    @classmethod
+    def _simulate(cls, symbols) -> Dict[str, float]:
+        # Symbols the model hasn't seen yet start from their last known quote
+        anchors = {s: entry[0] for s, entry in cls._cache.get_many(symbols).items()}
+        return cls.simulator().prices(symbols, anchors)
 
     @classmethod
     def get_price(cls, symbol: str) -> float:
         """
         Get the current price for a symbol.
         Priority:
-        1. Cache (valid for 10s)
-        2. Real market data (yfinance)
-        3. Simulation fallback
+        1. Snapshot (kept warm by the background PriceFeed, or valid for 10s)
+        2. Real market data (yfinance) - with a feed running, only for symbols it hasn't fetched yet
+        3. Simulation fallback (source "simulated")
         """
-        now = datetime.utcnow()
-        
-        # 1. Check Cache
-        if symbol in cls._cache:
-            price, timestamp = cls._cache[symbol]
-            if now - timestamp < cls.CACHE_DURATION:
-                return price
+        return cls.get_quote(symbol)["price"]
+
+    @classmethod
+    def get_quote(cls, symbol: str) -> dict:
+        """
+        Same as get_price but also reports where the price came from and how old it is.
+        """
+        return cls.get_quotes([symbol])[symbol]
 
-        # 2. Try Real Market Data
+    @classmethod
+    def _quote(cls, price: float, timestamp: datetime, source: str, now: datetime) -> dict:
+        return {
+            "price": price,
+            "as_of": timestamp.isoformat(),
+            "stale_seconds": round(max(0.0, (now - timestamp).total_seconds()), 3),
+            "source": source,
+        }
+
+    @classmethod
+    def _store(cls, symbol: str, price: float, source: str, now: Optional[datetime] = None):
+        # Also moves the simulation base (so if we switch to sim later, it starts from here)
+        cls._cache.set(symbol, price, now or datetime.utcnow(), source)
+        if cls._simulator is not None and source not in ("sim", "simulated"):
+            cls._simulator.rebase(symbol, price)
+
+    @classmethod
+    def _fetch_price(cls, symbol: str) -> Optional[float]:
+        """
+        Blocking network fetch from yfinance. Returns None when no usable price is available.
+        """
         try:
-            # Optimize: use '1d' period and just get the last close if market is closed, or real-time if open.
-            # yfinance history is blocking, so we accept the latency here.
+            import yfinance as yf
             ticker = yf.Ticker(symbol)
             # fast_info is often faster/more reliable for current price if available
             price = None
-            
+
             # Try fast_info first (newer yfinance versions)
             try:
                 if hasattr(ticker, 'fast_info'):
@@ -51,52 +115,164 @@ class PriceService:
                         price = float(val)
 
             if price and price > 0:
-                # Update cache and simulation base (so if we switch to sim later, it starts from here)
-                cls._cache[symbol] = (price, now)
-                cls._simulated_base[symbol] = price
                 return price
 
         except Exception as e:
             # Log error if needed, but we proceed to fallback
-            print(f"PriceService error for {symbol}: {e}")
+            Metrics.inc("price_upstream_errors_total")
+            logger.warning("PriceService error for %s: %s", symbol, e)
+        return None
+
+    @classmethod
+    def _fetch_prices(cls, symbols) -> Dict[str, float]:
+        """
+        Fetch several symbols in one bulk yfinance download.
+        Symbols with no usable price are simply missing from the result.
+        """
+        symbols = list(symbols)
+        if not symbols:
+            return {}
+        if cls.SOURCE == "sim":
+            return cls._simulate(symbols)
+        if len(symbols) == 1:
+            price = cls._fetch_price(symbols[0])
+            return {symbols[0]: price} if price else {}
 
-        # 3. Simulation Fallback
-        return cls._get_simulated_price(symbol)
+        prices = {}
+        try:
+            import yfinance as yf
+            data = yf.download(symbols, period="1d", interval="1m", group_by="ticker",
+                               threads=True, progress=False)
+            if data is None or data.empty:
+                return {}
+            for symbol in symbols:
+                try:
+                    closes = data[symbol]["Close"].dropna()
+                except KeyError:
+                    continue
+                if not closes.empty:
+                    val = float(closes.iloc[-1])
+                    if val > 0:
+                        prices[symbol] = val
+        except Exception as e:
+            Metrics.inc("price_upstream_errors_total")
+            logger.warning("PriceService batch error for %s: %s", symbols, e)
+        return prices
+
+    @classmethod
+    def _fetch_and_store(cls, symbols) -> Dict[str, float]:
+        """
+        Fetch the symbols this process holds a lease on and write them to the shared cache.
+        Symbols leased by another worker are left out; callers re-read them from the cache.
+        """
+        claimed = cls._cache.claim(symbols, cls.FETCH_LEASE)
+        if not claimed:
+            return {}
+        try:
+            now = datetime.utcnow()
+            started = time.perf_counter()
+            fetched = cls._fetch_prices(claimed)
+            Metrics.observe("price_upstream_fetch_seconds", time.perf_counter() - started,
+                            mode="single" if len(claimed) == 1 else "batch")
+            Metrics.inc("price_upstream_symbols_total", len(fetched), result="ok")
+            Metrics.inc("price_upstream_symbols_total", len(claimed) - len(fetched), result="missing")
+            source = "sim" if cls.SOURCE == "sim" else "market"
+            for symbol, price in fetched.items():
+                cls._store(symbol, price, source, now)
+            return fetched
+        finally:
+            cls._cache.release(claimed)
+
+    @classmethod
+    def refresh(cls, symbols, max_age: Optional[timedelta] = None) -> Dict[str, float]:
+        """
+        Fetch fresh prices for the given symbols in one batch and store them in the snapshot.
+        Called from the background feed; symbols without a market price get a simulated tick.
+        With max_age, symbols another worker refreshed more recently than that are skipped.
+        """
+        symbols = list(symbols)
+        if max_age is not None:
+            cutoff = datetime.utcnow() - max_age
+            fresh = cls._cache.get_many(symbols)
+            symbols = [s for s in symbols if s not in fresh or fresh[s][1] < cutoff]
+        started = datetime.utcnow()
+        refreshed = cls._flight.do_many(symbols, cls._fetch_and_store)
+        leftover = [s for s in symbols if s not in refreshed]
+        for symbol, entry in cls._cache.get_many(leftover).items():
+            # Fetched by another worker while we were waiting on its lease
+            if entry[1] >= started:
+                refreshed[symbol] = entry[0]
+        for symbol in leftover:
+            if symbol not in refreshed:
+                refreshed[symbol] = cls._get_simulated_price(symbol)
+        return refreshed
+
+    @classmethod
+    def recently_requested(cls) -> set:
+        """
+        Symbols requested within WATCH_TTL. Older entries are dropped from the watch-set.
+        """
+        cutoff = datetime.utcnow() - cls.WATCH_TTL
+        for symbol, ts in list(cls._requested.items()):
+            if ts < cutoff:
+                cls._requested.pop(symbol, None)
+        return set(cls._requested)
 
     @classmethod
     def _get_simulated_price(cls, symbol: str) -> float:
         """
-        Generates a simulated price based on random walk from the last known price.
-        """
-        # Default bases if we've never seen a real price for this symbol
-        defaults = {
-            "AAPL": 190.0,
-            "TSLA": 220.0,
-            "NVDA": 500.0,
-            "AMD": 110.0,
-            "GOOG": 140.0,
-            "MSFT": 370.0,
-            "AMZN": 150.0,
-            "EURUSD": 1.09,
-            "GBPUSD": 1.27
-        }
-        
-        base = cls._simulated_base.get(symbol) or defaults.get(symbol, 100.0)
-        
-        # Apply a random drift: -0.2% to +0.2%
-        change_pct = random.uniform(-0.002, 0.002)
-        new_price = base * (1 + change_pct)
-        new_price = round(max(0.01, new_price), 2)
-        
-        # Update state
-        cls._simulated_base[symbol] = new_price
-        cls._cache[symbol] = (new_price, datetime.utcnow())
-        
-        return new_price
+        Fallback tick from the MarketSimulator, continuing from the last known price.
+        """
+        price = cls._simulate([symbol])[symbol]
+        cls._store(symbol, price, "simulated")
+        return price
 
     @classmethod
     def get_prices(cls, symbols: list[str]) -> Dict[str, float]:
         """
-        Batch get prices (could be optimized, for now sequential).
+        Batch get prices. Cache misses are fetched together in one bulk request.
         """
-        return {s: cls.get_price(s) for s in symbols}
+        return {s: q["price"] for s, q in cls.get_quotes(symbols).items()}
+
+    @classmethod
+    def get_quotes(cls, symbols: list[str]) -> Dict[str, dict]:
+        """
+        Batch get quotes (price + staleness) for several symbols.
+        """
+        now = datetime.utcnow()
+        quotes = {}
+        missing = []
+        cached = cls._cache.get_many(symbols)
+        for symbol in symbols:
+            cls._requested[symbol] = now
+            entry = cached.get(symbol)
+            if entry and (cls.feed_running or now - entry[1] < cls.CACHE_DURATION):
+                quotes[symbol] = cls._quote(entry[0], entry[1], entry[2], now)
+            else:
+                missing.append(symbol)
+
+        Metrics.inc("price_cache_requests_total", len(quotes), result="hit")
+        Metrics.inc("price_cache_requests_total", len(missing), result="miss")
+
+        # With the feed running only never-fetched symbols get here; they are fetched
+        # once now and refreshed by the feed from then on (they joined the watch-set above)
+        if missing and cls.SOURCE == "sim":
+            # Generated in-process: nothing to coalesce or lease
+            for symbol, price in cls._simulate(missing).items():
+                cls._store(symbol, price, "sim", now)
+                quotes[symbol] = cls._quote(price, now, "sim", now)
+        elif missing:
+            # Concurrent misses for the same symbol share one upstream fetch
+            cls._flight.do_many(missing, cls._fetch_and_store)
+            for symbol, entry in cls._cache.get_many(missing).items():
+                if cls.feed_running or now - entry[1] < cls.CACHE_DURATION:
+                    quotes[symbol] = cls._quote(entry[0], entry[1], entry[2], datetime.utcnow())
+
+        # Simulation fallback only for the symbols that failed, labelled "simulated"
+        # so execution can refuse to fill at them
+        for symbol in missing:
+            if symbol not in quotes:
+                Metrics.inc("price_simulated_total")
+                price = cls._get_simulated_price(symbol)
+                quotes[symbol] = cls._quote(price, now, "simulated", now)
+        return quotes
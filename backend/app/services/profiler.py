@@ -0,0 +1,158 @@
+import cProfile
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from flask import g, request
+from .metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+class Profiler:
+    """
+    Opt-in sampling profiler for slow requests. A sampled request runs under
+    cProfile and its stats are dumped to DIR when it took at least THRESHOLD_MS
+    (open with `python -m pstats` or snakeviz).
+
+    Settings come from config and can be overridden at runtime through the
+    JSON control file (see POST /api/admin/profiling): every worker on the
+    host re-reads it when it changes, so profiling is switched on and off
+    without a restart.
+    """
+    ENABLED = False
+    SAMPLE_RATE = 0.1
+    THRESHOLD_MS = 500
+    KEEP = 50
+    DIR = None
+    CONTROL_PATH = None
+    # Seconds between control file checks
+    POLL_INTERVAL = 2.0
+    _defaults = {}
+    _checked = 0.0
+    _mtime = None
+    # cProfile allows one active profiler per interpreter
+    _busy = threading.Lock()
+
+    @classmethod
+    def configure(cls, app_config):
+        cls._defaults = {
+            "enabled": app_config.get("PROFILE_ENABLED", False),
+            "sample_rate": app_config.get("PROFILE_SAMPLE_RATE", cls.SAMPLE_RATE),
+            "threshold_ms": app_config.get("PROFILE_THRESHOLD_MS", cls.THRESHOLD_MS),
+        }
+        cls.KEEP = app_config.get("PROFILE_KEEP", cls.KEEP)
+        cls.DIR = app_config.get("PROFILE_DIR")
+        cls.CONTROL_PATH = app_config.get("PROFILE_CONTROL_PATH")
+        cls._mtime = None
+        cls._apply(cls._defaults)
+
+    @classmethod
+    def _apply(cls, settings):
+        # Validate everything before changing anything
+        enabled = bool(settings.get("enabled", cls.ENABLED))
+        rate = min(max(float(settings.get("sample_rate", cls.SAMPLE_RATE)), 0.0), 1.0)
+        threshold = max(int(settings.get("threshold_ms", cls.THRESHOLD_MS)), 0)
+        cls.ENABLED, cls.SAMPLE_RATE, cls.THRESHOLD_MS = enabled, rate, threshold
+
+    @classmethod
+    def settings(cls) -> dict:
+        return {"enabled": cls.ENABLED, "sample_rate": cls.SAMPLE_RATE, "threshold_ms": cls.THRESHOLD_MS}
+
+    @classmethod
+    def poll(cls):
+        """
+        Pick up a changed control file. Cheap: one stat() every POLL_INTERVAL.
+        """
+        now = time.monotonic()
+        if not cls.CONTROL_PATH or now - cls._checked < cls.POLL_INTERVAL:
+            return
+        cls._checked = now
+        try:
+            mtime = os.stat(cls.CONTROL_PATH).st_mtime
+        except OSError:
+            mtime = None
+        if mtime == cls._mtime:
+            return
+        cls._mtime = mtime
+        if mtime is None:
+            # Control file removed: back to the configured defaults
+            cls._apply(cls._defaults)
+            return
+        try:
+            with open(cls.CONTROL_PATH) as f:
+                cls._apply({**cls._defaults, **json.load(f)})
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning("Profiler: ignoring control file %s: %s", cls.CONTROL_PATH, e)
+            Metrics.inc("profiler_errors_total", stage="control")
+
+    @classmethod
+    def update(cls, settings) -> dict:
+        """
+        Apply new settings here and write them to the control file for the
+        other workers. Raises ValueError/TypeError on bad values.
+        """
+        merged = {**cls.settings(), **{k: settings[k] for k in ("enabled", "sample_rate", "threshold_ms") if k in settings}}
+        cls._apply(merged)
+        if cls.CONTROL_PATH:
+            os.makedirs(os.path.dirname(cls.CONTROL_PATH) or ".", exist_ok=True)
+            tmp = f"{cls.CONTROL_PATH}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(cls.settings(), f)
+            os.replace(tmp, cls.CONTROL_PATH)
+            cls._mtime = os.stat(cls.CONTROL_PATH).st_mtime
+        return cls.settings()
+
+    @classmethod
+    def dumps(cls) -> list:
+        if not cls.DIR or not os.path.isdir(cls.DIR):
+            return []
+        return sorted((f for f in os.listdir(cls.DIR) if f.endswith(".prof")), reverse=True)
+
+    @classmethod
+    def _dump(cls, profile, rule, elapsed_ms):
+        os.makedirs(cls.DIR, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", rule).strip("_") or "root"
+        name = f"{int(time.time() * 1000)}-{request.method}-{slug}-{int(elapsed_ms)}ms.prof"
+        profile.dump_stats(os.path.join(cls.DIR, name))
+        Metrics.inc("profiler_dumps_total")
+        # Keep the newest KEEP dumps
+        for old in cls.dumps()[cls.KEEP:]:
+            try:
+                os.remove(os.path.join(cls.DIR, old))
+            except OSError:
+                pass
+
+    @classmethod
+    def init_app(cls, app):
+        cls.configure(app.config)
+
+        @app.before_request
+        def _maybe_profile():
+            cls.poll()
+            if not cls.ENABLED or not cls.DIR or random.random() >= cls.SAMPLE_RATE:
+                return
+            if not cls._busy.acquire(blocking=False):
+                return
+            profile = cProfile.Profile()
+            g._profile = (profile, time.perf_counter())
+            profile.enable()
+
+        @app.teardown_request
+        def _finish_profile(exc):
+            entry = g.pop("_profile", None)
+            if entry is None:
+                return
+            profile, start = entry
+            profile.disable()
+            try:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                if elapsed_ms >= cls.THRESHOLD_MS:
+                    cls._dump(profile, request.url_rule.rule if request.url_rule else request.path, elapsed_ms)
+            except Exception:
+                logger.exception("Profiler: dump failed")
+                Metrics.inc("profiler_errors_total", stage="dump")
+            finally:
+                cls._busy.release()
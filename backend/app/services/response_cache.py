@@ -0,0 +1,124 @@
+import functools
+import hashlib
+import threading
+import time
+from datetime import datetime, timezone
+from flask import Response, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+class ResponseCache:
+    """
+    Whole-response cache for read-mostly GET endpoints. Entries are tagged
+    with the tables they read; committing a write to one of those tables
+    (ORM flush or Core DML through the session) drops them in this process,
+    and TTL bounds how stale another worker's copy can get. Cached or not,
+    responses carry an ETag and Last-Modified, so unchanged data is answered
+    with an empty 304.
+    """
+    ENABLED = True
+    TTL = 30
+    _lock = threading.Lock()
+    # key -> entry dict (body, status, mimetype, etag, last_modified, expires, tags)
+    _entries = {}
+    # tag -> bumped on every invalidation, so a response computed across a write is not stored
+    _versions = {}
+
+    @classmethod
+    def configure(cls, app_config):
+        cls.ENABLED = app_config.get("RESPONSE_CACHE_ENABLED", True)
+        cls.TTL = app_config.get("RESPONSE_CACHE_TTL", cls.TTL)
+        cls.clear()
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._entries.clear()
+
+    @classmethod
+    def invalidate(cls, *tags):
+        tags = set(tags)
+        with cls._lock:
+            for tag in tags:
+                cls._versions[tag] = cls._versions.get(tag, 0) + 1
+            for key in [k for k, e in cls._entries.items() if e["tags"] & tags]:
+                del cls._entries[key]
+
+    @staticmethod
+    def _key():
+        return request.path + "?" + "&".join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+
+    @staticmethod
+    def _respond(entry):
+        resp = Response(entry["body"], entry["status"], mimetype=entry["mimetype"])
+        resp.set_etag(entry["etag"])
+        resp.last_modified = entry["last_modified"]
+        # Clients may keep a copy but must revalidate (cheap: a 304 on a hit)
+        resp.headers["Cache-Control"] = "private, no-cache"
+        return resp.make_conditional(request)
+
+    @classmethod
+    def cached(cls, *tags, ttl=None):
+        """
+        Decorator for a view returning a JSON response. Only 200s are stored.
+        """
+        tags = frozenset(tags)
+
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if not cls.ENABLED or request.method not in ("GET", "HEAD"):
+                    return view(*args, **kwargs)
+                key = cls._key()
+                now = time.monotonic()
+                with cls._lock:
+                    entry = cls._entries.get(key)
+                    versions = {t: cls._versions.get(t, 0) for t in tags}
+                if entry and entry["expires"] > now:
+                    return cls._respond(entry)
+
+                resp = view(*args, **kwargs)
+                if isinstance(resp, tuple) or resp.status_code != 200 or resp.is_streamed:
+                    return resp
+                body = resp.get_data()
+                etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+                # Same content as the expired entry: keep its Last-Modified
+                last_modified = (entry["last_modified"] if entry and entry["etag"] == etag
+                                 else datetime.now(timezone.utc).replace(microsecond=0))
+                entry = {"body": body, "status": 200, "mimetype": resp.mimetype, "etag": etag,
+                         "last_modified": last_modified, "expires": now + (ttl or cls.TTL), "tags": tags}
+                with cls._lock:
+                    if all(cls._versions.get(t, 0) == v for t, v in versions.items()):
+                        cls._entries[key] = entry
+                return cls._respond(entry)
+            return wrapper
+        return decorator
+
+def _written_tables(session):
+    return session.info.setdefault("response_cache_tags", set())
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed(session, flush_context):
+    tables = _written_tables(session)
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table:
+            tables.add(table)
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_executed(state):
+    # Core/bulk INSERT, UPDATE and DELETE issued through the session
+    if state.is_insert or state.is_update or state.is_delete:
+        table = getattr(state.statement, "table", None)
+        if table is not None:
+            _written_tables(state.session).add(table.name)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    tables = session.info.pop("response_cache_tags", None)
+    if tables:
+        ResponseCache.invalidate(*tables)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop("response_cache_tags", None)
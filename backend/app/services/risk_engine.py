@@ -0,0 +1,171 @@
+import time
+from datetime import datetime
+import numpy as np
+from sqlalchemy import bindparam, update
+from ..db import db
+from ..models import UserChallenge, ChallengePlan, Position
+from .equity_series import EquitySeries
+from .ledger import ensure_ledger
+from .execution import market_prices
+
+# Rows per executemany batch when writing sweep results back
+UPDATE_CHUNK = 5000
+
+def _backfill_ledgers():
+    """
+    Challenges created before the running ledger have no cash_balance yet.
+    Backfill them once through the ORM so the sweep itself can stay columnar.
+    """
+    legacy = db.session.query(UserChallenge).filter(
+        UserChallenge.status == "active", UserChallenge.cash_balance.is_(None)).all()
+    for uc in legacy:
+        ensure_ledger(uc)
+    if legacy:
+        db.session.commit()
+    return len(legacy)
+
+def sweep(prices=None, now=None):
+    """
+    Mark every active challenge to market against one price snapshot and apply
+    the daily-loss, total-loss and profit-target rules in a single vectorized pass.
+
+    Same rules as challenge_engine.evaluate_rules, but over NumPy arrays: two
+    queries to load, one executemany per chunk to write back. Challenges that go
+    quiet with a losing position are failed here even if the user never polls.
+    """
+    started = time.perf_counter()
+    now = now or datetime.utcnow()
+    backfilled = _backfill_ledgers()
+
+    rows = db.session.query(
+        UserChallenge.id, UserChallenge.cash_balance, UserChallenge.equity, UserChallenge.daily_start_equity,
+        UserChallenge.highest_equity, UserChallenge.lowest_equity, UserChallenge.last_updated,
+        ChallengePlan.starting_balance, ChallengePlan.profit_target_pct,
+        ChallengePlan.max_daily_loss_pct, ChallengePlan.max_total_loss_pct, UserChallenge.max_drawdown_pct
+    ).join(ChallengePlan, ChallengePlan.id == UserChallenge.challenge_id)\
+     .filter(UserChallenge.status == "active").order_by(UserChallenge.id).all()
+    if not rows:
+        return {"active": 0, "failed": 0, "passed": 0, "updated": 0, "skipped": 0, "unpriced": 0,
+                "backfilled": backfilled,
+                "load_ms": 0.0, "compute_ms": 0.0,
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+    cols = list(zip(*rows))
+    ids = np.array(cols[0], dtype=np.int64)
+    cash = np.array(cols[1], dtype=np.float64)
+    stored_equity = np.array(cols[2], dtype=np.float64)
+    daily_start = np.array(cols[3], dtype=np.float64)
+    highest = np.array(cols[4], dtype=np.float64)
+    lowest = np.array(cols[5], dtype=np.float64)
+    last_day = np.array(cols[6], dtype="datetime64[D]")
+    starting = np.array(cols[7], dtype=np.float64)
+    target_pct = np.array(cols[8], dtype=np.float64)
+    max_daily_pct = np.array(cols[9], dtype=np.float64)
+    max_total_pct = np.array(cols[10], dtype=np.float64)
+    max_drawdown = np.nan_to_num(np.array(cols[11], dtype=np.float64))
+
+    # Open positions of active challenges -> per-challenge unrealized PnL
+    positions = db.session.query(
+        Position.user_challenge_id, Position.symbol, Position.side, Position.quantity, Position.avg_price
+    ).join(UserChallenge, UserChallenge.id == Position.user_challenge_id)\
+     .filter(UserChallenge.status == "active").all()
+    loaded = time.perf_counter()
+    unrealized = np.zeros(len(ids))
+    unpriced = np.zeros(len(ids), dtype=bool)
+    if positions:
+        pcols = list(zip(*positions))
+        symbols, sym_idx = np.unique(np.array(pcols[1], dtype=object), return_inverse=True)
+        if prices is None:
+            # Real quotes only: a simulated fallback price must not fail or pass anyone
+            prices = market_prices([str(s) for s in symbols])
+        avg = np.array(pcols[4], dtype=np.float64)
+        sym_price = np.array([prices.get(s, np.nan) for s in symbols], dtype=np.float64)
+        current = sym_price[sym_idx]
+        missing = np.isnan(current)
+        current = np.where(missing, avg, current)
+        sign = np.where(np.array(pcols[2], dtype=object) == "long", 1.0, -1.0)
+        pos_pnl = sign * (current - avg) * np.array(pcols[3], dtype=np.float64)
+        # ids are sorted, so searchsorted maps each position to its challenge row
+        owner = np.searchsorted(ids, np.array(pcols[0], dtype=np.int64))
+        unrealized = np.bincount(owner, weights=pos_pnl, minlength=len(ids))
+        # Challenges holding a symbol with no market price are left as they are this sweep
+        unpriced = np.bincount(owner, weights=missing, minlength=len(ids)) > 0
+
+    equity = cash + unrealized
+
+    # New day (or never evaluated): reset the daily baseline, as evaluate_rules does
+    new_day = np.isnat(last_day) | (last_day < np.datetime64(now.date(), "D"))
+    daily_start = np.where(new_day, equity, daily_start)
+
+    safe_start = np.where(starting > 0, starting, np.nan)
+    daily_loss_pct = np.where(equity < daily_start, (daily_start - equity) / safe_start * 100.0, 0.0)
+    total_loss_pct = np.where(equity < starting, (starting - equity) / safe_start * 100.0, 0.0)
+    profit_pct = np.nan_to_num((equity - starting) / safe_start * 100.0)
+
+    failed = ~unpriced & ((daily_loss_pct >= max_daily_pct) | (total_loss_pct >= max_total_pct))
+    passed = ~unpriced & ~failed & (profit_pct >= target_pct)
+    status = np.where(failed, "failed", np.where(passed, "passed", "active"))
+    highest = np.maximum(highest, equity)
+    lowest = np.minimum(lowest, equity)
+    drawdown = np.where(highest > 0, (highest - equity) / np.where(highest > 0, highest, 1.0) * 100.0, 0.0)
+    max_drawdown = np.maximum(max_drawdown, drawdown)
+    ended = failed | passed
+    # Only rows whose equity moved, that rolled over a day or that ended need writing
+    changed = ~unpriced & (ended | new_day | ~np.isclose(equity, stored_equity, rtol=0.0, atol=1e-9))
+    computed = time.perf_counter()
+
+    # Core executemany with uniform parameter sets: one statement for challenges
+    # that stay active, one for those that just ended (also stamps end_date).
+    # Rows were loaded without a lock: a row that was closed or traded on since
+    # (execute_order stamps last_updated, admin/bulk changes move status) no
+    # longer matches and keeps its newer values; the next sweep picks it up.
+    table = UserChallenge.__table__
+    base = update(table).where(
+        table.c.id == bindparam("b_id"),
+        table.c.status == "active",
+        table.c.last_updated.is_not_distinct_from(bindparam("b_last_updated")),
+    ).values(
+        equity=bindparam("b_equity"),
+        daily_start_equity=bindparam("b_daily_start"),
+        highest_equity=bindparam("b_highest"),
+        lowest_equity=bindparam("b_lowest"),
+        max_drawdown_pct=bindparam("b_max_drawdown"),
+        status=bindparam("b_status"),
+        last_updated=now,
+    )
+    statements = {False: base, True: base.values(end_date=now)}
+    params = {False: [], True: []}
+    for i in np.flatnonzero(changed):
+        params[bool(ended[i])].append({
+            "b_id": int(ids[i]),
+            "b_equity": float(equity[i]),
+            "b_daily_start": float(daily_start[i]),
+            "b_highest": float(highest[i]),
+            "b_lowest": float(lowest[i]),
+            "b_max_drawdown": float(max_drawdown[i]),
+            "b_status": str(status[i]),
+            "b_last_updated": cols[6][i],
+        })
+    written = 0
+    for key, batch in params.items():
+        for start in range(0, len(batch), UPDATE_CHUNK):
+            res = db.session.execute(statements[key], batch[start:start + UPDATE_CHUNK])
+            written += max(res.rowcount, 0)
+            db.session.commit()
+    # Equity curve ticks for every challenge the sweep re-marked
+    EquitySeries.record_many([(int(ids[i]), float(equity[i])) for i in np.flatnonzero(changed)], now)
+    db.session.commit()
+
+    return {
+        "active": int(len(ids) - ended.sum()),
+        "failed": int(failed.sum()),
+        "passed": int(passed.sum()),
+        "updated": written,
+        # Changed under the sweep since the load; left for the next one
+        "skipped": int(changed.sum()) - written,
+        "unpriced": int(unpriced.sum()),
+        "backfilled": backfilled,
+        "load_ms": round((loaded - started) * 1000, 2),
+        "compute_ms": round((computed - loaded) * 1000, 2),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
@@ -0,0 +1,208 @@
+import json
+import logging
+import queue
+import threading
+import time
+from typing import Optional
+from ..db import db
+from ..models import UserChallenge, ChallengePlan, Position
+from .challenge_engine import compute_metrics
+from .price_service import PriceService
+from .metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+class Subscription:
+    """
+    One connected client. Events are queued by the hub's tick loop and drained
+    by the streaming response; a slow client that fills its queue is dropped.
+    """
+
+    def __init__(self, symbols, user_challenge_id, max_queue=100):
+        self.symbols = set(symbols)
+        self.user_challenge_id = user_challenge_id
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.closed = False
+        self.released = False
+
+    def push(self, event, data):
+        try:
+            self.queue.put_nowait((event, data))
+        except queue.Full:
+            self.closed = True
+
+class StreamHub:
+    """
+    Single shared tick loop that fans price ticks and per-challenge equity/rule
+    deltas out to every subscriber. Each tick reads the PriceService snapshot
+    once and runs one query for all subscribed challenges, whatever the number
+    of connections; events are only sent when a value actually changed.
+    """
+    _app = None
+    _thread = None
+    _lock = threading.Lock()
+    _by_symbol = {}
+    _by_challenge = {}
+    _last_prices = {}
+    _last_accounts = {}
+    _connections = 0
+    INTERVAL = 2.0
+    MAX_CONNECTIONS = 0
+
+    @classmethod
+    def init_app(cls, app):
+        cls._app = app
+        cls.INTERVAL = app.config.get("STREAM_INTERVAL", cls.INTERVAL)
+        cls.MAX_CONNECTIONS = app.config.get("STREAM_MAX_CONNECTIONS", cls.MAX_CONNECTIONS)
+
+    @classmethod
+    def subscribe(cls, symbols, user_challenge_id=None) -> Optional[Subscription]:
+        """
+        Register a client. Returns None when MAX_CONNECTIONS are already open.
+        """
+        sub = Subscription(symbols, user_challenge_id)
+        with cls._lock:
+            if cls.MAX_CONNECTIONS and cls._connections >= cls.MAX_CONNECTIONS:
+                return None
+            cls._connections += 1
+            for symbol in sub.symbols:
+                cls._by_symbol.setdefault(symbol, set()).add(sub)
+            if user_challenge_id:
+                cls._by_challenge.setdefault(user_challenge_id, set()).add(sub)
+            # Replay the latest known values so the client doesn't wait a tick
+            for symbol in sub.symbols:
+                if symbol in cls._last_prices:
+                    sub.push("price", cls._last_prices[symbol])
+            if user_challenge_id in cls._last_accounts:
+                sub.push("account", cls._last_accounts[user_challenge_id])
+            cls._ensure_loop()
+        return sub
+
+    @classmethod
+    def unsubscribe(cls, sub):
+        with cls._lock:
+            if sub.released:
+                return
+            sub.released = True
+            sub.closed = True
+            cls._connections -= 1
+            for symbol in sub.symbols:
+                subs = cls._by_symbol.get(symbol)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del cls._by_symbol[symbol]
+                        cls._last_prices.pop(symbol, None)
+            subs = cls._by_challenge.get(sub.user_challenge_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del cls._by_challenge[sub.user_challenge_id]
+                    cls._last_accounts.pop(sub.user_challenge_id, None)
+
+    @classmethod
+    def _ensure_loop(cls):
+        if cls._thread is None or not cls._thread.is_alive():
+            cls._thread = threading.Thread(target=cls._run, name="stream-hub", daemon=True)
+            cls._thread.start()
+
+    @classmethod
+    def _run(cls):
+        while True:
+            started = time.monotonic()
+            try:
+                cls.tick()
+            except Exception:
+                logger.exception("StreamHub tick failed")
+                Metrics.inc("background_job_errors_total", job="stream_hub")
+            time.sleep(max(0.0, cls.INTERVAL - (time.monotonic() - started)))
+
+    @classmethod
+    def tick(cls):
+        with cls._lock:
+            symbols = list(cls._by_symbol)
+            challenge_ids = list(cls._by_challenge)
+        if not symbols and not challenge_ids:
+            return
+
+        accounts = cls._load_accounts(challenge_ids) if challenge_ids else {}
+        # Prices for subscribed symbols and every symbol held by a subscribed challenge
+        held = {p["symbol"] for a in accounts.values() for p in a["positions"]}
+        quotes = PriceService.get_quotes(sorted(set(symbols) | held))
+
+        with cls._lock:
+            for symbol in symbols:
+                quote = quotes[symbol]
+                last = cls._last_prices.get(symbol)
+                if last is not None and last["price"] == quote["price"]:
+                    continue
+                payload = {"symbol": symbol, **quote}
+                cls._last_prices[symbol] = payload
+                for sub in cls._by_symbol.get(symbol, ()):
+                    sub.push("price", payload)
+
+            for uc_id, account in accounts.items():
+                payload = cls._account_payload(account, quotes)
+                if cls._last_accounts.get(uc_id) == payload:
+                    continue
+                cls._last_accounts[uc_id] = payload
+                for sub in cls._by_challenge.get(uc_id, ()):
+                    sub.push("account", payload)
+
+    @classmethod
+    def _load_accounts(cls, challenge_ids):
+        with cls._app.app_context():
+            rows = db.session.query(
+                UserChallenge.id, UserChallenge.status, UserChallenge.cash_balance,
+                UserChallenge.daily_start_equity, UserChallenge.equity, ChallengePlan.starting_balance
+            ).join(ChallengePlan, ChallengePlan.id == UserChallenge.challenge_id)\
+             .filter(UserChallenge.id.in_(challenge_ids)).all()
+            positions = db.session.query(
+                Position.user_challenge_id, Position.symbol, Position.side, Position.quantity, Position.avg_price
+            ).filter(Position.user_challenge_id.in_(challenge_ids)).all()
+            db.session.remove()
+
+        accounts = {}
+        for uc_id, status, cash, daily_start, equity, starting in rows:
+            accounts[uc_id] = {
+                "user_challenge_id": uc_id,
+                "status": status,
+                # Challenges not yet backfilled by the ledger fall back to their stored equity
+                "cash_balance": cash,
+                "equity": equity,
+                "daily_start_equity": daily_start,
+                "starting_balance": starting,
+                "positions": [],
+            }
+        for uc_id, symbol, side, qty, avg in positions:
+            if uc_id in accounts:
+                accounts[uc_id]["positions"].append({"symbol": symbol, "side": side, "quantity": qty, "avg_price": avg})
+        return accounts
+
+    @classmethod
+    def _account_payload(cls, account, quotes):
+        unrealized = 0.0
+        for p in account["positions"]:
+            current = quotes[p["symbol"]]["price"] if p["symbol"] in quotes else p["avg_price"]
+            if p["side"] == "long":
+                unrealized += (current - p["avg_price"]) * p["quantity"]
+            else:
+                unrealized += (p["avg_price"] - current) * p["quantity"]
+        if account["cash_balance"] is not None:
+            equity = account["cash_balance"] + unrealized
+        else:
+            equity = account["equity"]
+        daily_loss_pct, total_loss_pct, profit_pct = compute_metrics(
+            equity, account["daily_start_equity"], account["starting_balance"])
+        return {
+            "user_challenge_id": account["user_challenge_id"],
+            "status": account["status"],
+            "equity": round(equity, 2),
+            "unrealized_pnl": round(unrealized, 2),
+            "profit_pct": round(profit_pct, 2),
+            "daily_loss_pct": round(daily_loss_pct, 2),
+            "total_loss_pct": round(total_loss_pct, 2),
+        }
+
+def format_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
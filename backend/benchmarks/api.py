@@ -0,0 +1,341 @@
+"""
+End-to-end latency and throughput of the Flask API on a generated dataset.
+
+The app is built with create_app() against a fresh SQLite file holding N
+users, M challenges (with open positions) and K trades. yfinance is replaced
+by an in-process fake and the Casablanca site by a local HTTP server, both with
+a configurable upstream delay, so runs are offline and repeatable. Requests go
+through the Flask test client (no socket), from --threads concurrent clients.
+
+    python benchmarks/api.py --users 2000 --challenges 4000 --trades 100000 --out /tmp/api.json
+    python benchmarks/api.py ... --compare /tmp/api.json --tolerance 20
+
+--compare prints the p50/p99 change per scenario against a previous results
+file and exits 1 when any p99 is more than --tolerance percent (and more than
+--min-delta-ms) slower.
+
+--price-source sim serves quotes from the MarketSimulator (PRICE_SOURCE=sim,
+seeded with --seed) instead of the fake yfinance.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SYMBOLS = ["AAPL", "TSLA", "NVDA", "AMD", "GOOG", "MSFT", "AMZN", "EURUSD", "GBPUSD", "META"]
+BVC_SYMBOLS = ["IAM", "ATW", "BCP", "LXV", "SID"]
+ADMIN_KEY = "bench-admin-key"
+
+def _base_price(symbol):
+    return 20.0 + sum(map(ord, symbol)) % 480
+
+def install_fake_yfinance(delay):
+    """
+    Register a stand-in `yfinance` module: deterministic prices, `delay` seconds per call.
+    """
+    import pandas as pd
+
+    class FastInfo:
+        def __init__(self, symbol):
+            self.last_price = _base_price(symbol) * (1 + 0.001 * math.sin(time.time()))
+
+    class Ticker:
+        def __init__(self, symbol):
+            self.symbol = symbol
+            time.sleep(delay)
+            self.fast_info = FastInfo(symbol)
+
+        def history(self, period=None, interval="1d", start=None, **_):
+            time.sleep(delay)
+            if interval == "1d":
+                first = date.fromisoformat(start) if start else date.today() - timedelta(days=30)
+                days = pd.date_range(first, date.today(), freq="D")
+            else:
+                days = pd.date_range(datetime.utcnow() - timedelta(minutes=5), periods=5, freq="min")
+            base = _base_price(self.symbol)
+            closes = [base * (1 + 0.01 * math.sin(i / 3)) for i in range(len(days))]
+            return pd.DataFrame({"Close": closes}, index=days)
+
+    def download(symbols, **_):
+        time.sleep(delay)
+        index = pd.date_range(datetime.utcnow() - timedelta(minutes=5), periods=5, freq="min")
+        frames = {s: pd.DataFrame({"Close": [_base_price(s)] * len(index)}, index=index) for s in symbols}
+        return pd.concat(frames, axis=1)
+
+    module = types.ModuleType("yfinance")
+    module.Ticker = Ticker
+    module.download = download
+    sys.modules["yfinance"] = module
+
+def start_fake_bvc(delay):
+    """
+    Local stand-in for the Casablanca quote page. Returns (server, base URL).
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            code = self.path.split("code=")[-1][:10]
+            price = f"{_base_price(code):.2f}".replace(".", ",")
+            body = f'<html><span id="ctl00_Contenu_PlaceHolder_Contenu_lblCours">{price}</span></html>'.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *_):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/quote"
+
+def _setup_env(db_path, bvc_url, bars_dir):
+    sys.path.insert(0, BACKEND_DIR)
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "ADMIN_KEY": ADMIN_KEY,
+        "PRICE_FEED_ENABLED": "0",
+        "PRICE_CACHE_BACKEND": "memory",
+        "RISK_SWEEP_INTERVAL": "0",
+        "EQUITY_ROLLUP_INTERVAL": "0",
+        "PASSWORD_HASH_WORKERS": "0",
+        "BVC_BASE_URL": bvc_url,
+        "BAR_STORE_DIR": bars_dir,
+    })
+
+def build_dataset(users, challenges, trades, seed):
+    """
+    Bulk-load the dataset with Core inserts; ledger columns are filled in so
+    no request pays for a backfill.
+    """
+    from sqlalchemy import bindparam, insert, select, update
+    from app.db import db
+    from app.models import User, UserChallenge, ChallengePlan, Trade, Position
+    from app.services.leaderboard_service import rebuild_month, month_key
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    plans = db.session.execute(select(ChallengePlan.id, ChallengePlan.starting_balance)).all()
+    db.session.execute(insert(User.__table__), [
+        {"email": f"bench{i}@example.com", "password_hash": "x", "created_at": now} for i in range(users)])
+    user_ids = db.session.execute(select(User.id).order_by(User.id)).scalars().all()
+
+    rows = []
+    for i in range(challenges):
+        plan_id, balance = plans[i % len(plans)]
+        rows.append({"user_id": user_ids[i % len(user_ids)], "challenge_id": plan_id, "status": "active",
+                     "start_date": now - timedelta(days=rng.randint(0, 20)), "equity": balance,
+                     "daily_start_equity": balance, "highest_equity": balance, "lowest_equity": balance,
+                     "last_updated": now, "realized_pnl": 0.0, "cash_balance": balance, "trade_count": 0,
+                     "max_drawdown_pct": 0.0})
+    db.session.execute(insert(UserChallenge.__table__), rows)
+    ucs = db.session.execute(select(UserChallenge.id, UserChallenge.cash_balance).order_by(UserChallenge.id)).all()
+
+    ledger = {uc_id: [cash, 0.0, 0] for uc_id, cash in ucs}
+    trade_rows = []
+    for _ in range(trades):
+        uc_id = ucs[rng.randrange(len(ucs))][0]
+        symbol = rng.choice(SYMBOLS)
+        pnl = round(rng.uniform(-50, 60), 2)
+        trade_rows.append({"user_challenge_id": uc_id, "symbol": symbol, "side": rng.choice(("buy", "sell")),
+                           "quantity": rng.randint(1, 10), "price": _base_price(symbol), "pnl": pnl,
+                           "timestamp": now - timedelta(minutes=rng.randint(0, 60 * 24 * 20))})
+        entry = ledger[uc_id]
+        entry[0] += pnl
+        entry[1] += pnl
+        entry[2] += 1
+    for start in range(0, len(trade_rows), 10000):
+        db.session.execute(insert(Trade.__table__), trade_rows[start:start + 10000])
+
+    position_rows = []
+    for uc_id, _ in ucs:
+        for symbol in rng.sample(SYMBOLS, rng.randint(0, 4)):
+            qty = rng.randint(1, 5)
+            side = rng.choice(("long", "short"))
+            avg = _base_price(symbol)
+            position_rows.append({"user_challenge_id": uc_id, "symbol": symbol, "quantity": qty,
+                                  "avg_price": avg, "side": side, "opened_at": now})
+            ledger[uc_id][0] += -avg * qty if side == "long" else avg * qty
+    if position_rows:
+        db.session.execute(insert(Position.__table__), position_rows)
+
+    table = UserChallenge.__table__
+    db.session.execute(
+        update(table).where(table.c.id == bindparam("b_id")).values(
+            cash_balance=bindparam("b_cash"), realized_pnl=bindparam("b_pnl"), trade_count=bindparam("b_count")),
+        [{"b_id": uc_id, "b_cash": cash, "b_pnl": pnl, "b_count": count} for uc_id, (cash, pnl, count) in ledger.items()])
+    db.session.commit()
+    rebuild_month(month_key())
+    return [uc_id for uc_id, _ in ucs]
+
+def scenarios(uc_ids, rng_seed):
+    """
+    name -> callable(client, rng) issuing one request. Execute and summary use
+    disjoint challenges: the summary re-marks equity and may end a challenge.
+    """
+    trade_ids = uc_ids[0::2]
+    summary_ids = uc_ids[1::2]
+    admin = {"X-ADMIN-KEY": ADMIN_KEY}
+    return {
+        "trades.execute": lambda c, r: c.post("/api/trades/execute", json={
+            "user_challenge_id": r.choice(trade_ids), "symbol": r.choice(SYMBOLS),
+            "side": r.choice(("buy", "sell")), "quantity": 1}),
+        "trades.summary": lambda c, r: c.get(f"/api/trades/summary?user_challenge_id={r.choice(summary_ids)}"),
+        "leaderboard.top10": lambda c, r: c.get("/api/leaderboard/top10"),
+        "admin.challenges": lambda c, r: c.get("/api/admin/challenges?limit=50", headers=admin),
+        "admin.challenges_filtered": lambda c, r: c.get(
+            f"/api/admin/challenges?limit=50&status=active&min_equity={r.randint(0, 20000)}", headers=admin),
+        "market.price": lambda c, r: c.get(f"/api/market/price?symbol={r.choice(SYMBOLS)}"),
+        "market.maroc_price": lambda c, r: c.get(f"/api/market/maroc/price?symbol={r.choice(BVC_SYMBOLS)}"),
+        "market.ai_signal": lambda c, r: c.get(f"/api/market/ai/signal?symbol={r.choice(SYMBOLS)}"),
+        "market.ai_signals": lambda c, r: c.get(f"/api/market/ai/signals?symbols={','.join(SYMBOLS[:5])}"),
+    }
+
+def _percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def run_scenario(app, call, requests, threads, warmup, seed):
+    for i in range(warmup):
+        call(app.test_client(), random.Random(seed + i))
+    per_thread = max(1, requests // threads)
+
+    def worker(n):
+        client = app.test_client()
+        rng = random.Random(seed * 7919 + n)
+        out = []
+        for _ in range(per_thread):
+            t0 = time.perf_counter()
+            status = call(client, rng).status_code
+            out.append(((time.perf_counter() - t0) * 1000, status))
+        return out
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        samples = [s for chunk in pool.map(worker, range(threads)) for s in chunk]
+    wall = time.perf_counter() - started
+    latencies = sorted(ms for ms, _ in samples)
+    statuses = Counter(str(status) for _, status in samples)
+    return {
+        "requests": len(samples),
+        "errors": sum(n for code, n in statuses.items() if code.startswith("5")),
+        "status_codes": dict(sorted(statuses.items())),
+        "p50_ms": round(_percentile(latencies, 0.50), 3),
+        "p90_ms": round(_percentile(latencies, 0.90), 3),
+        "p99_ms": round(_percentile(latencies, 0.99), 3),
+        "max_ms": round(latencies[-1], 3),
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "rps": round(len(samples) / wall, 1),
+    }
+
+def _git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(results, previous, tolerance, min_delta_ms):
+    """
+    Print per-scenario changes; returns the names whose p99 regressed by more
+    than `tolerance` percent and more than `min_delta_ms` (sub-millisecond
+    endpoints are too noisy for a percentage alone).
+    """
+    regressed = []
+    print(f"{'scenario':28} {'p50 ms':>18} {'p99 ms':>18}")
+    for name, cur in results["scenarios"].items():
+        old = previous.get("scenarios", {}).get(name)
+        if not old:
+            print(f"{name:28} {'(new)':>18}")
+            continue
+        delta = lambda k: (cur[k] - old[k]) / old[k] * 100 if old[k] else 0.0
+        print(f"{name:28} {old['p50_ms']:>7.2f}->{cur['p50_ms']:<7.2f}{delta('p50_ms'):+4.0f}% "
+              f"{old['p99_ms']:>7.2f}->{cur['p99_ms']:<7.2f}{delta('p99_ms'):+4.0f}%")
+        if delta("p99_ms") > tolerance and cur["p99_ms"] - old["p99_ms"] > min_delta_ms:
+            regressed.append(name)
+    return regressed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--challenges", type=int, default=2000)
+    parser.add_argument("--trades", type=int, default=50000)
+    parser.add_argument("--requests", type=int, default=400, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--upstream-ms", type=float, default=50.0, help="fake yfinance/BVC response delay")
+    parser.add_argument("--only", help="comma-separated scenario names")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--compare", help="previous results JSON")
+    parser.add_argument("--tolerance", type=float, default=20.0, help="allowed p99 slowdown in percent")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="ignore p99 slowdowns smaller than this")
+    parser.add_argument("--price-source", choices=("fake", "sim"), default="fake",
+                        help="quotes from the fake yfinance or from the market simulator")
+    args = parser.parse_args()
+
+    delay = args.upstream_ms / 1000
+    server, bvc_url = start_fake_bvc(delay)
+    workdir = tempfile.mkdtemp()
+    _setup_env(os.path.join(workdir, "bench.db"), bvc_url, os.path.join(workdir, "bars"))
+    if args.price_source == "sim":
+        os.environ.update({"PRICE_SOURCE": "sim", "SIM_SEED": str(args.seed), "SIM_TICK_SECONDS": "0"})
+    install_fake_yfinance(delay)
+
+    from app import create_app
+    from app.bootstrap import bootstrap
+    app = create_app()
+    t0 = time.perf_counter()
+    with app.app_context():
+        bootstrap()
+        uc_ids = build_dataset(args.users, args.challenges, args.trades, args.seed)
+    print(f"Dataset ready in {time.perf_counter() - t0:.1f}s")
+
+    selected = scenarios(uc_ids, args.seed)
+    if args.only:
+        wanted = set(args.only.split(","))
+        selected = {k: v for k, v in selected.items() if k in wanted}
+    results = {
+        "meta": {
+            "git": _git_rev(),
+            "at": datetime.utcnow().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "users": args.users, "challenges": args.challenges, "trades": args.trades,
+            "requests": args.requests, "threads": args.threads, "upstream_ms": args.upstream_ms,
+            "price_source": args.price_source,
+        },
+        "scenarios": {},
+    }
+    for name, call in selected.items():
+        stats = run_scenario(app, call, args.requests, args.threads, args.warmup, args.seed)
+        results["scenarios"][name] = stats
+        print(f"{name:28} p50 {stats['p50_ms']:8.2f} ms  p99 {stats['p99_ms']:8.2f} ms  "
+              f"{stats['rps']:8.1f} req/s  {stats['status_codes']}")
+    server.shutdown()
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressed = compare(results, json.load(f), args.tolerance, args.min_delta_ms)
+        if regressed:
+            print(f"p99 regressions beyond {args.tolerance:.0f}%: {', '.join(regressed)}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,325 @@
+"""
+Offline replay: streams a recorded tick file through PriceService and drives
+scripted order flow from synthetic accounts through the execution core, the
+resting order book and the risk sweep, all on the replay clock. Reports fills,
+rule breaches, throughput and order latency. Nothing touches the network.
+
+Tick files are time-ordered CSV (timestamp,symbol,price; ISO time or epoch
+seconds) or .npz (ts epoch float64, symbol int index, price, symbols).
+
+    python benchmarks/replay.py --generate /tmp/ticks.csv --symbols AAPL,TSLA,EURUSD --ticks 5000
+    python benchmarks/replay.py /tmp/ticks.csv --accounts 2000 --out /tmp/replay.json
+    python benchmarks/replay.py /tmp/ticks.csv --accounts 2000 --expect /tmp/replay.json
+
+The order flow is derived from --seed, so the same tick file, seed and account
+count always give the same fills and breaches; --expect compares those against
+a previous report and exits 1 on any difference (timings are not compared).
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Report sections that must match between runs of the same input
+DETERMINISTIC = ("ticks", "accounts", "orders", "fills", "challenges", "breaches_by_day", "checksum")
+
+def _setup_env(db_path):
+    sys.path.insert(0, BACKEND_DIR)
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["PRICE_FEED_ENABLED"] = "0"
+    os.environ["PRICE_CACHE_BACKEND"] = "memory"
+    os.environ["RISK_SWEEP_INTERVAL"] = "0"
+    os.environ["EQUITY_ROLLUP_INTERVAL"] = "0"
+    os.environ["PASSWORD_HASH_WORKERS"] = "0"
+
+def _parse_ts(value):
+    try:
+        return datetime.utcfromtimestamp(float(value))
+    except ValueError:
+        ts = datetime.fromisoformat(value)
+        return ts.astimezone(timezone.utc).replace(tzinfo=None) if ts.tzinfo else ts
+
+def _rows(path):
+    if path.endswith(".npz"):
+        import numpy as np
+        data = np.load(path, allow_pickle=False)
+        symbols = [str(s) for s in data["symbols"]]
+        for ts, sym, price in zip(data["ts"], data["symbol"], data["price"]):
+            yield datetime.utcfromtimestamp(float(ts)), symbols[int(sym)], float(price)
+        return
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            yield _parse_ts(row["timestamp"]), row["symbol"], float(row["price"])
+
+def read_ticks(path):
+    """
+    Yield (timestamp, {symbol: price}), one step per distinct timestamp.
+    """
+    current, prices = None, {}
+    for ts, symbol, price in _rows(path):
+        if current is not None and ts != current:
+            if ts < current:
+                raise ValueError(f"{path}: ticks must be time-ordered ({ts} after {current})")
+            yield current, prices
+            prices = {}
+        current = ts
+        prices[symbol] = price
+    if current is not None:
+        yield current, prices
+
+def generate(path, symbols, ticks, step_seconds, seed):
+    """
+    Write a random-walk tick file (lognormal steps with occasional jumps).
+    """
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 2, 14, 30)
+    prices = {s: round(rng.uniform(20, 500), 2) for s in symbols}
+    rows = []
+    for i in range(ticks):
+        ts = start + timedelta(seconds=i * step_seconds)
+        for s in symbols:
+            move = rng.gauss(0, 0.002) + (rng.gauss(0, 0.03) if rng.random() < 0.001 else 0.0)
+            prices[s] = max(0.01, prices[s] * math.exp(move))
+            rows.append((ts, s, round(prices[s], 4)))
+    if path.endswith(".npz"):
+        import numpy as np
+        index = {s: i for i, s in enumerate(symbols)}
+        np.savez(path, ts=np.array([(ts - datetime(1970, 1, 1)).total_seconds() for ts, _, _ in rows]),
+                 symbol=np.array([index[s] for _, s, _ in rows], dtype=np.int32),
+                 price=np.array([p for _, _, p in rows]), symbols=np.array(symbols))
+    else:
+        with open(path, "w", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(["timestamp", "symbol", "price"])
+            for ts, s, p in rows:
+                w.writerow([ts.isoformat(), s, p])
+    print(f"Wrote {len(rows)} ticks for {len(symbols)} symbols to {path}")
+
+class Account:
+    """
+    One synthetic trader. Styles:
+      scalper  market orders alternating buy/sell
+      trend    buys after a rise, sells after a fall
+      resting  alternates a buy limit below and a sell limit above the price
+    """
+
+    def __init__(self, uc_id, index, symbols, balance, seed):
+        rng = random.Random(seed * 100003 + index)
+        self.uc_id = uc_id
+        self.style = rng.choices(("scalper", "trend", "resting"), weights=(4, 4, 2))[0]
+        self.symbol = rng.choice(symbols)
+        self.every = rng.randint(5, 60)
+        self.offset = rng.randrange(self.every)
+        self.notional = balance * rng.uniform(0.005, 0.04)
+        self.band = rng.uniform(0.001, 0.01)
+        self.actions = 0
+        self.last_price = None
+        self.active = True
+
+    def due(self, step):
+        return self.active and step >= self.offset and (step - self.offset) % self.every == 0
+
+    def next_order(self, price):
+        """
+        (side, order_type or None for market, trigger, quantity) or None.
+        """
+        self.actions += 1
+        quantity = round(self.notional / price, 4)
+        if quantity <= 0:
+            return None
+        if self.style == "scalper":
+            return ("buy" if self.actions % 2 else "sell"), None, None, quantity
+        if self.style == "trend":
+            last, self.last_price = self.last_price, price
+            if last is None or last == price:
+                return None
+            return ("buy" if price > last else "sell"), None, None, quantity
+        if self.actions % 2:
+            return "buy", "limit", round(price * (1 - self.band), 4), quantity
+        return "sell", "limit", round(price * (1 + self.band), 4), quantity
+
+def _percentiles(samples):
+    if not samples:
+        return {"p50": None, "p99": None, "max": None}
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {"p50": round(pick(0.5), 3), "p99": round(pick(0.99), 3), "max": round(ordered[-1], 3)}
+
+def replay(ticks_path, accounts, seed, speed, sweep_every, plan_name):
+    from app import create_app
+    from app.bootstrap import bootstrap
+    from app.db import db
+    from sqlalchemy import func, insert, select
+    from app.models import User, UserChallenge, ChallengePlan, PendingOrder, Trade
+    from app.services import bulk_ops, risk_engine
+    from app.services.execution import execute_order, ExecutionError
+    from app.services.order_book import OrderBook
+    from app.services.price_service import PriceService
+
+    app = create_app()
+    with app.app_context():
+        bootstrap()
+        plan = db.session.query(ChallengePlan).filter_by(name=plan_name).first() or db.session.query(ChallengePlan).first()
+        db.session.execute(insert(User.__table__), [
+            {"email": f"replay{i}@example.com", "password_hash": "x", "created_at": datetime.utcnow()}
+            for i in range(accounts)])
+        db.session.commit()
+        user_ids = db.session.execute(select(User.id).order_by(User.id)).scalars().all()
+        list(bulk_ops.provision(plan.id, user_ids))
+        uc_ids = db.session.execute(select(UserChallenge.id).order_by(UserChallenge.id)).scalars().all()
+        balance = plan.starting_balance
+
+    # Nothing upstream: requests read only the snapshot the replay writes
+    PriceService.feed_running = True
+    OrderBook.clear()
+
+    symbols = sorted({s for _, prices in read_ticks(ticks_path) for s in prices})
+    traders = [Account(uc_id, i, symbols, balance, seed) for i, uc_id in enumerate(uc_ids)]
+    last = {}
+    counts = Counter()
+    rejected = Counter()
+    latencies = []
+    sweep_ms = []
+    first_ts = last_ts = None
+    started = time.perf_counter()
+
+    with app.app_context():
+        for step, (ts, prices) in enumerate(read_ticks(ticks_path)):
+            if speed and last_ts is not None:
+                # Accelerated wall-clock pacing: sleep the scaled gap between ticks
+                time.sleep(max(0.0, (ts - last_ts).total_seconds() / speed))
+            first_ts = first_ts or ts
+            last_ts = ts
+            for symbol, price in prices.items():
+                PriceService._store(symbol, price, "replay", ts)
+            last.update(prices)
+
+            resting = []
+            for trader in traders:
+                if not trader.due(step) or trader.symbol not in last:
+                    continue
+                order = trader.next_order(last[trader.symbol])
+                if order is None:
+                    continue
+                side, order_type, trigger, quantity = order
+                if order_type is None:
+                    counts["market"] += 1
+                    t0 = time.perf_counter()
+                    try:
+                        execute_order(trader.uc_id, trader.symbol, side, quantity, last[trader.symbol], now=ts)
+                        counts["market_filled"] += 1
+                    except ExecutionError as e:
+                        rejected[e.code] += 1
+                        if e.code == "invalid":
+                            trader.active = False
+                    latencies.append((time.perf_counter() - t0) * 1000)
+                else:
+                    resting.append(PendingOrder(user_challenge_id=trader.uc_id, symbol=trader.symbol, side=side,
+                                                order_type=order_type, trigger_price=trigger, quantity=quantity,
+                                                created_at=ts))
+            if resting:
+                db.session.add_all(resting)
+                db.session.commit()
+                for o in resting:
+                    OrderBook.add(o.id, o.symbol, o.side, o.order_type, o.trigger_price)
+                counts["resting_placed"] += len(resting)
+
+            counts["resting_filled"] += OrderBook.match(prices, now=ts)
+            if sweep_every and step % sweep_every == sweep_every - 1:
+                t0 = time.perf_counter()
+                risk_engine.sweep(prices=dict(last), now=ts)
+                sweep_ms.append((time.perf_counter() - t0) * 1000)
+            counts["ticks"] += 1
+            db.session.remove()
+
+        # Final mark so the report reflects the closing prices
+        if last:
+            risk_engine.sweep(prices=dict(last), now=last_ts)
+        wall = time.perf_counter() - started
+
+        statuses = dict(db.session.execute(
+            select(UserChallenge.status, func.count()).group_by(UserChallenge.status)).all())
+        ended = db.session.execute(
+            select(UserChallenge.status, UserChallenge.end_date).where(UserChallenge.end_date.isnot(None))).all()
+        by_day = {}
+        for status, end in ended:
+            day = by_day.setdefault(end.date().isoformat(), {"failed": 0, "passed": 0})
+            day[status] = day.get(status, 0) + 1
+        trades, pnl = db.session.execute(select(func.count(Trade.id), func.coalesce(func.sum(Trade.pnl), 0.0))).one()
+        equity = db.session.execute(select(func.coalesce(func.sum(UserChallenge.equity), 0.0))).scalar()
+
+    total_orders = counts["market"] + counts["resting_placed"]
+    return {
+        "ticks": counts["ticks"],
+        "symbols": symbols,
+        "accounts": accounts,
+        "replay_span": [first_ts.isoformat() if first_ts else None, last_ts.isoformat() if last_ts else None],
+        "orders": {"market": counts["market"], "resting_placed": counts["resting_placed"],
+                   "rejected": dict(sorted(rejected.items()))},
+        "fills": {"market": counts["market_filled"], "resting": counts["resting_filled"],
+                  "total": counts["market_filled"] + counts["resting_filled"]},
+        "challenges": {s: statuses.get(s, 0) for s in ("active", "failed", "passed")},
+        "breaches_by_day": dict(sorted(by_day.items())),
+        "checksum": {"trades": trades, "realized_pnl": round(float(pnl), 4), "equity": round(float(equity), 4)},
+        "wall_seconds": round(wall, 3),
+        "ticks_per_s": round(counts["ticks"] / wall, 1) if wall else None,
+        "orders_per_s": round(total_orders / wall, 1) if wall else None,
+        "order_latency_ms": _percentiles(latencies),
+        "sweep_ms": _percentiles(sweep_ms),
+    }
+
+def compare(report, expected):
+    """
+    Differences in the deterministic sections, as printable lines.
+    """
+    return [f"{key}: expected {json.dumps(expected.get(key))}, got {json.dumps(report.get(key))}"
+            for key in DETERMINISTIC if report.get(key) != expected.get(key)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("ticks", nargs="?", help="tick file (.csv or .npz)")
+    parser.add_argument("--generate", metavar="PATH", help="write a synthetic tick file and exit")
+    parser.add_argument("--symbols", default="AAPL,TSLA,NVDA,MSFT,EURUSD")
+    parser.add_argument("--ticks", dest="tick_count", type=int, default=5000)
+    parser.add_argument("--step", type=float, default=5.0, help="seconds between generated ticks")
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="replay time per wall second (e.g. 60 = one minute per second; 0 = as fast as possible)")
+    parser.add_argument("--sweep-every", type=int, default=12, help="ticks between risk sweeps (0 = only at the end)")
+    parser.add_argument("--plan", default="Pro")
+    parser.add_argument("--db", help="SQLite file to use (default: a fresh temporary one)")
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--expect", help="previous report to regression-check against")
+    args = parser.parse_args()
+
+    if args.generate:
+        generate(args.generate, args.symbols.split(","), args.tick_count, args.step, args.seed)
+        return 0
+    if not args.ticks:
+        parser.error("a tick file is required (or --generate)")
+
+    _setup_env(args.db or os.path.join(tempfile.mkdtemp(), "replay.db"))
+    report = replay(args.ticks, args.accounts, args.seed, args.speed, args.sweep_every, args.plan)
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.expect:
+        with open(args.expect) as f:
+            diffs = compare(report, json.load(f))
+        for line in diffs:
+            print(f"MISMATCH {line}")
+        return 1 if diffs else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Concurrent write throughput against a file-backed SQLite database, with and
+without the engine tuning in app/db_engine.py (WAL, pragmas, busy retries).
+
+Each worker process builds the app like a gunicorn worker would and fires
+market orders through the execution core on its own challenge.
+
+    python benchmarks/sqlite_writes.py --workers 4 --orders 200
+"""
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _setup_env(db_path, tuned):
+    sys.path.insert(0, BACKEND_DIR)
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["SQLITE_TUNING"] = "1" if tuned else "0"
+    os.environ["PRICE_FEED_ENABLED"] = "0"
+    os.environ["RISK_SWEEP_INTERVAL"] = "0"
+
+def _prepare(db_path, tuned, workers, out):
+    _setup_env(db_path, tuned)
+    from app import create_app
+    from app.bootstrap import bootstrap
+    from app.db import db
+    from app.models import User, ChallengePlan, UserChallenge
+    app = create_app()
+    ids = []
+    with app.app_context():
+        bootstrap()
+        plan = db.session.query(ChallengePlan).first()
+        for i in range(workers):
+            user = User(email=f"bench{i}@example.com", password_hash="x")
+            db.session.add(user)
+            db.session.flush()
+            uc = UserChallenge(user_id=user.id, challenge_id=plan.id, equity=plan.starting_balance,
+                               daily_start_equity=plan.starting_balance, highest_equity=plan.starting_balance,
+                               lowest_equity=plan.starting_balance, cash_balance=plan.starting_balance,
+                               realized_pnl=0.0, trade_count=0)
+            db.session.add(uc)
+            db.session.flush()
+            ids.append(uc.id)
+        db.session.commit()
+    out.put(ids)
+
+def _worker(db_path, tuned, uc_id, orders, start, out):
+    _setup_env(db_path, tuned)
+    from app import create_app
+    from app.services.execution import execute_order
+    app = create_app()
+    errors = 0
+    while time.time() < start:
+        time.sleep(0.001)
+    began = time.perf_counter()
+    with app.app_context():
+        for i in range(orders):
+            try:
+                execute_order(uc_id, "BENCH", "buy" if i % 2 == 0 else "sell", 1, 100.0 + i % 5)
+            except Exception as e:
+                errors += 1
+                print(f"worker {uc_id}: {e.__class__.__name__}: {str(e)[:80]}")
+    out.put((orders - errors, errors, time.perf_counter() - began))
+
+def run(tuned, workers, orders):
+    # Spawned children: Config reads DATABASE_URL at import, so nothing may be inherited
+    ctx = mp.get_context("spawn")
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    out = ctx.Queue()
+    prep = ctx.Process(target=_prepare, args=(db_path, tuned, workers, out))
+    prep.start()
+    ids = out.get()
+    prep.join()
+    start = time.time() + 5.0
+    procs = [ctx.Process(target=_worker, args=(db_path, tuned, uc_id, orders, start, out)) for uc_id in ids]
+    for p in procs:
+        p.start()
+    results = [out.get() for _ in procs]
+    for p in procs:
+        p.join()
+    ok = sum(r[0] for r in results)
+    errors = sum(r[1] for r in results)
+    wall = max(r[2] for r in results)
+    return {"mode": "tuned" if tuned else "default", "orders": ok, "errors": errors,
+            "seconds": round(wall, 2), "orders_per_sec": round(ok / wall, 1)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--orders", type=int, default=200, help="orders per worker")
+    args = parser.parse_args()
+    for tuned in (False, True):
+        print(run(tuned, args.workers, args.orders))
@@ -0,0 +1,72 @@
+"""
+Cold-start cost of a worker: `import app`, create_app() and the first
+requests, each measured in a fresh interpreter (like a newly forked gunicorn
+worker that hasn't imported anything yet).
+
+    python benchmarks/startup.py --runs 5
+
+The market request goes through the price layer; without network access it
+measures the yfinance import plus a failed fetch falling back to simulation.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+application = app.create_app()
+t2 = time.perf_counter()
+client = application.test_client()
+client.get("/api/challenges/")
+t3 = time.perf_counter()
+client.get("/api/market/price?symbol=AAPL")
+t4 = time.perf_counter()
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "create_app_ms": (t2 - t1) * 1000,
+                  "first_request_ms": (t3 - t2) * 1000, "first_market_request_ms": (t4 - t3) * 1000}))
+"""
+
+BOOT_CHECK = r"""
+import json, sys, app
+app.create_app()
+print(json.dumps([m for m in ("numpy", "pandas", "yfinance", "requests", "bs4", "alembic") if m in sys.modules]))
+"""
+
+def _env(db_path):
+    env = dict(os.environ)
+    env.update({"DATABASE_URL": f"sqlite:///{db_path}", "PRICE_FEED_ENABLED": "0"})
+    return env
+
+def _python(code, env):
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "startup.db")
+    env = _env(db_path)
+    subprocess.run([sys.executable, "-m", "flask", "--app", "cli", "init-db"], cwd=BACKEND_DIR, env=env,
+                   capture_output=True, check=True)
+
+    modules_after_boot = _python(BOOT_CHECK, env)
+    runs = [_python(CHILD, env) for _ in range(args.runs)]
+    result = {"runs": args.runs, "heavy_modules_after_create_app": modules_after_boot}
+    for key in ("import_ms", "create_app_ms", "first_request_ms", "first_market_request_ms"):
+        values = [r[key] for r in runs]
+        result[key] = {"median": round(statistics.median(values), 1), "min": round(min(values), 1)}
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
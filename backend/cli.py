@@ -0,0 +1,11 @@
+import os
+
+# App for one-shot commands (`flask --app cli init-db`, the Procfile release
+# phase): no price feed, scrapers, sweeps or hashing pool running while
+# migrations are applied.
+os.environ["PRICE_FEED_ENABLED"] = "0"
+os.environ["PASSWORD_HASH_WORKERS"] = "0"
+
+from app import create_app
+
+app = create_app()
@@ -1,4 +1,5 @@
 import os
+from datetime import timedelta
 
 class Config:
     # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
@@ -14,8 +15,95 @@ class Config:
     
     # Disable modification tracking to save memory
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Engine tuning (app/db_engine.py): WAL + pragmas on SQLite, pool sizing on both backends
+    SQLITE_TUNING = os.getenv("SQLITE_TUNING", "1") == "1"
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+    # Request threads per gunicorn gthread worker (the Procfile reads the same variable).
+    # Every thread can hold a connection, so the pool defaults to one per thread.
+    WEB_THREADS = int(os.getenv("WEB_THREADS", "16"))
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", str(WEB_THREADS)))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    # Extra attempts for a unit of work that still finds SQLite busy after busy_timeout
+    DB_BUSY_RETRIES = int(os.getenv("DB_BUSY_RETRIES", "5"))
     
     # Security and CORS
     SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret")
     CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*")
     ADMIN_KEY = os.getenv("ADMIN_KEY", "super-secret-admin-key")
+
+    # Password hashing (werkzeug method string). Changing it rehashes each user on next login.
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    # Hash process pool per app worker (0 = hash inline) and how many jobs may wait before 503
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "32"))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
+
+    # Background price feed (keeps PriceService warm so requests never wait on yfinance)
+    PRICE_FEED_ENABLED = os.getenv("PRICE_FEED_ENABLED", "1") == "1"
+    PRICE_FEED_INTERVAL = int(os.getenv("PRICE_FEED_INTERVAL", "5"))
+    PRICE_WATCH_TTL = timedelta(seconds=int(os.getenv("PRICE_WATCH_TTL", "300")))
+    # "memory" keeps quotes per worker; "sqlite" shares them between workers on one host
+    PRICE_CACHE_BACKEND = os.getenv("PRICE_CACHE_BACKEND", "memory")
+    PRICE_CACHE_PATH = os.getenv("PRICE_CACHE_PATH", os.path.join(BASE_DIR, 'database', 'price_cache.db'))
+
+    # Server-Sent Events: seconds between ticks of the shared stream loop
+    STREAM_INTERVAL = float(os.getenv("STREAM_INTERVAL", "2"))
+    # Open SSE connections allowed per worker (0 = unlimited). On gthread each one
+    # pins a request thread, so the default leaves most threads for the API;
+    # stream_wsgi.py (gevent) lifts the cap.
+    STREAM_MAX_CONNECTIONS = int(os.getenv("STREAM_MAX_CONNECTIONS", str(max(WEB_THREADS // 4, 1))))
+
+    # Seconds between vectorized mark-to-market/rule sweeps over all active challenges (0 = off)
+    RISK_SWEEP_INTERVAL = int(os.getenv("RISK_SWEEP_INTERVAL", "60"))
+
+    # Casablanca Stock Exchange scraper (background fetch + circuit breaker)
+    BVC_BASE_URL = os.getenv("BVC_BASE_URL", "https://www.casablanca-bourse.com/bourseweb/indice-cours-entreprise.aspx")
+    BVC_REFRESH_INTERVAL = int(os.getenv("BVC_REFRESH_INTERVAL", "60"))
+    BVC_FRESH_TTL = int(os.getenv("BVC_FRESH_TTL", "180"))
+    BVC_TIMEOUT = float(os.getenv("BVC_TIMEOUT", "5"))
+    BVC_BREAKER_THRESHOLD = int(os.getenv("BVC_BREAKER_THRESHOLD", "3"))
+    BVC_BREAKER_COOLDOWN = int(os.getenv("BVC_BREAKER_COOLDOWN", "300"))
+
+    # Daily bar store behind the indicator engine (/api/market/ai/signal)
+    BAR_STORE_DIR = os.getenv("BAR_STORE_DIR", os.path.join(BASE_DIR, 'database', 'bars'))
+    BAR_REFRESH_TTL = int(os.getenv("BAR_REFRESH_TTL", "3600"))
+
+    # Equity curve series: min seconds between unchanged ticks, rollup/retention job
+    # interval (0 = off), days each fine level is kept, max points per curve response
+    EQUITY_TICK_INTERVAL = int(os.getenv("EQUITY_TICK_INTERVAL", "5"))
+    EQUITY_ROLLUP_INTERVAL = int(os.getenv("EQUITY_ROLLUP_INTERVAL", "60"))
+    EQUITY_TICK_RETENTION_DAYS = int(os.getenv("EQUITY_TICK_RETENTION_DAYS", "2"))
+    EQUITY_MINUTE_RETENTION_DAYS = int(os.getenv("EQUITY_MINUTE_RETENTION_DAYS", "30"))
+    EQUITY_HOUR_RETENTION_DAYS = int(os.getenv("EQUITY_HOUR_RETENTION_DAYS", "365"))
+    EQUITY_MAX_POINTS = int(os.getenv("EQUITY_MAX_POINTS", "1000"))
+
+    # Price source: "market" (yfinance, simulated fallback) or "sim" (offline MarketSimulator).
+    # SIM_TICK_SECONDS is wall time per simulated step (0 = only moved by advance());
+    # SIM_SEED defaults to one derived from DATABASE_URL, so all workers simulate the same paths;
+    # SIM_PROFILES_PATH is an optional JSON {symbol: {price, vol, drift, group, beta, jump_*}}
+    PRICE_SOURCE = os.getenv("PRICE_SOURCE", "market")
+    SIM_SEED = os.getenv("SIM_SEED", "")
+    SIM_TICK_SECONDS = float(os.getenv("SIM_TICK_SECONDS", "1"))
+    SIM_BLOCK = int(os.getenv("SIM_BLOCK", "4096"))
+    SIM_PROFILES_PATH = os.getenv("SIM_PROFILES_PATH", "")
+
+    # Cached read-mostly responses (plans, settings, leaderboard): max seconds another
+    # worker's write can go unseen; writes in the same worker invalidate immediately
+    RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") == "1"
+    RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "30"))
+
+    # Prometheus-style /metrics (per worker); set METRICS_TOKEN to require a bearer token
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+    # Sampled cProfile dumps of slow requests. These are the defaults; POST
+    # /api/admin/profiling writes PROFILE_CONTROL_PATH to change them at runtime
+    PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "0") == "1"
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0.1"))
+    PROFILE_THRESHOLD_MS = int(os.getenv("PROFILE_THRESHOLD_MS", "500"))
+    PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+    PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(BASE_DIR, 'database', 'profiles'))
+    PROFILE_CONTROL_PATH = os.getenv("PROFILE_CONTROL_PATH", os.path.join(BASE_DIR, 'database', 'profiling.json'))
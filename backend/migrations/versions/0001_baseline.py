@@ -0,0 +1,102 @@
+"""Baseline schema (tables as created by db.create_all before migrations)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+Databases that were bootstrapped by db.create_all already have some or all
+of these tables; only the missing ones are created, so `upgrade head` works
+on both fresh and existing databases.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "user" not in existing:
+        op.create_table(
+            "user",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("email", sa.String(255), nullable=False, unique=True),
+            sa.Column("password_hash", sa.String(255), nullable=False),
+            sa.Column("created_at", sa.DateTime),
+        )
+    if "challenge_plan" not in existing:
+        op.create_table(
+            "challenge_plan",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("name", sa.String(100), nullable=False),
+            sa.Column("price_dh", sa.Integer, nullable=False),
+            sa.Column("starting_balance", sa.Float, nullable=False),
+            sa.Column("profit_target_pct", sa.Float),
+            sa.Column("max_daily_loss_pct", sa.Float),
+            sa.Column("max_total_loss_pct", sa.Float),
+        )
+    if "user_challenge" not in existing:
+        op.create_table(
+            "user_challenge",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("user_id", sa.Integer, sa.ForeignKey("user.id"), nullable=False),
+            sa.Column("challenge_id", sa.Integer, sa.ForeignKey("challenge_plan.id"), nullable=False),
+            sa.Column("status", sa.String(20)),
+            sa.Column("start_date", sa.DateTime),
+            sa.Column("end_date", sa.DateTime),
+            sa.Column("equity", sa.Float, nullable=False),
+            sa.Column("daily_start_equity", sa.Float, nullable=False),
+            sa.Column("highest_equity", sa.Float, nullable=False),
+            sa.Column("lowest_equity", sa.Float, nullable=False),
+            sa.Column("last_updated", sa.DateTime),
+        )
+    if "trade" not in existing:
+        op.create_table(
+            "trade",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("user_challenge_id", sa.Integer, sa.ForeignKey("user_challenge.id"), nullable=False),
+            sa.Column("symbol", sa.String(50), nullable=False),
+            sa.Column("side", sa.String(10), nullable=False),
+            sa.Column("quantity", sa.Float, nullable=False),
+            sa.Column("price", sa.Float, nullable=False),
+            sa.Column("timestamp", sa.DateTime),
+            sa.Column("pnl", sa.Float),
+        )
+    if "position" not in existing:
+        op.create_table(
+            "position",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("user_challenge_id", sa.Integer, sa.ForeignKey("user_challenge.id"), nullable=False),
+            sa.Column("symbol", sa.String(50), nullable=False),
+            sa.Column("quantity", sa.Float, nullable=False),
+            sa.Column("avg_price", sa.Float, nullable=False),
+            sa.Column("side", sa.String(10), nullable=False),
+            sa.Column("opened_at", sa.DateTime),
+        )
+    if "payment" not in existing:
+        op.create_table(
+            "payment",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("user_id", sa.Integer, sa.ForeignKey("user.id"), nullable=False),
+            sa.Column("amount", sa.Float, nullable=False),
+            sa.Column("method", sa.String(20), nullable=False),
+            sa.Column("status", sa.String(20), nullable=False),
+            sa.Column("meta", sa.JSON),
+            sa.Column("timestamp", sa.DateTime),
+        )
+    if "settings" not in existing:
+        op.create_table(
+            "settings",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("paypal_client_id", sa.String(255)),
+            sa.Column("paypal_secret", sa.String(255)),
+        )
+
+
+def downgrade():
+    for table in ("settings", "payment", "position", "trade", "user_challenge", "challenge_plan", "user"):
+        op.drop_table(table)
@@ -0,0 +1,72 @@
+"""Running ledger columns, monthly leaderboard aggregates, resting orders
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+Catches up with the tables and columns added since the baseline. Each step is
+skipped when db.create_all already created it.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    insp = sa.inspect(op.get_bind())
+    tables = set(insp.get_table_names())
+
+    # Left NULL on existing rows: services/ledger.ensure_ledger backfills them lazily
+    uc_columns = {c["name"] for c in insp.get_columns("user_challenge")}
+    with op.batch_alter_table("user_challenge") as batch:
+        if "realized_pnl" not in uc_columns:
+            batch.add_column(sa.Column("realized_pnl", sa.Float))
+        if "cash_balance" not in uc_columns:
+            batch.add_column(sa.Column("cash_balance", sa.Float))
+        if "trade_count" not in uc_columns:
+            batch.add_column(sa.Column("trade_count", sa.Integer))
+
+    if "monthly_stat" not in tables:
+        op.create_table(
+            "monthly_stat",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("month", sa.String(7), nullable=False),
+            sa.Column("user_challenge_id", sa.Integer, sa.ForeignKey("user_challenge.id"), nullable=False),
+            sa.Column("user_id", sa.Integer, sa.ForeignKey("user.id"), nullable=False),
+            sa.Column("starting_balance", sa.Float, nullable=False),
+            sa.Column("pnl", sa.Float, nullable=False),
+            sa.Column("trade_count", sa.Integer, nullable=False),
+            sa.UniqueConstraint("month", "user_challenge_id", name="uq_monthly_stat_month_uc"),
+        )
+
+    if "pending_order" not in tables:
+        op.create_table(
+            "pending_order",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("user_challenge_id", sa.Integer, sa.ForeignKey("user_challenge.id"), nullable=False),
+            sa.Column("symbol", sa.String(50), nullable=False),
+            sa.Column("side", sa.String(10), nullable=False),
+            sa.Column("order_type", sa.String(20), nullable=False),
+            sa.Column("trigger_price", sa.Float, nullable=False),
+            sa.Column("quantity", sa.Float, nullable=False),
+            sa.Column("status", sa.String(20), nullable=False),
+            sa.Column("created_at", sa.DateTime),
+            sa.Column("filled_at", sa.DateTime),
+            sa.Column("fill_price", sa.Float),
+            sa.Column("trade_id", sa.Integer, sa.ForeignKey("trade.id")),
+        )
+        op.create_index("ix_pending_order_status_id", "pending_order", ["status", "id"])
+        op.create_index("ix_pending_order_uc_status", "pending_order", ["user_challenge_id", "status"])
+
+
+def downgrade():
+    op.drop_table("pending_order")
+    op.drop_table("monthly_stat")
+    with op.batch_alter_table("user_challenge") as batch:
+        batch.drop_column("trade_count")
+        batch.drop_column("cash_balance")
+        batch.drop_column("realized_pnl")
@@ -0,0 +1,72 @@
+"""Indexes for the hot query paths and one position per (challenge, symbol)
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+- trade (user_challenge_id, timestamp): history pages and per-challenge scans
+- position (user_challenge_id, symbol) UNIQUE: the per-order position lookup;
+  duplicate rows left by the old read-modify-write race are merged first
+- user_challenge (user_id, status): login and /api/challenges/active
+- user_challenge (status, id): the risk sweep over active challenges
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_trade_uc_ts", "trade", ["user_challenge_id", "timestamp"], False),
+    ("uq_position_uc_symbol", "position", ["user_challenge_id", "symbol"], True),
+    ("ix_user_challenge_user_status", "user_challenge", ["user_id", "status"], False),
+    ("ix_user_challenge_status_id", "user_challenge", ["status", "id"], False),
+]
+
+
+def _merge_duplicate_positions(bind):
+    """
+    Net duplicate (challenge, symbol) rows into the oldest one: signed quantities
+    are summed and the average price is the weighted average of the rows on the
+    surviving side.
+    """
+    dups = bind.execute(sa.text(
+        "SELECT user_challenge_id, symbol FROM position "
+        "GROUP BY user_challenge_id, symbol HAVING COUNT(*) > 1")).fetchall()
+    for uc_id, symbol in dups:
+        rows = bind.execute(sa.text(
+            "SELECT id, side, quantity, avg_price FROM position "
+            "WHERE user_challenge_id = :uc AND symbol = :s ORDER BY id"), {"uc": uc_id, "s": symbol}).fetchall()
+        net = sum(q if side == "long" else -q for _, side, q, _ in rows)
+        keep = rows[0][0]
+        bind.execute(sa.text("DELETE FROM position WHERE user_challenge_id = :uc AND symbol = :s AND id != :keep"),
+                     {"uc": uc_id, "s": symbol, "keep": keep})
+        if net == 0:
+            bind.execute(sa.text("DELETE FROM position WHERE id = :keep"), {"keep": keep})
+            continue
+        side = "long" if net > 0 else "short"
+        same = [(q, p) for _, s, q, p in rows if s == side]
+        avg = sum(q * p for q, p in same) / sum(q for q, _ in same)
+        bind.execute(sa.text("UPDATE position SET side = :side, quantity = :q, avg_price = :p WHERE id = :keep"),
+                     {"side": side, "q": abs(net), "p": avg, "keep": keep})
+        logger.info("Merged %d positions for challenge %s %s", len(rows), uc_id, symbol)
+
+
+def upgrade():
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    _merge_duplicate_positions(bind)
+    for name, table, columns, unique in INDEXES:
+        if name not in {ix["name"] for ix in insp.get_indexes(table)}:
+            op.create_index(name, table, columns, unique=unique)
+
+
+def downgrade():
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
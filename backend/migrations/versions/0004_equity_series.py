@@ -0,0 +1,48 @@
+"""Equity snapshot series and running max drawdown
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+- equity_snapshot: raw ticks plus minute/hour/day rollups per challenge
+- user_challenge.max_drawdown_pct, starting at 0 for existing challenges
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    columns = {c["name"] for c in insp.get_columns("user_challenge")}
+    if "max_drawdown_pct" not in columns:
+        with op.batch_alter_table("user_challenge") as batch:
+            batch.add_column(sa.Column("max_drawdown_pct", sa.Float))
+        op.execute("UPDATE user_challenge SET max_drawdown_pct = 0.0")
+
+    if "equity_snapshot" not in insp.get_table_names():
+        op.create_table(
+            "equity_snapshot",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("user_challenge_id", sa.Integer, sa.ForeignKey("user_challenge.id"), nullable=False),
+            sa.Column("resolution", sa.Integer, nullable=False),
+            sa.Column("bucket", sa.DateTime, nullable=False),
+            sa.Column("open", sa.Float, nullable=False),
+            sa.Column("high", sa.Float, nullable=False),
+            sa.Column("low", sa.Float, nullable=False),
+            sa.Column("close", sa.Float, nullable=False),
+        )
+        op.create_index("ix_equity_snapshot_uc_res_bucket", "equity_snapshot",
+                        ["user_challenge_id", "resolution", "bucket"])
+        op.create_index("ix_equity_snapshot_res_bucket", "equity_snapshot", ["resolution", "bucket"])
+
+
+def downgrade():
+    op.drop_table("equity_snapshot")
+    with op.batch_alter_table("user_challenge") as batch:
+        batch.drop_column("max_drawdown_pct")
@@ -0,0 +1,31 @@
+"""Job leases for singleton background jobs
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+- job_lease: one row per scheduled job (risk sweep, equity rollup) held by
+  whichever worker runs it this interval
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    insp = sa.inspect(op.get_bind())
+    if "job_lease" not in insp.get_table_names():
+        op.create_table(
+            "job_lease",
+            sa.Column("name", sa.String(100), primary_key=True),
+            sa.Column("owner", sa.String(100), nullable=False),
+            sa.Column("expires_at", sa.DateTime, nullable=False),
+        )
+
+
+def downgrade():
+    op.drop_table("job_lease")
@@ -0,0 +1,29 @@
+"""Retry count for resting order fills
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+
+- pending_order.fill_attempts: fill transactions that raised; the matching
+  engine gives up on the order (status 'failed') after a few
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    insp = sa.inspect(op.get_bind())
+    columns = {c["name"] for c in insp.get_columns("pending_order")}
+    if "fill_attempts" not in columns:
+        with op.batch_alter_table("pending_order") as batch:
+            batch.add_column(sa.Column("fill_attempts", sa.Integer, nullable=False, server_default="0"))
+
+
+def downgrade():
+    with op.batch_alter_table("pending_order") as batch:
+        batch.drop_column("fill_attempts")
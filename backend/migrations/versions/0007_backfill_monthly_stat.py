@@ -0,0 +1,43 @@
+"""Backfill the monthly leaderboard aggregates
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+
+monthly_stat is only fed by new trades, and the leaderboard used to backfill
+a month lazily when it had no aggregate rows at all, so a month with both
+older trades and one recorded after the upgrade stayed incomplete. Rebuild
+every month from the trade table once; leaderboard_service no longer
+backfills on read.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        month = "to_char(trade.timestamp, 'YYYY-MM')"
+    else:
+        month = "strftime('%Y-%m', trade.timestamp)"
+    op.execute("DELETE FROM monthly_stat")
+    op.execute(sa.text(
+        "INSERT INTO monthly_stat (month, user_challenge_id, user_id, starting_balance, pnl, trade_count) "
+        f"SELECT {month}, trade.user_challenge_id, user_challenge.user_id, challenge_plan.starting_balance, "
+        "COALESCE(SUM(trade.pnl), 0.0), COUNT(trade.id) "
+        "FROM trade "
+        "JOIN user_challenge ON user_challenge.id = trade.user_challenge_id "
+        "JOIN challenge_plan ON challenge_plan.id = user_challenge.challenge_id "
+        "WHERE trade.timestamp IS NOT NULL "
+        f"GROUP BY {month}, trade.user_challenge_id, user_challenge.user_id, challenge_plan.starting_balance"
+    ))
+
+
+def downgrade():
+    # Data only: the rows stay valid aggregates under 0006
+    pass
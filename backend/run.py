@@ -1,5 +1,5 @@
 from app import create_app
-from app.blueprints.challenges import seed_default_plans
+from app.bootstrap import bootstrap
 from dotenv import load_dotenv
 import os
 
@@ -7,8 +7,10 @@ load_dotenv()
 
 app = create_app()
 
+# Dev server is a single process: bring the schema up to date here.
+# Deployments run `flask --app cli init-db` once instead.
 with app.app_context():
-    seed_default_plans()
+    bootstrap()
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000)
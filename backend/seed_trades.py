@@ -1,6 +1,7 @@
 from app import create_app
 from app.db import db
 from app.models import User, UserChallenge, Trade, ChallengePlan
+from app.services.leaderboard_service import rebuild_month, month_key
 import random
 from datetime import datetime, timedelta
 
@@ -54,6 +55,8 @@ def seed():
                 count += 1
         
         db.session.commit()
+        # Trades were inserted directly, so refresh the leaderboard aggregates
+        rebuild_month(month_key())
         print(f"Added {count} trades.")
 
 if __name__ == "__main__":
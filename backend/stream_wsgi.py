@@ -0,0 +1,19 @@
+import os
+
+# Entry point of the `stream` process (see Procfile): the same app under
+# gunicorn's gevent worker, meant to serve /api/stream only. Each open SSE
+# connection is a greenlet waiting on its queue rather than a pinned thread,
+# so no per-worker connection cap is needed.
+os.environ["STREAM_MAX_CONNECTIONS"] = "0"
+# The hashing process pool blocks on its result pipe, which would stall the
+# gevent loop; login/register are not routed here, so hash inline.
+os.environ["PASSWORD_HASH_WORKERS"] = "0"
+# No price feed, BVC scrape, risk sweep or equity rollup: they block on numpy
+# and SQLite and would starve every stream greenlet. The `web` workers run
+# them; this process only runs the StreamHub tick, reading quotes from the
+# shared price cache (PRICE_CACHE_BACKEND=sqlite) and fetching a stale one itself.
+os.environ["PRICE_FEED_ENABLED"] = "0"
+
+from app import create_app
+
+app = create_app()
@@ -0,0 +1,44 @@
+import os
+import sys
+import tempfile
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Config reads the environment at import time, so this runs before the app is imported
+_workdir = tempfile.mkdtemp()
+DB_PATH = os.path.join(_workdir, "test.db")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{DB_PATH}",
+    "ADMIN_KEY": "test-admin-key",
+    "PRICE_FEED_ENABLED": "0",
+    "PRICE_CACHE_BACKEND": "memory",
+    "RISK_SWEEP_INTERVAL": "0",
+    "EQUITY_ROLLUP_INTERVAL": "0",
+    "PASSWORD_HASH_WORKERS": "0",
+    "PRICE_SOURCE": "sim",
+    "SIM_SEED": "1",
+    "SIM_TICK_SECONDS": "0",
+    "BAR_STORE_DIR": os.path.join(_workdir, "bars"),
+    "PROFILE_DIR": os.path.join(_workdir, "profiles"),
+    "PROFILE_CONTROL_PATH": os.path.join(_workdir, "profiling.json"),
+})
+
+@pytest.fixture
+def app():
+    """
+    App on a freshly migrated database with the default plans.
+    """
+    from app import create_app
+    from app.db import db
+    from app.bootstrap import bootstrap
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(DB_PATH + suffix):
+            os.remove(DB_PATH + suffix)
+    app = create_app()
+    with app.app_context():
+        bootstrap()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
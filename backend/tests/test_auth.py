@@ -0,0 +1,11 @@
+from app.services.metrics import Metrics
+from app.services.password_hasher import PasswordHasher
+
+def test_register_failure_hides_the_exception(app, monkeypatch):
+    def boom(password):
+        raise RuntimeError("secret detail")
+    monkeypatch.setattr(PasswordHasher, "hash", boom)
+    resp = app.test_client().post("/api/auth/register", json={"email": "a@example.com", "password": "pw"})
+    assert resp.status_code == 500
+    assert resp.get_json() == {"error": "server_error"}
+    assert 'auth_errors_total{endpoint="register"}' in Metrics.render()
@@ -0,0 +1,37 @@
+from datetime import datetime
+from app.services import job_lease
+from app.services.bvc_feed import BVCFeed
+from app.services.price_cache import MemoryPriceCache, SQLitePriceCache
+from app.services.price_feed import PriceFeed
+
+def _scrapes(app, monkeypatch):
+    runs = []
+    monkeypatch.setattr(PriceFeed, "_app", app)
+    monkeypatch.setitem(PriceFeed._intervals, "bvc_feed", 60)
+    monkeypatch.setattr(BVCFeed, "refresh_all", classmethod(lambda cls: runs.append(1)))
+    return runs
+
+def test_one_worker_scrapes_into_the_shared_store(app, monkeypatch, tmp_path):
+    monkeypatch.setattr(BVCFeed, "_store", SQLitePriceCache(str(tmp_path / "quotes.db")))
+    runs = _scrapes(app, monkeypatch)
+
+    PriceFeed.refresh_bvc()
+    monkeypatch.setattr(job_lease.os, "getpid", lambda: -1)
+    PriceFeed.refresh_bvc()
+    assert runs == [1]
+
+    # What the scraper stored is what every worker on the host reads
+    BVCFeed._store.set("bvc:IAM", 101.5, datetime.utcnow(), "bvc")
+    other = SQLitePriceCache(str(tmp_path / "quotes.db"))
+    assert other.keys("bvc:") == ["bvc:IAM"]
+    monkeypatch.setattr(BVCFeed, "feed_running", True)
+    assert BVCFeed.get("IAM")["price"] == 101.5
+
+def test_per_process_store_scrapes_in_every_worker(app, monkeypatch):
+    monkeypatch.setattr(BVCFeed, "_store", MemoryPriceCache())
+    runs = _scrapes(app, monkeypatch)
+
+    PriceFeed.refresh_bvc()
+    monkeypatch.setattr(job_lease.os, "getpid", lambda: -1)
+    PriceFeed.refresh_bvc()
+    assert runs == [1, 1]
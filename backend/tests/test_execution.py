@@ -0,0 +1,103 @@
+import pytest
+from app.db import db
+from app.models import User, UserChallenge, ChallengePlan, PendingOrder
+from app.services import execution
+from app.services.price_service import PriceService
+
+def _resting_order():
+    plan = db.session.query(ChallengePlan).filter_by(name="Starter").one()
+    user = User(email="orders@example.com", password_hash="x")
+    db.session.add(user)
+    db.session.flush()
+    balance = plan.starting_balance
+    uc = UserChallenge(user_id=user.id, challenge_id=plan.id, status="active", equity=balance,
+                       daily_start_equity=balance, highest_equity=balance, lowest_equity=balance,
+                       realized_pnl=0.0, cash_balance=balance, trade_count=0)
+    db.session.add(uc)
+    db.session.flush()
+    order = PendingOrder(user_challenge_id=uc.id, symbol="AAPL", side="buy", order_type="limit",
+                         trigger_price=100.0, quantity=1, status="open")
+    db.session.add(order)
+    db.session.commit()
+    return order.id
+
+def test_failing_fill_gives_up_after_max_attempts(app, monkeypatch):
+    order_id = _resting_order()
+
+    def broken_fill(*args, **kwargs):
+        raise RuntimeError("boom")
+    monkeypatch.setattr(execution, "fill", broken_fill)
+
+    for attempt in range(1, execution.MAX_FILL_ATTEMPTS + 1):
+        filled, rest_again = execution.fill_pending([order_id], {"AAPL": 99.0})
+        order = db.session.get(PendingOrder, order_id)
+        db.session.refresh(order)
+        assert filled == 0
+        assert order.fill_attempts == attempt
+        if attempt < execution.MAX_FILL_ATTEMPTS:
+            assert order.status == "open" and [r.id for r in rest_again] == [order_id]
+    assert order.status == "failed"
+    assert rest_again == []
+
+def test_execute_rejects_missing_or_non_string_symbol(app):
+    client = app.test_client()
+    for symbol in (None, 42, ["AAPL"], "  "):
+        resp = client.post("/api/trades/execute", json={"user_challenge_id": 1, "symbol": symbol,
+                                                         "side": "buy", "quantity": 1})
+        assert resp.status_code == 400
+        assert resp.get_json() == {"error": "invalid_symbol"}
+
+def test_batch_rejects_non_string_symbol_per_order():
+    with pytest.raises(execution.ExecutionError) as e:
+        execution._parse_order({"symbol": 7, "side": "buy", "quantity": 1})
+    assert e.value.code == "invalid_symbol"
+
+def test_legacy_trade_rejects_bad_symbol_and_quantity(app):
+    client = app.test_client()
+    for body, error in (({"asset": None, "quantity": 1}, "invalid_symbol"),
+                        ({"asset": "AAPL", "quantity": "lots"}, "invalid_quantity")):
+        resp = client.post("/api/trade", json={"user_challenge_id": 1, "side": "buy", **body})
+        assert resp.status_code == 400
+        assert resp.get_json() == {"error": error}
+    assert None not in PriceService._requested
+
+@pytest.mark.parametrize("quantity", ["nan", "inf", "-inf", 0, -1])
+def test_execute_rejects_non_finite_or_non_positive_quantity(app, quantity):
+    resp = app.test_client().post("/api/trades/execute", json={"user_challenge_id": 1, "symbol": "AAPL",
+                                                               "side": "buy", "quantity": quantity, "price": 100})
+    assert resp.status_code == 400
+    assert resp.get_json() == {"error": "invalid_quantity"}
+
+@pytest.mark.parametrize("body, error", [
+    ({"trigger_price": "nan"}, "invalid_quantity_or_price"),
+    ({"trigger_price": "inf"}, "invalid_quantity_or_price"),
+    ({"quantity": "nan"}, "invalid_quantity_or_price"),
+    ({"symbol": 42}, "invalid_order"),
+    ({"symbol": "X" * 51}, "invalid_order"),
+])
+def test_place_order_rejects_bad_input(app, body, error):
+    order = {"user_challenge_id": 1, "symbol": "AAPL", "side": "buy", "type": "limit",
+             "trigger_price": 100, "quantity": 1, **body}
+    resp = app.test_client().post("/api/trades/orders", json=order)
+    assert resp.status_code == 400
+    assert resp.get_json() == {"error": error}
+
+def test_nan_trigger_does_not_block_the_book():
+    from app.services.order_book import OrderBook
+    OrderBook.clear()
+    OrderBook.add(1, "AAPL", "buy", "limit", float("nan"))
+    OrderBook.add(2, "AAPL", "buy", "limit", 100.0)
+    assert OrderBook.triggered({"AAPL": 99.0}) == [2]
+    OrderBook.clear()
+
+@pytest.mark.parametrize("price", [-5, 0, "nan", "inf"])
+def test_batch_rejects_bad_client_price(price):
+    with pytest.raises(execution.ExecutionError) as e:
+        execution._parse_order({"symbol": "AAPL", "side": "buy", "quantity": 1, "price": price})
+    assert e.value.code == "invalid_price"
+
+def test_execute_rejects_negative_client_price(app):
+    resp = app.test_client().post("/api/trades/execute", json={"user_challenge_id": 1, "symbol": "AAPL",
+                                                               "side": "buy", "quantity": 1, "price": -5})
+    assert resp.status_code == 400
+    assert resp.get_json() == {"error": "invalid_price"}
@@ -0,0 +1,24 @@
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from app.db import db
+from app.models import JobLease
+from app.services import job_lease
+
+def test_lease_is_held_against_other_workers(app, monkeypatch):
+    assert job_lease.claim("risk_sweep", timedelta(seconds=60))
+    # Same worker renews its own lease
+    assert job_lease.claim("risk_sweep", timedelta(seconds=60))
+
+    monkeypatch.setattr(job_lease.os, "getpid", lambda: -1)
+    assert not job_lease.claim("risk_sweep", timedelta(seconds=60))
+    # Other jobs are independent
+    assert job_lease.claim("equity_rollup", timedelta(seconds=60))
+
+def test_expired_lease_is_taken_over(app, monkeypatch):
+    assert job_lease.claim("risk_sweep", timedelta(seconds=60))
+    db.session.execute(update(JobLease).values(expires_at=datetime.utcnow() - timedelta(seconds=1)))
+    db.session.commit()
+
+    monkeypatch.setattr(job_lease.os, "getpid", lambda: -1)
+    assert job_lease.claim("risk_sweep", timedelta(seconds=60))
+    assert db.session.get(JobLease, "risk_sweep").owner.endswith(":-1")
@@ -0,0 +1,37 @@
+from datetime import datetime
+from alembic import command
+from app.bootstrap import alembic_config, upgrade_schema
+from app.db import db
+from app.models import User, UserChallenge, ChallengePlan, Trade, MonthlyStat
+from app.services.leaderboard_service import get_top, record_trade_stat
+
+def _challenge(email):
+    plan = db.session.query(ChallengePlan).filter_by(name="Starter").one()
+    user = User(email=email, password_hash="x")
+    db.session.add(user)
+    db.session.flush()
+    balance = plan.starting_balance
+    uc = UserChallenge(user_id=user.id, challenge_id=plan.id, status="active", equity=balance,
+                       daily_start_equity=balance, highest_equity=balance, lowest_equity=balance)
+    db.session.add(uc)
+    db.session.flush()
+    return uc
+
+def test_migration_backfills_partially_materialised_month(app):
+    when = datetime(2026, 3, 10, 12)
+    old, new = _challenge("older@example.com"), _challenge("newer@example.com")
+    # A trade from before the aggregates existed, and one recorded since
+    db.session.add(Trade(user_challenge_id=old.id, symbol="AAPL", side="sell", quantity=1, price=110, pnl=500.0, timestamp=when))
+    db.session.add(Trade(user_challenge_id=new.id, symbol="AAPL", side="sell", quantity=1, price=110, pnl=100.0, timestamp=when))
+    record_trade_stat(new, 100.0, when)
+    db.session.commit()
+    assert [r["total_pnl"] for r in get_top("2026-03")] == [100.0]
+
+    cfg = alembic_config()
+    with db.engine.begin() as connection:
+        cfg.attributes["connection"] = connection
+        command.downgrade(cfg, "0006")
+    upgrade_schema()
+
+    stats = {s.user_challenge_id: (s.pnl, s.trade_count) for s in db.session.query(MonthlyStat).filter_by(month="2026-03")}
+    assert stats == {old.id: (500.0, 1), new.id: (100.0, 1)}
@@ -0,0 +1,53 @@
+import pytest
+from app.services.market_sim import MarketSimulator
+
+CONFIG = {"SQLALCHEMY_DATABASE_URI": "sqlite:///shared.db", "SIM_TICK_SECONDS": 1, "SIM_BLOCK": 64}
+
+def _at(monkeypatch, now):
+    monkeypatch.setattr("app.services.market_sim.time.time", lambda: now)
+
+def test_workers_without_seed_agree(monkeypatch):
+    # Worker A starts first; worker B starts blocks later, anchored at the quote A published then
+    _at(monkeypatch, 1_700_000_000.0)
+    MarketSimulator.configure(CONFIG)
+    MarketSimulator.prices(["AAPL"], {"AAPL": 190.0})
+    _at(monkeypatch, 1_700_000_300.0)
+    shared = MarketSimulator.prices(["AAPL"])["AAPL"]
+    _at(monkeypatch, 1_700_000_500.0)
+    a = MarketSimulator.prices(["AAPL"])["AAPL"]
+    seed_a = MarketSimulator.SEED
+
+    _at(monkeypatch, 1_700_000_300.0)
+    MarketSimulator.configure(CONFIG)
+    assert MarketSimulator.SEED == seed_a
+    MarketSimulator.prices(["AAPL"], {"AAPL": shared})
+    _at(monkeypatch, 1_700_000_500.0)
+    b = MarketSimulator.prices(["AAPL"])["AAPL"]
+    assert a != shared
+    assert abs(a - b) <= 0.01
+
+def test_seed_follows_database_url():
+    MarketSimulator.configure({**CONFIG, "SQLALCHEMY_DATABASE_URI": "sqlite:///other.db"})
+    other = MarketSimulator.SEED
+    MarketSimulator.configure({**CONFIG, "SIM_SEED": ""})
+    assert MarketSimulator.SEED != other
+
+def test_failed_add_leaves_state_untouched(monkeypatch):
+    MarketSimulator.configure({**CONFIG, "SIM_TICK_SECONDS": 0})
+    before = MarketSimulator.prices(["AAPL"])
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("boom")
+    monkeypatch.setattr(MarketSimulator, "_returns", classmethod(broken))
+    with pytest.raises(RuntimeError):
+        MarketSimulator.prices(["AAPL", "TSLA"])
+    monkeypatch.undo()
+
+    assert MarketSimulator.prices(["AAPL"]) == before
+    assert set(MarketSimulator.prices(["AAPL", "TSLA"])) == {"AAPL", "TSLA"}
+
+def test_rejects_non_string_symbols():
+    MarketSimulator.configure(CONFIG)
+    with pytest.raises(ValueError):
+        MarketSimulator.prices(["AAPL", None])
+    assert MarketSimulator._state["symbols"] == []
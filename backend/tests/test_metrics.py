@@ -0,0 +1,14 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app.db import db
+from app.services.metrics import Metrics
+
+def test_failed_statement_does_not_leak_its_timer(app):
+    with db.engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM no_such_table"))
+        assert not conn.info.get("_metrics_started")
+        conn.execute(text("SELECT 1"))
+        assert not conn.info.get("_metrics_started")
+    assert "sql_errors_total" in Metrics.render()
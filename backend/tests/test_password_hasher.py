@@ -0,0 +1,29 @@
+import time
+import pytest
+from app.services.password_hasher import PasswordHasher, HasherBusy
+
+def _sleep(seconds):
+    time.sleep(seconds)
+    return True
+
+@pytest.fixture
+def hasher():
+    defaults = (PasswordHasher.WORKERS, PasswordHasher.MAX_QUEUE, PasswordHasher.TIMEOUT)
+    PasswordHasher.configure({"PASSWORD_HASH_WORKERS": 1, "PASSWORD_HASH_QUEUE": 0, "PASSWORD_HASH_TIMEOUT": 0.05})
+    yield PasswordHasher
+    workers, queue, timeout = defaults
+    PasswordHasher.configure({"PASSWORD_HASH_WORKERS": 0, "PASSWORD_HASH_QUEUE": queue, "PASSWORD_HASH_TIMEOUT": timeout})
+    PasswordHasher.WORKERS = workers
+
+def test_timed_out_job_keeps_its_slot_until_it_finishes(hasher):
+    with pytest.raises(HasherBusy):
+        hasher._run(_sleep, 0.5)
+    # The worker is still sleeping, so its slot is still taken
+    assert not hasher._slots.acquire(blocking=False)
+    deadline = time.monotonic() + 5
+    while not hasher._slots.acquire(blocking=False):
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    hasher._slots.release()
+    hasher.TIMEOUT = 5.0
+    assert hasher._run(_sleep, 0) is True
@@ -0,0 +1,28 @@
+from app.services.execution import market_prices
+from app.services.price_service import PriceService
+
+def test_feed_running_fetches_unknown_symbols(app, monkeypatch):
+    monkeypatch.setattr(PriceService, "feed_running", True)
+    monkeypatch.setattr(PriceService, "SOURCE", "market")
+    monkeypatch.setattr(PriceService, "_fetch_prices", classmethod(lambda cls, symbols: {s: 42.0 for s in symbols}))
+
+    quote = PriceService.get_quote("NEWCO")
+    assert (quote["price"], quote["source"]) == (42.0, "market")
+
+def test_failed_fetch_is_simulated_and_not_tradable(app, monkeypatch):
+    monkeypatch.setattr(PriceService, "feed_running", True)
+    monkeypatch.setattr(PriceService, "SOURCE", "market")
+    monkeypatch.setattr(PriceService, "_fetch_prices", classmethod(lambda cls, symbols: {}))
+
+    assert PriceService.get_quote("GONE")["source"] == "simulated"
+    assert market_prices(["GONE"]) == {}
+
+def test_legacy_trade_refuses_simulated_price(app, monkeypatch):
+    monkeypatch.setattr(PriceService, "feed_running", True)
+    monkeypatch.setattr(PriceService, "SOURCE", "market")
+    monkeypatch.setattr(PriceService, "_fetch_prices", classmethod(lambda cls, symbols: {}))
+
+    resp = app.test_client().post("/api/trade", json={"user_challenge_id": 1, "asset": "GONE",
+                                                      "side": "buy", "quantity": 1})
+    assert resp.status_code == 400
+    assert resp.get_json() == {"error": "price_unavailable"}
@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from app.db import db
+from app.models import User, UserChallenge, ChallengePlan, Position
+from app.services import risk_engine
+from app.services.price_service import PriceService
+
+def _losing_challenge():
+    plan = db.session.query(ChallengePlan).filter_by(name="Starter").one()
+    user = User(email="sweep@example.com", password_hash="x")
+    db.session.add(user)
+    db.session.flush()
+    balance = plan.starting_balance
+    uc = UserChallenge(user_id=user.id, challenge_id=plan.id, status="active", equity=balance,
+                       daily_start_equity=balance, highest_equity=balance, lowest_equity=balance,
+                       realized_pnl=0.0, cash_balance=balance, trade_count=0,
+                       last_updated=datetime.utcnow() - timedelta(minutes=1))
+    db.session.add(uc)
+    db.session.flush()
+    db.session.add(Position(user_challenge_id=uc.id, symbol="AAPL", quantity=10, avg_price=100.0, side="long"))
+    db.session.commit()
+    return uc.id
+
+def _change_mid_sweep(monkeypatch, **values):
+    """
+    Apply `values` to every challenge from another connection after the sweep
+    loaded its rows and before it writes them back (prices are read in between).
+    """
+    def get_quotes(symbols):
+        with db.engine.begin() as conn:
+            conn.execute(update(UserChallenge.__table__).values(**values))
+        return {s: {"price": 50.0, "source": "market"} for s in symbols}
+    monkeypatch.setattr(PriceService, "get_quotes", get_quotes)
+
+def test_sweep_does_not_reopen_a_challenge_closed_meanwhile(app, monkeypatch):
+    uc_id = _losing_challenge()
+    _change_mid_sweep(monkeypatch, status="failed", equity=1234.0)
+
+    result = risk_engine.sweep()
+
+    uc = db.session.get(UserChallenge, uc_id)
+    db.session.refresh(uc)
+    assert uc.status == "failed"
+    assert uc.equity == 1234.0
+    assert result["updated"] == 0 and result["skipped"] == 1
+
+def test_sweep_skips_a_challenge_traded_meanwhile(app, monkeypatch):
+    uc_id = _losing_challenge()
+    _change_mid_sweep(monkeypatch, equity=4321.0, last_updated=datetime.utcnow())
+
+    result = risk_engine.sweep()
+
+    uc = db.session.get(UserChallenge, uc_id)
+    db.session.refresh(uc)
+    assert uc.status == "active"
+    assert uc.equity == 4321.0
+    assert result["skipped"] == 1
+
+def test_sweep_marks_an_untouched_challenge(app):
+    uc_id = _losing_challenge()
+
+    result = risk_engine.sweep(prices={"AAPL": 50.0})
+
+    uc = db.session.get(UserChallenge, uc_id)
+    db.session.refresh(uc)
+    assert result["updated"] == 1
+    assert uc.equity == 5000.0 - 500.0
+
+def test_sweep_ignores_simulated_prices(app, monkeypatch):
+    uc_id = _losing_challenge()
+    monkeypatch.setattr(PriceService, "get_quotes", lambda symbols: {s: {"price": 1.0, "source": "simulated"} for s in symbols})
+
+    result = risk_engine.sweep()
+
+    uc = db.session.get(UserChallenge, uc_id)
+    db.session.refresh(uc)
+    assert uc.status == "active" and uc.equity == 5000.0
+    assert result["unpriced"] == 1 and result["updated"] == 0
+
+def test_sweep_treats_never_evaluated_challenge_as_new_day(app):
+    uc_id = _losing_challenge()
+    with db.engine.begin() as conn:
+        conn.execute(update(UserChallenge.__table__).values(last_updated=None, daily_start_equity=9999.0))
+
+    risk_engine.sweep(prices={"AAPL": 100.0})
+
+    uc = db.session.get(UserChallenge, uc_id)
+    db.session.refresh(uc)
+    assert uc.daily_start_equity == 5000.0
+    assert uc.last_updated is not None
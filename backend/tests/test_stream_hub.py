@@ -0,0 +1,16 @@
+from app.services.stream_hub import StreamHub
+
+def test_subscribe_respects_max_connections(app, monkeypatch):
+    monkeypatch.setattr(StreamHub, "MAX_CONNECTIONS", 1)
+    monkeypatch.setattr(StreamHub, "_ensure_loop", classmethod(lambda cls: None))
+    first = StreamHub.subscribe(["AAPL"])
+    assert first is not None
+    assert StreamHub.subscribe(["AAPL"]) is None
+
+    # Releasing twice (generator finally + response close) frees one slot only
+    StreamHub.unsubscribe(first)
+    StreamHub.unsubscribe(first)
+    second = StreamHub.subscribe(["AAPL"])
+    assert second is not None
+    StreamHub.unsubscribe(second)
+    assert StreamHub._connections == 0
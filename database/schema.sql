@@ -1,71 +1,154 @@
-CREATE TABLE IF NOT EXISTS user (
-  id INTEGER PRIMARY KEY AUTOINCREMENT,
-  email TEXT NOT NULL UNIQUE,
-  password_hash TEXT NOT NULL,
-  created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-);
-SELECT * FROM users;
+-- SQLite schema matching app/models.py (migration head 0007).
+-- Reference only: the schema is managed by Alembic (backend/migrations);
+-- run `flask --app cli init-db` from backend/ to create or upgrade a database.
 
 CREATE TABLE IF NOT EXISTS challenge_plan (
-  id INTEGER PRIMARY KEY AUTOINCREMENT,
-  name TEXT NOT NULL,
+  id INTEGER NOT NULL,
+  name VARCHAR(100) NOT NULL,
   price_dh INTEGER NOT NULL,
-  starting_balance REAL NOT NULL,
-  profit_target_pct REAL DEFAULT 10.0,
-  max_daily_loss_pct REAL DEFAULT 5.0,
-  max_total_loss_pct REAL DEFAULT 10.0
+  starting_balance FLOAT NOT NULL,
+  profit_target_pct FLOAT,
+  max_daily_loss_pct FLOAT,
+  max_total_loss_pct FLOAT,
+  PRIMARY KEY (id)
+);
+
+CREATE TABLE IF NOT EXISTS job_lease (
+  name VARCHAR(100) NOT NULL,
+  owner VARCHAR(100) NOT NULL,
+  expires_at DATETIME NOT NULL,
+  PRIMARY KEY (name)
+);
+
+CREATE TABLE IF NOT EXISTS settings (
+  id INTEGER NOT NULL,
+  paypal_client_id VARCHAR(255),
+  paypal_secret VARCHAR(255),
+  PRIMARY KEY (id)
+);
+
+CREATE TABLE IF NOT EXISTS user (
+  id INTEGER NOT NULL,
+  email VARCHAR(255) NOT NULL,
+  password_hash VARCHAR(255) NOT NULL,
+  created_at DATETIME,
+  PRIMARY KEY (id),
+  UNIQUE (email)
+);
+
+CREATE TABLE IF NOT EXISTS payment (
+  id INTEGER NOT NULL,
+  user_id INTEGER NOT NULL,
+  amount FLOAT NOT NULL,
+  method VARCHAR(20) NOT NULL,
+  status VARCHAR(20) NOT NULL,
+  meta JSON,
+  timestamp DATETIME,
+  PRIMARY KEY (id),
+  FOREIGN KEY(user_id) REFERENCES user (id)
 );
 
 CREATE TABLE IF NOT EXISTS user_challenge (
-  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  id INTEGER NOT NULL,
   user_id INTEGER NOT NULL,
   challenge_id INTEGER NOT NULL,
-  status TEXT DEFAULT 'active',
-  start_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+  status VARCHAR(20),
+  start_date DATETIME,
   end_date DATETIME,
-  equity REAL NOT NULL,
-  highest_equity REAL NOT NULL,
-  lowest_equity REAL NOT NULL,
-  FOREIGN KEY(user_id) REFERENCES user(id),
-  FOREIGN KEY(challenge_id) REFERENCES challenge_plan(id)
+  equity FLOAT NOT NULL,
+  daily_start_equity FLOAT NOT NULL,
+  highest_equity FLOAT NOT NULL,
+  lowest_equity FLOAT NOT NULL,
+  last_updated DATETIME,
+  realized_pnl FLOAT,
+  cash_balance FLOAT,
+  trade_count INTEGER,
+  max_drawdown_pct FLOAT,
+  PRIMARY KEY (id),
+  FOREIGN KEY(user_id) REFERENCES user (id),
+  FOREIGN KEY(challenge_id) REFERENCES challenge_plan (id)
 );
 
-CREATE TABLE IF NOT EXISTS trade (
-  id INTEGER PRIMARY KEY AUTOINCREMENT,
+CREATE INDEX IF NOT EXISTS ix_user_challenge_status_id ON user_challenge (status, id);
+CREATE INDEX IF NOT EXISTS ix_user_challenge_user_status ON user_challenge (user_id, status);
+
+CREATE TABLE IF NOT EXISTS equity_snapshot (
+  id INTEGER NOT NULL,
+  user_challenge_id INTEGER NOT NULL,
+  resolution INTEGER NOT NULL,
+  bucket DATETIME NOT NULL,
+  open FLOAT NOT NULL,
+  high FLOAT NOT NULL,
+  low FLOAT NOT NULL,
+  close FLOAT NOT NULL,
+  PRIMARY KEY (id),
+  FOREIGN KEY(user_challenge_id) REFERENCES user_challenge (id)
+);
+
+CREATE INDEX IF NOT EXISTS ix_equity_snapshot_res_bucket ON equity_snapshot (resolution, bucket);
+CREATE INDEX IF NOT EXISTS ix_equity_snapshot_uc_res_bucket ON equity_snapshot (user_challenge_id, resolution, bucket);
+
+CREATE TABLE IF NOT EXISTS monthly_stat (
+  id INTEGER NOT NULL,
+  month VARCHAR(7) NOT NULL,
   user_challenge_id INTEGER NOT NULL,
-  symbol TEXT NOT NULL,
-  side TEXT NOT NULL,
-  quantity REAL NOT NULL,
-  price REAL NOT NULL,
-  timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-  pnl REAL DEFAULT 0.0,
-  FOREIGN KEY(user_challenge_id) REFERENCES user_challenge(id)
+  user_id INTEGER NOT NULL,
+  starting_balance FLOAT NOT NULL,
+  pnl FLOAT NOT NULL,
+  trade_count INTEGER NOT NULL,
+  PRIMARY KEY (id),
+  CONSTRAINT uq_monthly_stat_month_uc UNIQUE (month, user_challenge_id),
+  FOREIGN KEY(user_challenge_id) REFERENCES user_challenge (id),
+  FOREIGN KEY(user_id) REFERENCES user (id)
 );
 
 CREATE TABLE IF NOT EXISTS position (
-  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  id INTEGER NOT NULL,
   user_challenge_id INTEGER NOT NULL,
-  symbol TEXT NOT NULL,
-  quantity REAL NOT NULL,
-  avg_price REAL NOT NULL,
-  side TEXT NOT NULL,
-  opened_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-  FOREIGN KEY(user_challenge_id) REFERENCES user_challenge(id)
+  symbol VARCHAR(50) NOT NULL,
+  quantity FLOAT NOT NULL,
+  avg_price FLOAT NOT NULL,
+  side VARCHAR(10) NOT NULL,
+  opened_at DATETIME,
+  PRIMARY KEY (id),
+  FOREIGN KEY(user_challenge_id) REFERENCES user_challenge (id)
 );
 
-CREATE TABLE IF NOT EXISTS payment (
-  id INTEGER PRIMARY KEY AUTOINCREMENT,
-  user_id INTEGER NOT NULL,
-  amount REAL NOT NULL,
-  method TEXT NOT NULL,
-  status TEXT NOT NULL,
-  meta TEXT,
-  timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-  FOREIGN KEY(user_id) REFERENCES user(id)
+CREATE UNIQUE INDEX IF NOT EXISTS uq_position_uc_symbol ON position (user_challenge_id, symbol);
+
+CREATE TABLE IF NOT EXISTS trade (
+  id INTEGER NOT NULL,
+  user_challenge_id INTEGER NOT NULL,
+  symbol VARCHAR(50) NOT NULL,
+  side VARCHAR(10) NOT NULL,
+  quantity FLOAT NOT NULL,
+  price FLOAT NOT NULL,
+  timestamp DATETIME,
+  pnl FLOAT,
+  PRIMARY KEY (id),
+  FOREIGN KEY(user_challenge_id) REFERENCES user_challenge (id)
 );
 
-CREATE TABLE IF NOT EXISTS settings (
-  id INTEGER PRIMARY KEY AUTOINCREMENT,
-  paypal_client_id TEXT,
-  paypal_secret TEXT
+CREATE INDEX IF NOT EXISTS ix_trade_uc_ts ON trade (user_challenge_id, timestamp);
+
+CREATE TABLE IF NOT EXISTS pending_order (
+  id INTEGER NOT NULL,
+  user_challenge_id INTEGER NOT NULL,
+  symbol VARCHAR(50) NOT NULL,
+  side VARCHAR(10) NOT NULL,
+  order_type VARCHAR(20) NOT NULL,
+  trigger_price FLOAT NOT NULL,
+  quantity FLOAT NOT NULL,
+  status VARCHAR(20) NOT NULL,
+  created_at DATETIME,
+  filled_at DATETIME,
+  fill_price FLOAT,
+  trade_id INTEGER,
+  fill_attempts INTEGER DEFAULT '0' NOT NULL,
+  PRIMARY KEY (id),
+  FOREIGN KEY(user_challenge_id) REFERENCES user_challenge (id),
+  FOREIGN KEY(trade_id) REFERENCES trade (id)
 );
+
+CREATE INDEX IF NOT EXISTS ix_pending_order_status_id ON pending_order (status, id);
+CREATE INDEX IF NOT EXISTS ix_pending_order_uc_status ON pending_order (user_challenge_id, status);
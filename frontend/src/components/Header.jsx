@@ -4,6 +4,7 @@ import { UserContext } from "../context/UserContext";
 import { useTheme } from "../context/ThemeContext";
 import { Link, useNavigate, useLocation } from "react-router-dom";
 import { useTranslation } from "react-i18next";
+import { subscribe } from "../stream";
 
 export default function Header() {
   const { user, challengeId, logout } = useContext(UserContext);
@@ -35,8 +36,14 @@ export default function Header() {
       }
     };
     fetchEquity();
-    iv = setInterval(fetchEquity, 10000);
-    return () => iv && clearInterval(iv);
+    if (!challengeId) return;
+    // Equity changes are pushed by the server; keep a slow poll as fallback
+    const unsubscribe = subscribe({ challengeId }, { account: (d) => setEquity(d.equity) });
+    iv = setInterval(fetchEquity, 60000);
+    return () => {
+      unsubscribe();
+      clearInterval(iv);
+    };
   }, [challengeId]);
 
   const onLogout = () => {
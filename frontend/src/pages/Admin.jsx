@@ -3,11 +3,12 @@ import axios from "axios";
 
 // Service API layer for Admin
 const AdminService = {
-  getChallenges: async (adminKey) => {
+  getChallenges: async (adminKey, cursor) => {
     try {
       console.log("Fetching challenges with admin key...");
       const res = await axios.get("/api/admin/challenges", {
-        headers: { 'X-ADMIN-KEY': adminKey }
+        headers: { 'X-ADMIN-KEY': adminKey },
+        params: cursor ? { cursor } : {}
       });
       console.log("Admin API Response:", res.data);
       return res.data;
@@ -35,14 +36,16 @@ export default function Admin() {
   const [adminKey, setAdminKey] = useState(localStorage.getItem('admin_key') || "");
   const [error, setError] = useState(null);
   const [dbMessage, setDbMessage] = useState("");
+  const [nextCursor, setNextCursor] = useState(null);
 
-  const loadData = async () => {
+  const loadData = async (cursor = null) => {
     if (!adminKey) return;
     setLoading(true);
     setError(null);
     try {
-      const data = await AdminService.getChallenges(adminKey);
-      setChallenges(data.items || []);
+      const data = await AdminService.getChallenges(adminKey, cursor);
+      setChallenges(prev => cursor ? [...prev, ...(data.items || [])] : (data.items || []));
+      setNextCursor(data.next_cursor || null);
       setDbMessage(data.message || "");
       localStorage.setItem('admin_key', adminKey);
     } catch (err) {
@@ -109,7 +112,7 @@ export default function Admin() {
         </div>
         <div className="flex items-center gap-3">
           <button
-            onClick={loadData}
+            onClick={() => loadData()}
             disabled={loading}
             className="text-xs px-3 py-1 bg-gray-100 dark:bg-gray-800 rounded hover:bg-gray-200 dark:hover:bg-gray-700"
           >
@@ -181,8 +184,19 @@ export default function Admin() {
               </tbody>
             </table>
           </div>
-          <div className="px-6 py-3 bg-gray-50 dark:bg-gray-800/50 border-t border-gray-100 dark:border-gray-800 text-[10px] text-gray-400 text-right uppercase tracking-widest font-bold">
-            {challenges.length} Records Found
+          <div className="px-6 py-3 bg-gray-50 dark:bg-gray-800/50 border-t border-gray-100 dark:border-gray-800 flex items-center justify-between">
+            {nextCursor ? (
+              <button
+                onClick={() => loadData(nextCursor)}
+                disabled={loading}
+                className="text-xs font-bold text-blue-600 hover:text-blue-700 disabled:opacity-50"
+              >
+                {loading ? "Loading..." : "Load more"}
+              </button>
+            ) : <span />}
+            <span className="text-[10px] text-gray-400 uppercase tracking-widest font-bold">
+              {challenges.length} Records Found
+            </span>
           </div>
         </div>
       )}
@@ -3,6 +3,7 @@ import axios from "axios";
 import { createChart } from "lightweight-charts";
 import { UserContext } from "../context/UserContext";
 import { useTranslation } from "react-i18next";
+import { subscribe } from "../stream";
 
 const STATUS_CONFIG = {
   active: { bg: "bg-blue-100 dark:bg-blue-900/30", text: "text-blue-700 dark:text-blue-300", labelKey: "active" },
@@ -143,7 +144,7 @@ export default function Dashboard() {
   const fetchSummary = async () => {
     if (!challengeId) return;
     try {
-      const summary = await axios.get("/api/trades/summary", { params: { user_challenge_id: challengeId } });
+      const summary = await axios.get("/api/trades/summary", { params: { user_challenge_id: challengeId, include_trades: 1, limit: 10 } });
       setStatus(summary.data.status);
       setEquity(summary.data.equity);
       setStartingBalance(summary.data.starting_balance);
@@ -163,10 +164,32 @@ export default function Dashboard() {
     fetchPrice(); // Initial fetch
     fetchSummary();
 
-    const priceIv = setInterval(fetchPrice, 30000); // 30s polling for price
-    const summaryIv = setInterval(fetchSummary, 10000); // 10s for summary
+    // Prices (except Casablanca) and equity/rule changes are pushed over SSE;
+    // polling remains as a slow fallback and for the Maroc scraper.
+    const unsubscribe = subscribe({ symbols: market !== "Maroc" ? [symbol] : [], challengeId }, {
+      price: (d) => {
+        if (d.symbol !== symbol) return;
+        setPriceError(null);
+        setPrice(d.price);
+        setLastUpdated(new Date());
+        const t = Math.floor(Date.now() / 1000);
+        seriesRef.current?.update({ time: t, value: d.price });
+        updateSignals(d.price, t);
+      },
+      account: (d) => {
+        setStatus(d.status);
+        setEquity(d.equity);
+        setProfitPct(d.profit_pct);
+        setDailyLossPct(d.daily_loss_pct);
+        setTotalLossPct(d.total_loss_pct);
+      },
+    });
+
+    const priceIv = setInterval(fetchPrice, market === "Maroc" ? 30000 : 120000);
+    const summaryIv = setInterval(fetchSummary, 60000);
 
     return () => {
+      unsubscribe();
       clearInterval(priceIv);
       clearInterval(summaryIv);
     };
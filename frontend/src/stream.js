@@ -0,0 +1,54 @@
+// One EventSource per tab, shared by every component that wants live data.
+// Components subscribe with the symbols / challenge they need; the connection
+// is reopened with the union whenever that set changes.
+const STREAM_URL = import.meta.env.VITE_STREAM_URL || "/api/stream/";
+const EVENTS = ["price", "account"];
+
+const subscribers = new Set();
+let source = null;
+let query = "";
+let pending = false;
+
+function reconnect() {
+  pending = false;
+  const symbols = new Set();
+  let challengeId = null;
+  subscribers.forEach((s) => {
+    s.symbols.forEach((sym) => symbols.add(sym));
+    challengeId = s.challengeId || challengeId;
+  });
+  const params = new URLSearchParams();
+  if (symbols.size) params.set("symbols", [...symbols].sort().join(","));
+  if (challengeId) params.set("user_challenge_id", challengeId);
+  const next = params.toString();
+  if (next === query) return;
+
+  query = next;
+  source?.close();
+  source = null;
+  if (!next) return;
+  source = new EventSource(`${STREAM_URL}?${next}`);
+  EVENTS.forEach((type) =>
+    source.addEventListener(type, (e) => {
+      const data = JSON.parse(e.data);
+      subscribers.forEach((s) => s.handlers[type]?.(data));
+    })
+  );
+}
+
+// Components mounting in the same render share a single (re)connect
+function scheduleReconnect() {
+  if (pending) return;
+  pending = true;
+  setTimeout(reconnect, 0);
+}
+
+export function subscribe({ symbols = [], challengeId = null }, handlers) {
+  const sub = { symbols, challengeId, handlers };
+  subscribers.add(sub);
+  scheduleReconnect();
+  return () => {
+    subscribers.delete(sub);
+    scheduleReconnect();
+  };
+}